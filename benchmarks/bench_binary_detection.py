@@ -0,0 +1,77 @@
+"""Benchmark: per-file cost of binary classification.
+
+Compares the previous generator-based classifier with
+code2md.encoding_detection.sniff_chunk (binary check plus encoding detection,
+as used by MarkdownFileWriter) on 8 KiB sniff buffers of several kinds, and
+checks that both agree on which samples are binary.
+
+    python benchmarks/bench_binary_detection.py --rounds 2000
+"""
+
+import argparse
+import os
+import random
+import time
+
+from code2md.encoding_detection import sniff_chunk
+
+TEXT_BYTES = bytes(range(32, 127)) + b'\n\r\t\f\b'
+CHUNK_SIZE = 8192
+
+
+def legacy_is_binary(chunk: bytes) -> bool:
+    """The classifier MarkdownFileWriter used before bytes.translate."""
+    if not chunk:
+        return False
+    if b'\x00' in chunk:
+        return True
+    try:
+        chunk.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        if exc.start >= len(chunk) - 4:
+            return False
+    else:
+        return False
+    nontext = sum(byte not in TEXT_BYTES for byte in chunk)
+    return (nontext / len(chunk)) > 0.30
+
+
+def samples() -> dict[str, bytes]:
+    rnd = random.Random(0)
+    latin1 = ('caf\xe9 cr\xe8me br\xfbl\xe9e ' * 600).encode('latin-1')[:CHUNK_SIZE]
+    return {
+        'utf-8 source': ('def f(x):\n    return x  # комментарий\n' * 300).encode()[:CHUNK_SIZE],
+        'latin-1 text (fallback scan)': latin1,
+        'random bytes without NUL': bytes(rnd.randrange(1, 256) for _ in range(CHUNK_SIZE)),
+        'png': b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR' + os.urandom(CHUNK_SIZE - 16),
+    }
+
+
+def is_binary(chunk: bytes) -> bool:
+    return sniff_chunk(chunk)[0] is not None
+
+
+def per_call(function, chunk: bytes, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        function(chunk)
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    for chunk in samples().values():
+        assert legacy_is_binary(chunk) == is_binary(chunk)
+
+    print(f'{"sample":32} {"legacy µs":>10} {"new µs":>10} {"speedup":>8}')
+    for name, chunk in samples().items():
+        legacy = per_call(legacy_is_binary, chunk, args.rounds)
+        current = per_call(is_binary, chunk, args.rounds)
+        print(f'{name:32} {legacy:10.2f} {current:10.2f} {legacy / current:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
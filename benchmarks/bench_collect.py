@@ -0,0 +1,89 @@
+"""Benchmark: os.walk-based collection vs. the os.scandir collector.
+
+Generates a deep synthetic tree, runs the previous os.walk implementation of
+DefaultFileCollector.collect and the current one, checks that both produce
+the same tree and file list and prints the collection time of each.
+
+    python benchmarks/bench_collect.py --depth 12 --fanout 3 --files-per-dir 8
+"""
+
+import argparse
+import os
+from pathlib import Path
+import tempfile
+import time
+
+from code2md.exclusions import ExclusionRules
+from code2md.file_collector import DefaultFileCollector
+
+
+def generate_deep_tree(root: Path, depth: int, fanout: int, files_per_dir: int) -> int:
+    """Creates a tree with ``fanout`` subdirectories per level; returns the number of files."""
+    created = 0
+    level = [root]
+    for _ in range(depth):
+        next_level = []
+        for directory in level:
+            directory.mkdir(parents=True, exist_ok=True)
+            for i in range(files_per_dir):
+                (directory / f'module_{i}.py').write_text('x = 1\n')
+                created += 1
+            next_level.extend(directory / f'pkg_{i}' for i in range(fanout))
+        level = next_level[:5000]
+    return created
+
+
+def legacy_collect(start_path: Path, rules: ExclusionRules) -> tuple[list[str], list[Path]]:
+    """The os.walk implementation that DefaultFileCollector used before os.scandir."""
+    project_tree = []
+    files_to_include = []
+    for root, dirs, files in os.walk(start_path, topdown=True):
+        dirs[:] = [d for d in sorted(dirs) if rules.include_dir(d)]
+        root_path = Path(root)
+        level = len(root_path.relative_to(start_path).parts)
+        if level > 0:
+            project_tree.append(f'{"    " * level}📂 {root_path.name}/')
+        sub_indent = '    ' * (level + 1)
+        for filename in sorted(files):
+            if rules.include_file(filename):
+                files_to_include.append(root_path / filename)
+                project_tree.append(f'{sub_indent}📄 {filename}')
+    return project_tree, files_to_include
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--depth', type=int, default=12)
+    parser.add_argument('--fanout', type=int, default=3)
+    parser.add_argument('--files-per-dir', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='code2md-bench-') as tmp:
+        start_path = Path(tmp) / 'project'
+        files = generate_deep_tree(start_path, args.depth, args.fanout, args.files_per_dir)
+        print(f'tree: {files} files, depth {args.depth}')
+
+        rules = ExclusionRules(set(), set(), set(), True)
+        legacy_times = []
+        scandir_times = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            legacy_tree, legacy_files = legacy_collect(start_path, rules)
+            legacy_times.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            tree, entries = DefaultFileCollector().collect_entries(start_path, set(), set(), set(), True)
+            scandir_times.append(time.perf_counter() - started)
+
+        assert tree == legacy_tree, 'tree differs'
+        assert [entry.path for entry in entries] == legacy_files, 'file list differs'
+
+        legacy_best = min(legacy_times)
+        scandir_best = min(scandir_times)
+        print(f'os.walk:    {legacy_best:7.3f}s')
+        print(f'os.scandir: {scandir_best:7.3f}s  x{legacy_best / scandir_best:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Microbenchmark: per-pattern fnmatch vs. compiled ExclusionRules.
+
+Checks a mix of realistic file and directory names against the general,
+Python and frontend presets plus a few user globs, verifies that both
+implementations agree on every name and prints names/sec for each.
+
+    python benchmarks/bench_exclusions.py --names 200000
+"""
+
+import argparse
+import fnmatch
+from pathlib import Path
+import random
+import time
+
+from code2md.consts import (
+    FRONTEND_DEFAULT_EXCLUDED_DIRS,
+    FRONTEND_DEFAULT_EXCLUDED_EXTENSIONS,
+    FRONTEND_DEFAULT_EXCLUDED_FILES,
+    GENERAL_EXCLUDED_DIRS,
+    GENERAL_EXCLUDED_EXTENSIONS,
+    GENERAL_EXCLUDED_FILES,
+    PYTHON_DEFAULT_EXCLUDED_DIRS,
+    PYTHON_DEFAULT_EXCLUDED_EXTENSIONS,
+    PYTHON_DEFAULT_EXCLUDED_FILES,
+)
+from code2md.exclusions import ExclusionRules
+
+USER_DIRS = {'migrations', 'fixtures', '*.egg-info', 'tmp*', 'generated_[0-9]*'}
+USER_FILES = {'*.min.js', '*.map', 'config.local.*', 'secrets?.json'}
+USER_EXTENSIONS = {'.log', '.bak', '.orig'}
+
+SAMPLE_NAMES = [
+    'main.py',
+    'README.md',
+    'index.ts',
+    'app.min.js',
+    'bundle.js.map',
+    'package-lock.json',
+    'node_modules',
+    'src',
+    'build',
+    'tests',
+    '__pycache__',
+    'mod.cpython-311.pyc',
+    '.env',
+    'config.local.json',
+    'Makefile',
+    'setup.cfg',
+    'foo.egg-info',
+    'migrations',
+    'tmp_cache',
+    'generated_01',
+    'component.tsx',
+    'styles.scss',
+    'server.log',
+    'yarn.lock',
+    'notes.txt',
+]
+
+
+def legacy_should_include(name, excluded_dirs, excluded_files, excluded_extensions, exclude_dotfiles, is_dir):
+    """The pre-compilation implementation of DefaultFileCollector._should_include."""
+
+    def matches(patterns):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+    if exclude_dotfiles and name.startswith('.'):
+        return False
+    if is_dir:
+        return not matches(excluded_dirs)
+    if matches(excluded_files):
+        return False
+    return Path(name).suffix.lower() not in excluded_extensions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--names', type=int, default=200_000)
+    args = parser.parse_args()
+
+    excluded_dirs = GENERAL_EXCLUDED_DIRS | PYTHON_DEFAULT_EXCLUDED_DIRS | FRONTEND_DEFAULT_EXCLUDED_DIRS | USER_DIRS
+    excluded_files = (
+        GENERAL_EXCLUDED_FILES | PYTHON_DEFAULT_EXCLUDED_FILES | FRONTEND_DEFAULT_EXCLUDED_FILES | USER_FILES
+    )
+    excluded_extensions = (
+        GENERAL_EXCLUDED_EXTENSIONS
+        | PYTHON_DEFAULT_EXCLUDED_EXTENSIONS
+        | FRONTEND_DEFAULT_EXCLUDED_EXTENSIONS
+        | USER_EXTENSIONS
+    )
+    print(f'patterns: {len(excluded_dirs)} dirs, {len(excluded_files)} files, {len(excluded_extensions)} extensions')
+
+    rnd = random.Random(0)
+    names = [(rnd.choice(SAMPLE_NAMES), rnd.random() < 0.2) for _ in range(args.names)]
+
+    started = time.perf_counter()
+    legacy = [
+        legacy_should_include(name, excluded_dirs, excluded_files, excluded_extensions, True, is_dir)
+        for name, is_dir in names
+    ]
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rules = ExclusionRules(excluded_dirs, excluded_files, excluded_extensions, True)
+    compiled = [rules.include_dir(name) if is_dir else rules.include_file(name) for name, is_dir in names]
+    compiled_time = time.perf_counter() - started
+
+    assert legacy == compiled, 'compiled rules disagree with fnmatch'
+    print(f'fnmatch per pattern: {len(names) / legacy_time:12,.0f} names/sec')
+    print(f'compiled rules:      {len(names) / compiled_time:12,.0f} names/sec  x{legacy_time / compiled_time:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import io
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, TextIO
+
+from code2md.budget import FileBudget
+from code2md.cache import BlockCache, MemoryCacheSession
+from code2md.encoding_detection import DEFAULT_ENCODINGS
+from code2md.file_writer import MarkdownFileWriter, RenderedFile
+from code2md.interfaces import AsyncFileWriter, AsyncSink, FileEntry
+from code2md.stats import SnapshotHooks
+from code2md.tokens import TokenEstimator
+
+if TYPE_CHECKING:
+    from code2md.outline import Outliner
+
+_SINK_BUFFER = 1 << 20
+
+
+class AsyncFileSink(AsyncSink):
+    """Запись в файл: текст копится в буфере и сбрасывается на диск в отдельном потоке.
+
+    Файл открывается в текстовом режиме, как у MarkdownFileWriter, поэтому байты
+    результата (включая перевод строк на Windows) совпадают с синхронной записью.
+    """
+
+    def __init__(self, path: Path, buffer_size: int = _SINK_BUFFER) -> None:
+        self.path = path
+        self.buffer_size = buffer_size
+        self._file: TextIO | None = None
+        self._parts: list[str] = []
+        self._buffered = 0
+
+    async def write(self, text: str) -> None:
+        self._parts.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_size:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if self._file is None:
+            self._file = await asyncio.to_thread(self.path.open, 'w', encoding='utf-8')
+        chunk = ''.join(self._parts)
+        self._parts = []
+        self._buffered = 0
+        await asyncio.to_thread(self._file.write, chunk)
+
+    async def aclose(self) -> None:
+        await self._flush()
+        await asyncio.to_thread(self._file.close)
+
+
+class StreamSink(AsyncSink):
+    """Запись в asyncio.StreamWriter (сокет, pipe) в UTF-8 с учётом обратного давления."""
+
+    def __init__(self, writer: asyncio.StreamWriter, close_writer: bool = False) -> None:
+        self.writer = writer
+        self.close_writer = close_writer
+
+    async def write(self, text: str) -> None:
+        self.writer.write(text.encode('utf-8'))
+        await self.writer.drain()
+
+    async def aclose(self) -> None:
+        await self.writer.drain()
+        if self.close_writer:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+
+class MemorySink(AsyncSink):
+    """Накопление результата в памяти; текст доступен через getvalue()."""
+
+    def __init__(self) -> None:
+        self._buffer = io.StringIO()
+
+    async def write(self, text: str) -> None:
+        self._buffer.write(text)
+
+    def getvalue(self) -> str:
+        return self._buffer.getvalue()
+
+
+class AsyncMarkdownFileWriter(AsyncFileWriter):
+    """Асинхронный вариант MarkdownFileWriter с тем же результатом.
+
+    Формирование блоков делегируется MarkdownFileWriter: файлы читаются в собственном
+    пуле из concurrency потоков пачками по _BATCH_SIZE, при этом в работе одновременно
+    не больше concurrency пачек, а готовые блоки передаются в приёмник строго в исходном порядке. Бюджет
+    рассчитывается в потоке; работа с кешем выполняется в потоке цикла событий,
+    поэтому BlockCache должен быть создан в нём же.
+    """
+
+    _BATCH_SIZE = 16
+
+    def __init__(
+        self,
+        verbose: bool = False,
+        concurrency: int = 8,
+        cache: BlockCache | MemoryCacheSession | None = None,
+        budget: FileBudget | None = None,
+        token_estimator: TokenEstimator | None = None,
+        hooks: SnapshotHooks | None = None,
+        dedup: bool = False,
+        outliner: Optional['Outliner'] = None,
+        encodings: tuple[str, ...] = DEFAULT_ENCODINGS,
+    ) -> None:
+        self.concurrency = max(concurrency, 1)
+        self._renderer = MarkdownFileWriter(
+            verbose=verbose,
+            cache=cache,
+            budget=budget,
+            token_estimator=token_estimator,
+            hooks=hooks,
+            dedup=dedup,
+            outliner=outliner,
+            encodings=encodings,
+        )
+
+    @property
+    def truncated(self) -> list[tuple[str, str]]:
+        return self._renderer.truncated
+
+    @property
+    def counters(self) -> dict[str, int]:
+        return self._renderer.counters
+
+    def encoding_counts(self) -> dict[str, int]:
+        return self._renderer.encoding_counts()
+
+    async def write(
+        self,
+        sink: AsyncSink,
+        project_tree: list[str],
+        files_to_include: list[FileEntry | Path],
+        start_path: Path,
+        use_markers: bool = False,
+    ) -> None:
+        """Записывает структуру проекта и содержимое файлов в асинхронный приёмник.
+
+        Args:
+            sink: Приёмник результата; закрывается по завершении записи
+            project_tree: Список строк дерева проекта
+            files_to_include: Список файлов для включения (FileEntry от сборщика или пути)
+            start_path: Путь к корневой директории проекта
+            use_markers: Добавлять ли явные маркеры начала/конца файла
+        """
+        renderer = self._renderer
+        renderer.start_run(start_path, use_markers)
+
+        header = renderer.render_header(project_tree, start_path)
+        renderer.count_tokens(header)
+        await sink.write(header)
+
+        entries = [FileEntry.from_path(item, start_path) for item in files_to_include]
+        if renderer.budget is not None:
+            # План бюджета опрашивает stat всех файлов, поэтому строится вне цикла событий
+            plans = await asyncio.to_thread(list, renderer.budget.plan(entries))
+        else:
+            plans = [(entry, None) for entry in entries]
+
+        loop = asyncio.get_running_loop()
+        pending: deque[asyncio.Future[list[RenderedFile]]] = deque()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='code2md-async')
+        try:
+            # Файлы отдаются в пул пачками: переход между потоком и циклом событий
+            # на каждый мелкий файл обходится дороже самого чтения
+            for start in range(0, len(plans), self._BATCH_SIZE):
+                batch = plans[start : start + self._BATCH_SIZE]
+                pending.append(loop.run_in_executor(executor, self._render_batch, batch, use_markers))
+                if len(pending) >= self.concurrency:
+                    await self._emit(sink, await pending.popleft(), use_markers)
+
+            while pending:
+                await self._emit(sink, await pending.popleft(), use_markers)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        summary = renderer.render_summary()
+        if summary:
+            await sink.write(summary)
+        await sink.aclose()
+        renderer.log_counters()
+
+    def _render_batch(self, batch: list[tuple[FileEntry, int | None]], use_markers: bool) -> list[RenderedFile]:
+        return [self._renderer.render_file(entry, use_markers, max_bytes) for entry, max_bytes in batch]
+
+    async def _emit(self, sink: AsyncSink, rendered_batch: list[RenderedFile], use_markers: bool) -> None:
+        blocks = []
+        for rendered in rendered_batch:
+            block = self._renderer.finish_block(rendered, use_markers)
+            if isinstance(block, str):
+                self._renderer.count_tokens(block)
+                blocks.append(block)
+                continue
+
+            # Большой файл дочитывается кусками в потоке, не блокируя цикл событий
+            await sink.write(''.join(blocks))
+            blocks = []
+            parts = iter(block)
+            while True:
+                part = await asyncio.to_thread(next, parts, None)
+                if part is None:
+                    break
+                self._renderer.count_tokens(part)
+                await sink.write(part)
+        await sink.write(''.join(blocks))
@@ -0,0 +1,401 @@
+import argparse
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import json
+import os
+from pathlib import Path
+import time
+from typing import Any, NamedTuple
+
+from code2md.consts import OUTLINE_MODES
+from code2md.encoding_detection import DEFAULT_ENCODINGS
+from code2md.file_collector import DefaultFileCollector
+from code2md.file_writer import MarkdownFileWriter
+from code2md.git_collector import GitCollectorError, GitFileCollector
+from code2md.interfaces import StreamingFileCollector
+from code2md.options import (
+    build_budget,
+    build_encodings,
+    build_exclusions,
+    format_byte_size,
+    parse_byte_size,
+    split_list,
+)
+
+# Ключи проекта в манифесте; совпадают с длинными опциями code2md (через подчёркивание)
+_PROJECT_KEYS = {
+    'path',
+    'output_dir',
+    'exclude_dirs',
+    'exclude_files',
+    'exclude_extensions',
+    'exclude_dotfiles',
+    'include_paths',
+    'exclude_paths',
+    'add_python_defaults',
+    'add_frontend_defaults',
+    'git',
+    'dedup',
+    'outline',
+    'encodings',
+    'max_file_bytes',
+    'max_total_bytes',
+    'max_files',
+    'max_tokens',
+    'tokenizer',
+    'priority',
+    'priority_patterns',
+}
+_SIZE_KEYS = ('max_file_bytes', 'max_total_bytes')
+
+
+class ManifestError(RuntimeError):
+    """Некорректный манифест пакетного запуска."""
+
+
+class ProjectJob(NamedTuple):
+    """Задание на снимок одного проекта из манифеста."""
+
+    start_path: Path
+    output_file: Path
+    options: dict[str, Any]
+
+
+class ProjectReport(NamedTuple):
+    """Итог снимка одного проекта."""
+
+    path: str
+    output_file: str
+    ok: bool
+    files: int = 0
+    output_bytes: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+    warning: str | None = None
+
+
+def load_manifest(manifest_path: Path, output_dir: Path | None = None) -> list[ProjectJob]:
+    """Читает манифест и строит задания.
+
+    Манифест — JSON-объект ``{"defaults": {...}, "projects": [...]}`` или просто список
+    проектов. Проект задаётся строкой пути или объектом с ключом ``path`` и опциями
+    code2md (``exclude_dirs``, ``add_python_defaults``, ``max_tokens`` и т.д.); опции
+    из ``defaults`` применяются ко всем проектам. Относительные пути считаются от
+    директории манифеста. Допускается и текстовый манифест: по пути на строку,
+    пустые строки и строки с ``#`` пропускаются.
+
+    Args:
+        manifest_path: Путь к манифесту
+        output_dir: Общая директория для результатов (по умолчанию — директория проекта)
+
+    Returns:
+        Список заданий в порядке манифеста
+
+    Raises:
+        ManifestError: Если манифест не читается или содержит ошибки
+    """
+    try:
+        text = manifest_path.read_text(encoding='utf-8')
+    except OSError as exc:
+        raise ManifestError(f'cannot read manifest: {exc}') from exc
+
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = [line.strip() for line in text.splitlines() if line.strip() and not line.lstrip().startswith('#')]
+
+    if isinstance(data, dict):
+        defaults = data.get('defaults', {})
+        projects = data.get('projects', [])
+    else:
+        defaults, projects = {}, data
+    if not isinstance(defaults, dict) or not isinstance(projects, list):
+        raise ManifestError('manifest must be a list of projects or {"defaults": {...}, "projects": [...]}')
+
+    base_dir = manifest_path.resolve().parent
+    jobs = []
+    outputs: dict[Path, Path] = {}
+    for index, project in enumerate(projects, 1):
+        options = {**defaults, **({'path': project} if isinstance(project, str) else project)}
+        unknown = set(options) - _PROJECT_KEYS
+        if unknown:
+            raise ManifestError(f'project #{index}: unknown options: {", ".join(sorted(unknown))}')
+        if 'path' not in options:
+            raise ManifestError(f'project #{index}: "path" is required')
+
+        for key in _SIZE_KEYS:
+            if isinstance(options.get(key), str):
+                try:
+                    options[key] = parse_byte_size(options[key])
+                except ValueError as exc:
+                    raise ManifestError(f'project #{index}: {key}: {exc}') from None
+        if options.get('outline') is True:
+            options['outline'] = 'skeleton'
+        if options.get('outline') not in (None, False, *OUTLINE_MODES):
+            raise ManifestError(f'project #{index}: outline: expected true, {" or ".join(map(repr, OUTLINE_MODES))}')
+        if 'encodings' in options:
+            try:
+                options['encodings'] = build_encodings(options['encodings'])
+            except ValueError as exc:
+                raise ManifestError(f'project #{index}: encodings: {exc}') from None
+
+        start_path = (base_dir / options.pop('path')).resolve()
+        project_output_dir = options.pop('output_dir', None)
+        if project_output_dir is not None:
+            target_dir = (base_dir / project_output_dir).resolve()
+        else:
+            target_dir = output_dir or start_path
+        output_file = target_dir / f'{start_path.name}_structure.md'
+
+        if output_file in outputs:
+            raise ManifestError(
+                f'project #{index}: {start_path} and {outputs[output_file]} would both write {output_file}'
+            )
+        outputs[output_file] = start_path
+        jobs.append(ProjectJob(start_path, output_file, options))
+
+    return jobs
+
+
+def snapshot_project(job: ProjectJob) -> ProjectReport:
+    """Снимает один проект через collect() и write(); выполняется в процессе пула.
+
+    Любая ошибка проекта возвращается в отчёте, а не пробрасывается, чтобы не
+    затрагивать остальные проекты.
+    """
+    started = time.perf_counter()
+    options = job.options
+    warning = None
+    if not job.start_path.is_dir():
+        return ProjectReport(
+            str(job.start_path),
+            str(job.output_file),
+            ok=False,
+            seconds=time.perf_counter() - started,
+            error=f'NotADirectoryError: not a directory: {job.start_path}',
+        )
+
+    try:
+        excluded_dirs, excluded_files, excluded_extensions = build_exclusions(
+            options.get('add_python_defaults', False),
+            options.get('add_frontend_defaults', False),
+            options.get('exclude_dirs'),
+            options.get('exclude_files'),
+            options.get('exclude_extensions'),
+        )
+        excluded_files.add(job.output_file.name)
+        budget, token_estimator = build_budget(
+            options.get('max_file_bytes'),
+            options.get('max_total_bytes'),
+            options.get('max_files'),
+            options.get('max_tokens'),
+            options.get('tokenizer', 'heuristic'),
+            options.get('priority', 'depth'),
+            split_list(options.get('priority_patterns')),
+        )
+        collect_kwargs = {
+            'start_path': job.start_path,
+            'excluded_dirs': excluded_dirs,
+            'excluded_files': excluded_files,
+            'excluded_extensions': excluded_extensions,
+            'exclude_dotfiles': options.get('exclude_dotfiles', True),
+            'include_paths': split_list(options.get('include_paths')),
+            'exclude_paths': split_list(options.get('exclude_paths')),
+        }
+
+        collector: StreamingFileCollector = DefaultFileCollector()
+        if options.get('git'):
+            try:
+                project_tree, files_to_include = GitFileCollector().collect_entries(**collect_kwargs)
+            except GitCollectorError as exc:
+                warning = f'git listing failed, walked the directory instead: {exc}'
+                project_tree, files_to_include = collector.collect_entries(**collect_kwargs)
+        else:
+            project_tree, files_to_include = collector.collect_entries(**collect_kwargs)
+
+        job.output_file.parent.mkdir(parents=True, exist_ok=True)
+        outliner = None
+        if options.get('outline'):
+            from code2md.outline import Outliner
+
+            # Проекты и так снимаются в процессах пула, поэтому структура извлекается на месте
+            outliner = Outliner(options['outline'], processes=1)
+        try:
+            writer = MarkdownFileWriter(
+                budget=budget,
+                token_estimator=token_estimator,
+                dedup=options.get('dedup', False),
+                outliner=outliner,
+                encodings=options.get('encodings', DEFAULT_ENCODINGS),
+            )
+            writer.write(job.output_file, project_tree, files_to_include, job.start_path, use_markers=True)
+        finally:
+            if outliner is not None:
+                outliner.close()
+        size = job.output_file.stat().st_size
+    except Exception as exc:  # noqa: BLE001
+        return ProjectReport(
+            str(job.start_path),
+            str(job.output_file),
+            ok=False,
+            seconds=time.perf_counter() - started,
+            error=f'{type(exc).__name__}: {exc}',
+        )
+
+    return ProjectReport(
+        str(job.start_path),
+        str(job.output_file),
+        ok=True,
+        files=len(files_to_include),
+        output_bytes=size,
+        seconds=time.perf_counter() - started,
+        warning=warning,
+    )
+
+
+def run_batch(
+    jobs: list[ProjectJob],
+    workers: int | None = None,
+    on_report: Any | None = None,
+) -> list[ProjectReport]:
+    """Снимает проекты на общем пуле процессов.
+
+    Проекты раздаются пулу целиком, поэтому общее время определяется числом ядер,
+    а не числом проектов. Если процесс пула аварийно завершился (например, по
+    нехватке памяти), незавершённые проекты один раз перезапускаются в новом пуле,
+    а при повторном сбое помечаются как ошибочные.
+
+    Args:
+        jobs: Задания из load_manifest()
+        workers: Число процессов (по умолчанию — число ядер)
+        on_report: Вызывается с каждым готовым ProjectReport по мере завершения
+
+    Returns:
+        Отчёты в порядке заданий
+    """
+    reports: dict[int, ProjectReport] = {}
+    pending = list(range(len(jobs)))
+    retried: set[int] = set()
+
+    while pending:
+        broken = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures: dict[Future, int] = {executor.submit(snapshot_project, jobs[index]): index for index in pending}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    report = future.result()
+                except BrokenProcessPool:
+                    broken.append(index)
+                    continue
+                reports[index] = report
+                if on_report is not None:
+                    on_report(report)
+
+        pending = []
+        for index in sorted(broken):
+            if index in retried:
+                job = jobs[index]
+                report = ProjectReport(
+                    str(job.start_path), str(job.output_file), ok=False, error='worker process terminated abruptly'
+                )
+                reports[index] = report
+                if on_report is not None:
+                    on_report(report)
+            else:
+                retried.add(index)
+                pending.append(index)
+
+    return [reports[index] for index in range(len(jobs))]
+
+
+def main() -> None:
+    """Entry point for the code2md-batch CLI."""
+    parser = argparse.ArgumentParser(
+        description='Snapshot many projects listed in a manifest on a shared process pool.',
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        'manifest',
+        help='JSON manifest ({"defaults": {...}, "projects": [...]}) or a text file with one project path per line.\n'
+        'Project options use code2md long option names with underscores (e.g. "exclude_dirs", "max_tokens").',
+    )
+    parser.add_argument(
+        '-o',
+        '--output-dir',
+        help='Directory for all resulting Markdown files (default: each project directory).',
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of worker processes (default: number of CPUs).',
+    )
+    parser.add_argument(
+        '--report',
+        help='Write the aggregate report as JSON to this file.',
+    )
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error(f'expected a positive number of jobs, got {args.jobs}')
+
+    output_dir = Path(args.output_dir).resolve() if args.output_dir else None
+    try:
+        jobs = load_manifest(Path(args.manifest), output_dir)
+    except ManifestError as exc:
+        parser.error(str(exc))
+
+    done = 0
+
+    def on_report(report: ProjectReport) -> None:
+        nonlocal done
+        done += 1
+        if report.ok:
+            print(
+                f'[{done}/{len(jobs)}] ✅ {report.path} — {report.files} files, '
+                f'{format_byte_size(report.output_bytes)}, {report.seconds:.2f} s'
+            )
+            if report.warning:
+                print(f'    ⚠️ {report.warning}')
+        else:
+            print(f'[{done}/{len(jobs)}] ❌ {report.path} — {report.error}')
+
+    started = time.perf_counter()
+    reports = run_batch(jobs, args.jobs, on_report)
+    elapsed = time.perf_counter() - started
+
+    print()
+    print('📊 Batch report:')
+    width = max((len(report.path) for report in reports), default=0)
+    for report in reports:
+        status = '✅' if report.ok else '❌'
+        print(
+            f'  {status} {report.path:<{width}}  {report.files:>7} files  '
+            f'{format_byte_size(report.output_bytes):>10}  {report.seconds:>7.2f} s'
+        )
+
+    succeeded = [report for report in reports if report.ok]
+    print(
+        f'✅ {len(succeeded)}/{len(reports)} projects, {sum(r.files for r in succeeded)} files, '
+        f'{format_byte_size(sum(r.output_bytes for r in succeeded))} in {elapsed:.2f} s '
+        f'(sum of project times {sum(r.seconds for r in reports):.2f} s, {args.jobs} workers)'
+    )
+
+    if args.report:
+        Path(args.report).write_text(
+            json.dumps(
+                {'elapsed': elapsed, 'workers': args.jobs, 'projects': [report._asdict() for report in reports]},
+                ensure_ascii=False,
+                indent=2,
+            ),
+            encoding='utf-8',
+        )
+        print(f'📝 Report saved to: {args.report}')
+
+    if len(succeeded) != len(reports):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,414 @@
+"""Built-in code2md benchmark suite.
+
+Generates a synthetic project tree with the given shape, times the collect
+(DefaultFileCollector.collect) and write (MarkdownFileWriter.write) phases
+separately, reports files/s, MB/s and peak RSS, and saves the results as JSON
+so that runs of different versions can be compared:
+
+    code2md-bench --files 20000 --output before.json
+    code2md-bench --files 20000 --output after.json --compare before.json
+
+Every run also measures the CLI startup cost (`python -X importtime -c "import
+code2md.main"`, median of several fresh interpreters) and exits with status 1
+when it exceeds --import-budget, so a CI job can enforce it on its own:
+
+    code2md-bench --startup-only --import-budget 40
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import importlib.metadata
+import json
+import math
+import multiprocessing
+import os
+from pathlib import Path
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, NamedTuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from code2md.file_collector import DefaultFileCollector
+from code2md.file_writer import MarkdownFileWriter
+from code2md.options import build_exclusions
+
+RESULT_FORMAT = 1
+
+# Бюджет времени импорта точки входа CLI по умолчанию (кумулятивное время из -X importtime)
+IMPORT_BUDGET_MS = 50.0
+STARTUP_MODULE = 'code2md.main'
+
+_SOURCE_SUFFIXES = ('.py', '.ts', '.js', '.md', '.json', '.go', '.rs', '.txt')
+_WORDS = ('value', 'result', 'config', 'handler', 'index', 'buffer', 'items', 'count', 'token', 'state')
+
+
+class TreeSpec(NamedTuple):
+    """Параметры синтетического дерева проекта."""
+
+    files: int = 10_000
+    depth: int = 4
+    fanout: int = 8
+    size_median: int = 2048
+    size_sigma: float = 1.0
+    max_size: int = 1 << 20
+    binary_ratio: float = 0.02
+    non_utf8_ratio: float = 0.01
+    node_modules_files: int = 2_000
+    seed: int = 0
+
+
+class TreeStats(NamedTuple):
+    """Что фактически создано генератором."""
+
+    files: int
+    directories: int
+    total_bytes: int
+    binary: int
+    non_utf8: int
+    excluded: int
+
+
+def _text_payload(rnd: random.Random, size: int) -> bytes:
+    lines = []
+    total = 0
+    while total < size:
+        line = f'{rnd.choice(_WORDS)}_{rnd.randrange(1000)} = {rnd.randrange(1 << 20)}\n'
+        lines.append(line)
+        total += len(line)
+    return ''.join(lines).encode('utf-8')[:size]
+
+
+def _directories(root: Path, depth: int, fanout: int) -> list[Path]:
+    """Строит список директорий дерева глубиной depth с fanout потомками на уровень."""
+    directories = [root]
+    level = [root]
+    for _ in range(depth):
+        level = [parent / f'pkg_{i}' for parent in level for i in range(fanout)]
+        directories.extend(level)
+        if len(directories) > 50_000:
+            break
+    return directories
+
+
+def generate_tree(root: Path, spec: TreeSpec) -> TreeStats:
+    """Создаёт синтетическое дерево проекта; одинаковый spec даёт одинаковое дерево.
+
+    Размеры файлов распределены логнормально с медианой size_median. Доля
+    binary_ratio файлов содержит NUL-байты, доля non_utf8_ratio — текст в cp1251.
+    Отдельно создаётся node_modules с node_modules_files файлами, который должен
+    отсекаться исключениями по умолчанию для frontend-проектов.
+    """
+    rnd = random.Random(spec.seed)
+    directories = _directories(root, spec.depth, spec.fanout)
+    for directory in directories:
+        directory.mkdir(parents=True, exist_ok=True)
+
+    total_bytes = binary = non_utf8 = 0
+    mu = math.log(max(spec.size_median, 1))
+    for i in range(spec.files):
+        directory = directories[rnd.randrange(len(directories))]
+        size = min(int(rnd.lognormvariate(mu, spec.size_sigma)), spec.max_size)
+        roll = rnd.random()
+        if roll < spec.binary_ratio:
+            path = directory / f'blob_{i}.bin'
+            payload = b'\0' + rnd.randbytes(max(size - 1, 0))
+            binary += 1
+        elif roll < spec.binary_ratio + spec.non_utf8_ratio:
+            path = directory / f'legacy_{i}.txt'
+            payload = ('Привет, мир\n' * (size // 12 + 1)).encode('cp1251')[:size]
+            non_utf8 += 1
+        else:
+            path = directory / f'module_{i}{rnd.choice(_SOURCE_SUFFIXES)}'
+            payload = _text_payload(rnd, size)
+        path.write_bytes(payload)
+        total_bytes += len(payload)
+
+    excluded = 0
+    for i in range(spec.node_modules_files):
+        package = root / 'node_modules' / f'package_{i % 100}' / 'lib'
+        package.mkdir(parents=True, exist_ok=True)
+        (package / f'index_{i}.js').write_bytes(_text_payload(rnd, 512))
+        excluded += 1
+
+    return TreeStats(spec.files, len(directories), total_bytes, binary, non_utf8, excluded)
+
+
+def _peak_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _drop_caches() -> None:
+    os.sync()
+    Path('/proc/sys/vm/drop_caches').write_text('3\n')
+
+
+def measure_once(start_path: Path, output_file: Path, jobs: int = 1, drop_caches: bool = False) -> dict[str, Any]:
+    """Один прогон сбора и записи; выполняется в отдельном процессе ради честного пикового RSS."""
+    if drop_caches:
+        _drop_caches()
+
+    excluded_dirs, excluded_files, excluded_extensions = build_exclusions(add_frontend_defaults=True)
+    excluded_files.add(output_file.name)
+
+    started = time.perf_counter()
+    project_tree, files_to_include = DefaultFileCollector().collect_entries(
+        start_path, excluded_dirs, excluded_files, excluded_extensions, True
+    )
+    collect_seconds = time.perf_counter() - started
+
+    input_bytes = 0
+    for entry in files_to_include:
+        with contextlib.suppress(OSError):
+            input_bytes += entry.size
+
+    started = time.perf_counter()
+    MarkdownFileWriter(jobs=jobs).write(output_file, project_tree, files_to_include, start_path, use_markers=True)
+    write_seconds = time.perf_counter() - started
+
+    return {
+        'files': len(files_to_include),
+        'input_bytes': input_bytes,
+        'output_bytes': output_file.stat().st_size,
+        'collect_seconds': collect_seconds,
+        'write_seconds': write_seconds,
+        'peak_rss_bytes': _peak_rss_bytes(),
+    }
+
+
+def summarize(runs: list[dict[str, Any]]) -> dict[str, Any]:
+    """Медианы по прогонам и производные показатели пропускной способности."""
+    collect = statistics.median(run['collect_seconds'] for run in runs)
+    write = statistics.median(run['write_seconds'] for run in runs)
+    files = runs[0]['files']
+    input_mb = runs[0]['input_bytes'] / (1 << 20)
+    peaks = [run['peak_rss_bytes'] for run in runs if run['peak_rss_bytes'] is not None]
+    return {
+        'files': files,
+        'collect_seconds': collect,
+        'write_seconds': write,
+        'total_seconds': collect + write,
+        'collect_files_per_second': files / collect if collect else None,
+        'write_files_per_second': files / write if write else None,
+        'write_mb_per_second': input_mb / write if write else None,
+        'peak_rss_mb': max(peaks) / (1 << 20) if peaks else None,
+    }
+
+
+def run_benchmark(
+    start_path: Path,
+    repeat: int = 3,
+    jobs: int = 1,
+    drop_caches: bool = False,
+) -> list[dict[str, Any]]:
+    """Выполняет repeat прогонов, каждый в свежем процессе."""
+    runs = []
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory(prefix='code2md-bench-out-') as out_dir:
+        output_file = Path(out_dir) / 'snapshot.md'
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                runs.append(executor.submit(measure_once, start_path, output_file, jobs, drop_caches).result())
+    return runs
+
+
+def measure_import_time(module: str = STARTUP_MODULE, repeat: int = 5) -> float:
+    """Медиана кумулятивного времени импорта модуля в миллисекундах по -X importtime.
+
+    Каждый замер — свежий интерпретатор; первый запуск (прогрев .pyc и кеша ФС) отбрасывается.
+    PYTHONDONTWRITEBYTECODE для замеров снимается: иначе при устаревших .pyc каждый замер
+    включал бы компиляцию модулей.
+
+    Raises:
+        RuntimeError: Если импорт не удался или модуля нет в отчёте -X importtime
+    """
+    env = {name: value for name, value in os.environ.items() if name != 'PYTHONDONTWRITEBYTECODE'}
+    timings = []
+    for attempt in range(repeat + 1):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            capture_output=True,
+            text=True,
+            check=False,
+            env=env,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f'import {module} failed: {completed.stderr.strip().splitlines()[-1:]}')
+        cumulative = None
+        for line in completed.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            _, _, fields = line.partition('import time:')
+            parts = fields.split('|')
+            if len(parts) == 3 and parts[2].strip() == module:
+                cumulative = int(parts[1])
+        if cumulative is None:
+            raise RuntimeError(f'{module} not found in -X importtime output')
+        if attempt:
+            timings.append(cumulative / 1000)
+    return statistics.median(timings)
+
+
+def _check_import_budget(import_ms: float, budget_ms: float) -> bool:
+    """Печатает время импорта и сообщает, уложилось ли оно в бюджет (budget_ms <= 0 — без бюджета)."""
+    line = f'🚀 import {STARTUP_MODULE}: {import_ms:.1f} ms'
+    if budget_ms <= 0:
+        print(line)
+        return True
+    within = import_ms <= budget_ms
+    print(f'{line} {"✅ within" if within else "❌ over"} the {budget_ms:g} ms budget')
+    return within
+
+
+def _package_version() -> str:
+    try:
+        return importlib.metadata.version('code2md')
+    except importlib.metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+def _print_summary(summary: dict[str, Any], baseline: dict[str, Any] | None = None) -> None:
+    rows = [
+        ('collect', 'collect_seconds', 's', False),
+        ('write', 'write_seconds', 's', False),
+        ('total', 'total_seconds', 's', False),
+        ('collect files/s', 'collect_files_per_second', '', True),
+        ('write files/s', 'write_files_per_second', '', True),
+        ('write MB/s', 'write_mb_per_second', '', True),
+        ('peak RSS MB', 'peak_rss_mb', '', False),
+        ('import ms', 'import_ms', '', False),
+    ]
+    for label, key, unit, higher_is_better in rows:
+        value = summary.get(key)
+        if value is None:
+            continue
+        line = f'  {label:<16} {value:>12.3f}{unit}'
+        previous = (baseline or {}).get(key)
+        if previous:
+            change = (value - previous) / previous
+            better = change > 0 if higher_is_better else change < 0
+            marker = '🟢' if better else '🔴' if abs(change) > 0.02 else '⚪'
+            line += f'   {marker} {change:+.1%} vs {previous:.3f}'
+        print(line)
+
+
+def main() -> None:
+    """Entry point for the code2md-bench CLI."""
+    defaults = TreeSpec()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--files', type=int, default=defaults.files, help='Number of project files.')
+    parser.add_argument('--depth', type=int, default=defaults.depth, help='Directory tree depth.')
+    parser.add_argument('--fanout', type=int, default=defaults.fanout, help='Subdirectories per directory.')
+    parser.add_argument('--size-median', type=int, default=defaults.size_median, help='Median file size, bytes.')
+    parser.add_argument('--size-sigma', type=float, default=defaults.size_sigma, help='Log-normal size spread.')
+    parser.add_argument('--binary-ratio', type=float, default=defaults.binary_ratio)
+    parser.add_argument('--non-utf8-ratio', type=float, default=defaults.non_utf8_ratio)
+    parser.add_argument(
+        '--node-modules-files',
+        type=int,
+        default=defaults.node_modules_files,
+        help='Files placed in an excluded node_modules directory.',
+    )
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--tree', help='Benchmark an existing directory instead of generating one.')
+    parser.add_argument('--keep', help='Generate the tree into this directory and keep it.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs; medians are reported.')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='MarkdownFileWriter jobs.')
+    parser.add_argument('--drop-caches', action='store_true', help='Drop the Linux page cache before each run.')
+    parser.add_argument('--output', help='Save the results as JSON to this file.')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against.')
+    parser.add_argument(
+        '--import-budget',
+        type=float,
+        default=IMPORT_BUDGET_MS,
+        help=f'Fail (exit status 1) when importing {STARTUP_MODULE} takes longer, ms (default: {IMPORT_BUDGET_MS:g};\n'
+        '0 disables the check).',
+    )
+    parser.add_argument(
+        '--startup-only',
+        action='store_true',
+        help='Only measure the import time against --import-budget; skip the tree benchmark.',
+    )
+    args = parser.parse_args()
+
+    import_ms = measure_import_time()
+    if args.startup_only:
+        if not _check_import_budget(import_ms, args.import_budget):
+            raise SystemExit(1)
+        return
+
+    spec = TreeSpec(
+        args.files,
+        args.depth,
+        args.fanout,
+        args.size_median,
+        args.size_sigma,
+        defaults.max_size,
+        args.binary_ratio,
+        args.non_utf8_ratio,
+        args.node_modules_files,
+        args.seed,
+    )
+
+    with tempfile.TemporaryDirectory(prefix='code2md-bench-') as tmp:
+        tree_stats = None
+        if args.tree:
+            start_path = Path(args.tree).resolve()
+        else:
+            start_path = Path(args.keep).resolve() if args.keep else Path(tmp) / 'project'
+            started = time.perf_counter()
+            tree_stats = generate_tree(start_path, spec)
+            print(
+                f'🌱 Generated {tree_stats.files} files ({tree_stats.total_bytes / (1 << 20):.1f} MB, '
+                f'{tree_stats.directories} dirs, {tree_stats.excluded} in node_modules) '
+                f'in {time.perf_counter() - started:.1f} s'
+            )
+
+        runs = run_benchmark(start_path, args.repeat, args.jobs, args.drop_caches)
+
+    summary = summarize(runs)
+    summary['import_ms'] = import_ms
+    result = {
+        'format': RESULT_FORMAT,
+        'code2md_version': _package_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'spec': spec._asdict() if not args.tree else {'tree': str(start_path)},
+        'tree': tree_stats._asdict() if tree_stats else None,
+        'jobs': args.jobs,
+        'drop_caches': args.drop_caches,
+        'runs': runs,
+        'summary': summary,
+    }
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8')).get('summary')
+
+    print(f'📊 {summary["files"]} files, median of {len(runs)} runs:')
+    _print_summary(summary, baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2), encoding='utf-8')
+        print(f'📝 Results saved to: {args.output}')
+
+    if not _check_import_budget(import_ms, args.import_budget):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+TEXT_BYTES = bytes(range(32, 127)) + b'\n\r\t\f\b'
+BINARY_THRESHOLD = 0.30
+
+# Сигнатуры распространённых бинарных форматов: (смещение, байты, название).
+# Каждая сигнатура содержит нулевой байт, поэтому распознавание по ней никогда
+# не расходится с общей проверкой и лишь даёт ответ раньше и с названием формата.
+MAGIC_SIGNATURES = (
+    (0, b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR', 'png'),
+    (0, b'\xff\xd8\xff\xe0\x00\x10JFIF\x00', 'jpeg'),
+    (0, b'\x00\x00\x01\x00', 'ico'),
+    (0, b'\x00\x01\x00\x00\x00', 'ttf'),
+    (0, b'PK\x03\x04\x14\x00', 'zip'),
+    (0, b'PK\x03\x04\n\x00', 'zip'),
+    (0, b'PK\x03\x04-\x00', 'zip'),
+    (0, b'\x1f\x8b\x08\x00', 'gzip'),
+    (0, b"7z\xbc\xaf'\x1c\x00", '7z'),
+    (0, b'SQLite format 3\x00', 'sqlite'),
+    (0, b'\x7fELF\x01\x01\x01\x00', 'elf'),
+    (0, b'\x7fELF\x02\x01\x01\x00', 'elf'),
+    (0, b'\xcf\xfa\xed\xfe\x07\x00\x00\x01', 'mach-o'),
+    (0, b'\xcf\xfa\xed\xfe\x0c\x00\x00\x01', 'mach-o'),
+    (0, b'MZ\x90\x00', 'pe'),
+    (0, b'\xca\xfe\xba\xbe\x00\x00', 'java-class'),
+    (0, b'\x00asm', 'wasm'),
+    (257, b'ustar\x00', 'tar'),
+)
+
+_PREFIX_SIGNATURES = tuple(signature for offset, signature, _ in MAGIC_SIGNATURES if offset == 0)
+
+
+def detect_magic(chunk: bytes) -> str | None:
+    """Возвращает название формата по сигнатуре в начале файла или None."""
+    if chunk.startswith(_PREFIX_SIGNATURES):
+        for offset, signature, kind in MAGIC_SIGNATURES:
+            if offset == 0 and chunk.startswith(signature):
+                return kind
+    for offset, signature, kind in MAGIC_SIGNATURES:
+        if offset and chunk.startswith(signature, offset):
+            return kind
+    return None
@@ -0,0 +1,68 @@
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+
+from code2md.interfaces import FileEntry
+
+FilePlan = tuple[FileEntry, int | None]
+
+
+class FileBudget(ABC):
+    """Решает, какие файлы выводить целиком, какие обрезать, а какие пропустить.
+
+    Пропущенные файлы вместе с причиной накапливаются в omitted и выводятся
+    в итоговом разделе результата.
+    """
+
+    def __init__(self) -> None:
+        self.omitted: list[tuple[str, str]] = []
+
+    @abstractmethod
+    def plan(self, entries: Iterable[FileEntry]) -> Iterator[FilePlan]:
+        """Отдаёт включаемые файлы вместе с лимитом байт (None — целиком)."""
+
+
+class SizeBudget(FileBudget):
+    """Ограничения по размеру: на файл, на весь результат и на число файлов.
+
+    Решения принимаются по размеру из stat до чтения файла, в порядке файлов,
+    поэтому результат не зависит от числа потоков. Файл больше max_file_bytes
+    выводится с обрезкой середины и учитывается в общем бюджете как max_file_bytes;
+    файл, не помещающийся в остаток общего бюджета, пропускается, а следующие
+    файлы поменьше ещё могут в него попасть.
+    """
+
+    def __init__(
+        self,
+        max_file_bytes: int | None = None,
+        max_total_bytes: int | None = None,
+        max_files: int | None = None,
+    ) -> None:
+        super().__init__()
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_files = max_files
+
+    def plan(self, entries: Iterable[FileEntry]) -> Iterator[FilePlan]:
+        self.omitted = []
+        included = 0
+        total = 0
+
+        for entry in entries:
+            if self.max_files is not None and included >= self.max_files:
+                self.omitted.append((entry.relative_path, f'превышен лимит числа файлов ({self.max_files})'))
+                continue
+
+            if self.max_total_bytes is not None:
+                try:
+                    size = entry.size
+                except OSError:
+                    size = 0
+                if self.max_file_bytes is not None:
+                    size = min(size, self.max_file_bytes)
+                if total + size > self.max_total_bytes:
+                    self.omitted.append((entry.relative_path, f'не помещается в общий бюджет ({size} байт)'))
+                    continue
+                total += size
+
+            included += 1
+            yield entry, self.max_file_bytes
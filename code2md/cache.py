@@ -0,0 +1,317 @@
+from collections import OrderedDict
+from pathlib import Path
+import time
+
+from code2md.interfaces import FileEntry
+
+DEFAULT_CACHE_MAX_BYTES = 256 << 20
+
+# Меняется при любом изменении формата блоков, чтобы старые записи не переиспользовались
+_FORMAT_VERSION = 4
+# Файл, изменённый позже начала прогона минус этот запас, мог измениться ещё раз в пределах
+# точности mtime (FAT — 2 с): такой записи нельзя верить по stat, только по хешу содержимого
+_RACY_NS = 2_000_000_000
+# mtime «сомнительной» записи: не совпадает ни с каким stat, поэтому файл сверяется по хешу
+_RACY_MTIME = -1
+
+
+def _trusted_mtime(mtime_ns: int, run_stamp: int) -> int:
+    """mtime для записи кеша: настоящий или _RACY_MTIME, если файл изменён слишком недавно."""
+    return mtime_ns if mtime_ns < run_stamp - _RACY_NS else _RACY_MTIME
+
+
+class BlockCache:
+    """Постоянный кеш отрендеренных Markdown-блоков файлов.
+
+    Запись хранится по ключу (пространство имён, относительный путь) вместе с размером,
+    mtime и хешем содержимого файла. Блок считается актуальным, если размер и mtime_ns
+    совпадают со stat файла; тогда файл не читается вовсе. Иначе файл читается, и если
+    хеш прочитанного совпал с сохранённым (файл «тронули», но не изменили), блок всё
+    равно берётся из кеша, а stat записи обновляется. Файлы, изменённые незадолго до
+    прогона, сохраняются без mtime: правку того же размера в пределах точности mtime
+    по stat не заметить, поэтому они сверяются только по хешу. Пространство имён включает
+    корень проекта и параметры рендеринга, поэтому разные настройки не смешиваются.
+
+    Все обращения к базе выполняются из потока, создавшего кеш.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        # sqlite3 и logging нужны только с --cache-dir, поэтому не загружаются при импорте модуля
+        import logging
+        import sqlite3
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._run_stamp = time.time_ns()
+        self._namespace = ''
+        self._fresh: dict[str, tuple[int, int, str | None]] = {}
+        self._touched: list[tuple[int, str, str]] = []
+        self._connection = sqlite3.connect(cache_dir / 'blocks.sqlite3')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS blocks ('
+            ' namespace TEXT NOT NULL,'
+            ' path TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' mtime_ns INTEGER NOT NULL,'
+            ' digest TEXT,'
+            ' block TEXT NOT NULL,'
+            ' length INTEGER NOT NULL,'
+            ' last_used INTEGER NOT NULL,'
+            ' PRIMARY KEY (namespace, path))'
+        )
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def make_namespace(*parts: object) -> str:
+        """Строит пространство имён из корня проекта и параметров рендеринга."""
+        import hashlib
+
+        key = '\0'.join(str(part) for part in (_FORMAT_VERSION, *parts))
+        return hashlib.sha1(key.encode('utf-8'), usedforsecurity=False).hexdigest()
+
+    def open_namespace(self, namespace: str) -> None:
+        """Загружает метаданные записей пространства имён для проверки без чтения файлов.
+
+        Повторное открытие того же пространства имён (например, при каждом обновлении
+        в --watch) ничего не перечитывает: store() и revalidate() поддерживают метаданные.
+        """
+        if namespace == self._namespace:
+            return
+        self._namespace = namespace
+        self._fresh = {
+            path: (size, mtime_ns, digest)
+            for path, size, mtime_ns, digest in self._connection.execute(
+                'SELECT path, size, mtime_ns, digest FROM blocks WHERE namespace = ?', (namespace,)
+            )
+        }
+
+    def is_fresh(self, entry: FileEntry) -> bool:
+        """Проверяет, что блок файла есть в кеше и файл с тех пор не менялся.
+
+        Только читает словарь метаданных, поэтому безопасен для вызова из рабочих потоков.
+        """
+        cached = self._fresh.get(entry.relative_path)
+        if cached is None:
+            return False
+        try:
+            stat = entry.stat()
+        except OSError:
+            return False
+        return cached[:2] == (stat.st_size, stat.st_mtime_ns)
+
+    def matches(self, entry: FileEntry, digest: str | None) -> bool:
+        """Проверяет, что в кеше есть блок файла с тем же хешем содержимого, что у только что прочитанного.
+
+        Как и is_fresh(), только читает словарь метаданных. После совпадения блок берётся
+        через load_with_digest(), а stat записи обновляет revalidate().
+        """
+        cached = self._fresh.get(entry.relative_path)
+        return digest is not None and cached is not None and cached[2] == digest
+
+    def load(self, entry: FileEntry) -> str:
+        """Возвращает блок файла, для которого is_fresh() вернул True."""
+        return self.load_with_digest(entry)[0]
+
+    def load_with_digest(self, entry: FileEntry) -> tuple[str, str | None]:
+        """Возвращает блок файла, для которого is_fresh() вернул True, и сохранённый хеш содержимого."""
+        row = self._connection.execute(
+            'SELECT block, digest FROM blocks WHERE namespace = ? AND path = ?', (self._namespace, entry.relative_path)
+        ).fetchone()
+        self.hits += 1
+        self._touched.append((self._run_stamp, self._namespace, entry.relative_path))
+        return row[0], row[1]
+
+    def store(self, entry: FileEntry, block: str, digest: str | None) -> None:
+        """Сохраняет свежеотрендеренный блок файла."""
+        self.misses += 1
+        try:
+            stat = entry.stat()
+        except OSError:
+            return
+        mtime_ns = _trusted_mtime(stat.st_mtime_ns, self._run_stamp)
+        self._fresh[entry.relative_path] = (stat.st_size, mtime_ns, digest)
+        self._connection.execute(
+            'INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                self._namespace,
+                entry.relative_path,
+                stat.st_size,
+                mtime_ns,
+                digest,
+                block,
+                len(block),
+                self._run_stamp,
+            ),
+        )
+
+    def revalidate(self, entry: FileEntry) -> None:
+        """Обновляет размер и mtime записи, содержимое которой совпало по хешу (см. matches())."""
+        try:
+            stat = entry.stat()
+        except OSError:
+            return
+        cached = self._fresh.get(entry.relative_path)
+        if cached is None:
+            return
+        mtime_ns = _trusted_mtime(stat.st_mtime_ns, self._run_stamp)
+        self._fresh[entry.relative_path] = (stat.st_size, mtime_ns, cached[2])
+        self._connection.execute(
+            'UPDATE blocks SET size = ?, mtime_ns = ? WHERE namespace = ? AND path = ?',
+            (stat.st_size, mtime_ns, self._namespace, entry.relative_path),
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self) -> None:
+        """Фиксирует изменения и вытесняет давно неиспользованные блоки сверх max_bytes.
+
+        Размер блоков учитывается в символах, что для исходников практически равно байтам.
+        """
+        connection = self._connection
+        connection.executemany('UPDATE blocks SET last_used = ? WHERE namespace = ? AND path = ?', self._touched)
+
+        total = 0
+        stale = []
+        for namespace, path, length in connection.execute(
+            'SELECT namespace, path, length FROM blocks ORDER BY last_used DESC'
+        ):
+            total += length
+            if total > self.max_bytes:
+                stale.append((namespace, path))
+
+        connection.executemany('DELETE FROM blocks WHERE namespace = ? AND path = ?', stale)
+        self.evicted += len(stale)
+        connection.commit()
+        connection.close()
+
+        self.logger.info(
+            f'Кеш блоков: попаданий {self.hits}, промахов {self.misses} ({self.hit_rate:.1%}), вытеснено {self.evicted}'
+        )
+
+
+class MemoryBlockCache:
+    """Общий для нескольких запросов кеш блоков в памяти (для долгоживущего процесса).
+
+    Хранит те же записи, что и BlockCache, но в OrderedDict с вытеснением давно
+    неиспользованных блоков сверх max_bytes. Запросы работают с ним через session(),
+    у которой интерфейс BlockCache; все обращения к хранилищу идут под блокировкой.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.total = 0
+        self.evicted = 0
+        self._blocks: OrderedDict[tuple[str, str], tuple[int, int, str, str | None]] = OrderedDict()
+        # Общий кеш в памяти создаёт только сервис, так что обычный запуск не загружает threading
+        import threading
+
+        self._lock = threading.Lock()
+
+    def session(self) -> 'MemoryCacheSession':
+        """Возвращает представление кеша для одного запроса."""
+        return MemoryCacheSession(self)
+
+    def get(self, namespace: str, path: str) -> tuple[int, int, str, str | None] | None:
+        with self._lock:
+            record = self._blocks.get((namespace, path))
+            if record is not None:
+                self._blocks.move_to_end((namespace, path))
+            return record
+
+    def put(self, namespace: str, path: str, size: int, mtime_ns: int, block: str, digest: str | None = None) -> None:
+        key = (namespace, path)
+        with self._lock:
+            previous = self._blocks.pop(key, None)
+            if previous is not None:
+                self.total -= len(previous[2])
+            self._blocks[key] = (size, mtime_ns, block, digest)
+            self.total += len(block)
+            while self.total > self.max_bytes and self._blocks:
+                _, (_, _, evicted_block, _) = self._blocks.popitem(last=False)
+                self.total -= len(evicted_block)
+                self.evicted += 1
+
+
+class MemoryCacheSession:
+    """Представление MemoryBlockCache для одного запроса с интерфейсом BlockCache.
+
+    Блок, признанный актуальным в is_fresh(), запоминается в сессии, чтобы его не
+    вытеснил параллельный запрос до вызова load().
+    """
+
+    def __init__(self, shared: MemoryBlockCache) -> None:
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self._run_stamp = time.time_ns()
+        self._namespace = ''
+        self._pinned: dict[str, tuple[str, str | None]] = {}
+
+    @property
+    def evicted(self) -> int:
+        return self.shared.evicted
+
+    def open_namespace(self, namespace: str) -> None:
+        self._namespace = namespace
+        self._pinned = {}
+
+    def is_fresh(self, entry: FileEntry) -> bool:
+        record = self.shared.get(self._namespace, entry.relative_path)
+        if record is None:
+            return False
+        try:
+            stat = entry.stat()
+        except OSError:
+            return False
+        if record[:2] != (stat.st_size, stat.st_mtime_ns):
+            return False
+        self._pinned[entry.relative_path] = record[2:]
+        return True
+
+    def matches(self, entry: FileEntry, digest: str | None) -> bool:
+        record = self.shared.get(self._namespace, entry.relative_path)
+        if digest is None or record is None or record[3] != digest:
+            return False
+        self._pinned[entry.relative_path] = record[2:]
+        return True
+
+    def load(self, entry: FileEntry) -> str:
+        return self.load_with_digest(entry)[0]
+
+    def load_with_digest(self, entry: FileEntry) -> tuple[str, str | None]:
+        self.hits += 1
+        return self._pinned.pop(entry.relative_path)
+
+    def store(self, entry: FileEntry, block: str, digest: str | None) -> None:
+        self.misses += 1
+        try:
+            stat = entry.stat()
+        except OSError:
+            return
+        mtime_ns = _trusted_mtime(stat.st_mtime_ns, self._run_stamp)
+        self.shared.put(self._namespace, entry.relative_path, stat.st_size, mtime_ns, block, digest)
+
+    def revalidate(self, entry: FileEntry) -> None:
+        record = self.shared.get(self._namespace, entry.relative_path)
+        if record is None:
+            return
+        try:
+            stat = entry.stat()
+        except OSError:
+            return
+        mtime_ns = _trusted_mtime(stat.st_mtime_ns, self._run_stamp)
+        self.shared.put(self._namespace, entry.relative_path, stat.st_size, mtime_ns, *record[2:])
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self) -> None:
+        self._pinned = {}
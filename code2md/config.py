@@ -0,0 +1,263 @@
+import os
+from pathlib import Path
+from typing import Any
+
+from code2md.consts import OUTLINE_MODES
+from code2md.formats import FORMATS
+from code2md.options import build_encodings, parse_byte_size, split_list
+from code2md.output import COMPRESSIONS
+from code2md.tokens import PRIORITIES
+
+CONFIG_FILE = '.code2md.toml'
+PYPROJECT_FILE = 'pyproject.toml'
+PYPROJECT_TABLE = 'tool.code2md'
+
+# Увеличивается при изменении набора ключей или правил разбора: старые записи кеша не подойдут
+CONFIG_CACHE_VERSION = 1
+
+# Ключи конфигурации; совпадают с длинными опциями code2md (через подчёркивание)
+_LIST_KEYS = (
+    'exclude_dirs',
+    'exclude_files',
+    'exclude_extensions',
+    'include_paths',
+    'exclude_paths',
+    'priority_patterns',
+    'encodings',
+)
+_BOOL_KEYS = ('exclude_dotfiles', 'add_python_defaults', 'add_frontend_defaults', 'git', 'dedup', 'index')
+_POSITIVE_INT_KEYS = ('jobs', 'max_files', 'max_tokens')
+_SIZE_KEYS = ('max_file_bytes', 'max_total_bytes')
+_PATH_KEYS = ('output_dir', 'cache_dir')
+_CHOICE_KEYS = {'format': tuple(FORMATS), 'compress': tuple(COMPRESSIONS), 'priority': PRIORITIES}
+CONFIG_KEYS = frozenset(
+    (*_LIST_KEYS, *_BOOL_KEYS, *_POSITIVE_INT_KEYS, *_SIZE_KEYS, *_PATH_KEYS, *_CHOICE_KEYS, 'tokenizer', 'outline')
+)
+
+
+class ConfigError(RuntimeError):
+    """Некорректный файл конфигурации или неизвестный профиль."""
+
+
+def find_config(start_path: Path) -> Path | None:
+    """Ищет конфигурацию в корне проекта: .code2md.toml, иначе pyproject.toml.
+
+    Наличие таблицы [tool.code2md] в pyproject.toml проверяет load_config.
+    """
+    for name in (CONFIG_FILE, PYPROJECT_FILE):
+        candidate = start_path / name
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def default_cache_dir() -> Path:
+    """Директория кеша разобранных конфигураций: $XDG_CACHE_HOME/code2md, иначе ~/.cache/code2md."""
+    base = os.environ.get('XDG_CACHE_HOME')
+    return (Path(base) if base else Path.home() / '.cache') / 'code2md' / 'config'
+
+
+def load_config(
+    config_path: Path,
+    profile: str | None = None,
+    cache_dir: Path | None = None,
+) -> dict[str, Any]:
+    """Читает опции проекта из .code2md.toml или таблицы [tool.code2md] в pyproject.toml.
+
+    Ключи верхнего уровня задают опции по умолчанию, таблица profiles.<имя> — именованные
+    профили, ключи которых заменяют одноимённые ключи верхнего уровня. Размеры можно
+    задавать строкой ("64M"), списки — массивом или строкой через запятую, outline = true
+    означает 'skeleton'; относительные output_dir и cache_dir считаются от директории
+    файла конфигурации.
+
+    Итог (проверенные опции выбранного профиля) кешируется в cache_dir по пути файла
+    и профилю; запись действительна, пока не изменились mtime и размер файла, так что
+    повторные запуски не разбирают TOML и не сводят профиль заново.
+
+    Args:
+        config_path: Путь к файлу конфигурации
+        profile: Имя профиля или None (только опции верхнего уровня)
+        cache_dir: Директория кеша (по умолчанию default_cache_dir(); при ошибках записи кеш не ведётся)
+
+    Returns:
+        Опции в виде {dest argparse: значение}; пустой словарь, если в pyproject.toml нет [tool.code2md]
+
+    Raises:
+        ConfigError: Если файл не читается, содержит ошибки или профиль не найден
+    """
+    # json и hashlib нужны только при найденной конфигурации, запуск без неё их не загружает
+    import json
+
+    config_path = config_path.resolve()
+    try:
+        stat = config_path.stat()
+    except OSError as exc:
+        raise ConfigError(f'cannot read config: {exc}') from exc
+
+    cache_file = (cache_dir or default_cache_dir()) / _cache_name(config_path, profile)
+    key = {
+        'version': CONFIG_CACHE_VERSION,
+        'config': os.fspath(config_path),
+        'profile': profile,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+    }
+    try:
+        cached = json.loads(cache_file.read_bytes())
+    except (OSError, ValueError):
+        cached = None
+    if isinstance(cached, dict) and cached.get('key') == key:
+        return cached['options']
+
+    try:
+        data = config_path.read_bytes()
+    except OSError as exc:
+        raise ConfigError(f'cannot read config: {exc}') from exc
+
+    is_pyproject = config_path.name == PYPROJECT_FILE
+    if is_pyproject and b'code2md' not in data:
+        # В pyproject.toml без упоминания code2md разбирать (и кешировать) нечего
+        if profile is not None:
+            raise ConfigError(f'{config_path}: no [{PYPROJECT_TABLE}] table for profile "{profile}"')
+        return {}
+
+    table: Any = _parse_toml(data, config_path)
+    if is_pyproject:
+        tool = table.get('tool')
+        table = tool.get('code2md') if isinstance(tool, dict) else None
+    if table is None and profile is None:
+        options: dict[str, Any] = {}
+    elif table is None:
+        raise ConfigError(f'{config_path}: no [{PYPROJECT_TABLE}] table for profile "{profile}"')
+    elif not isinstance(table, dict):
+        raise ConfigError(f'{config_path}: [{PYPROJECT_TABLE}] must be a table')
+    else:
+        options = _resolve_profile(table, profile, config_path)
+    _write_cache(cache_file, {'key': key, 'options': options})
+    return options
+
+
+def _cache_name(config_path: Path, profile: str | None) -> str:
+    import hashlib
+
+    digest = hashlib.sha1(f'{config_path}\0{profile or ""}'.encode('utf-8', 'surrogateescape'))
+    return f'{digest.hexdigest()}.json'
+
+
+def _write_cache(cache_file: Path, record: dict[str, Any]) -> None:
+    """Атомарно сохраняет запись кеша; ошибки записи не мешают запуску."""
+    import json
+
+    temp_file = cache_file.with_name(f'{cache_file.name}.{os.getpid()}.tmp')
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file.write_text(json.dumps(record, ensure_ascii=False), encoding='utf-8')
+        os.replace(temp_file, cache_file)
+    except OSError:
+        temp_file.unlink(missing_ok=True)
+
+
+def _parse_toml(data: bytes, config_path: Path) -> dict[str, Any]:
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError as exc:
+            raise ConfigError('reading config requires Python 3.11+ or the tomli package (pip install tomli)') from exc
+
+    try:
+        return tomllib.loads(data.decode('utf-8'))
+    except (UnicodeDecodeError, tomllib.TOMLDecodeError) as exc:
+        raise ConfigError(f'{config_path}: {exc}') from None
+
+
+def _resolve_profile(table: dict[str, Any], profile: str | None, config_path: Path) -> dict[str, Any]:
+    """Сводит опции верхнего уровня с профилем и проверяет их."""
+    profiles = table.get('profiles', {})
+    if not isinstance(profiles, dict):
+        raise ConfigError(f'{config_path}: "profiles" must be a table')
+
+    options = {key: value for key, value in table.items() if key != 'profiles'}
+    unknown = set(options) - CONFIG_KEYS
+    if unknown:
+        raise ConfigError(f'{config_path}: unknown options: {", ".join(sorted(unknown))}')
+
+    if profile is not None:
+        if profile not in profiles:
+            available = ', '.join(sorted(profiles)) or 'none defined'
+            raise ConfigError(f'{config_path}: unknown profile "{profile}" (available: {available})')
+        overrides = profiles[profile]
+        if not isinstance(overrides, dict):
+            raise ConfigError(f'{config_path}: profile "{profile}" must be a table')
+        unknown = set(overrides) - CONFIG_KEYS
+        if unknown:
+            raise ConfigError(f'{config_path}: profile "{profile}": unknown options: {", ".join(sorted(unknown))}')
+        options.update(overrides)
+
+    try:
+        return {key: _check_value(key, value, config_path.parent) for key, value in options.items()}
+    except (TypeError, ValueError) as exc:
+        raise ConfigError(f'{config_path}: {exc}') from None
+
+
+def _check_value(key: str, value: Any, base_dir: Path) -> Any:
+    """Проверяет значение опции и приводит его к виду, который дала бы командная строка.
+
+    Raises:
+        TypeError: Если тип значения не подходит для опции
+        ValueError: Если значение недопустимо
+    """
+    if key in _LIST_KEYS:
+        if not isinstance(value, str) and not (
+            isinstance(value, list) and all(isinstance(item, str) for item in value)
+        ):
+            raise TypeError(f'{key}: expected a string or an array of strings')
+        items = split_list(value)
+        if key == 'encodings':
+            try:
+                build_encodings(items)
+            except ValueError as exc:
+                raise ValueError(f'encodings: {exc}') from None
+        return items
+
+    if key in _BOOL_KEYS:
+        if not isinstance(value, bool):
+            raise TypeError(f'{key}: expected true or false')
+        return value
+
+    if key in _POSITIVE_INT_KEYS:
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError(f'{key}: expected a positive integer, got {value!r}')
+        return value
+
+    if key in _SIZE_KEYS:
+        if isinstance(value, str):
+            return parse_byte_size(value)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise ValueError(f'{key}: expected a size such as 65536 or "64K", got {value!r}')
+        return value
+
+    if key in _PATH_KEYS:
+        if not isinstance(value, str):
+            raise TypeError(f'{key}: expected a path string')
+        return os.fspath((base_dir / Path(value).expanduser()).resolve())
+
+    if key == 'outline':
+        if value is True:
+            return 'skeleton'
+        if value is False:
+            return None
+        if value not in OUTLINE_MODES:
+            raise ValueError(f'outline: expected true, false, {" or ".join(map(repr, OUTLINE_MODES))}')
+        return value
+
+    if key == 'tokenizer':
+        if not isinstance(value, str):
+            raise TypeError('tokenizer: expected a string')
+        return value
+
+    choices = _CHOICE_KEYS[key]
+    if value not in choices:
+        raise ValueError(f'{key}: expected one of {", ".join(map(repr, choices))}, got {value!r}')
+    return value
@@ -1,3 +1,8 @@
+# Режимы --outline: skeleton — структура вместо содержимого там, где её удаётся извлечь, остальные
+# файлы целиком; structure — только структура, содержимое остальных текстовых файлов опускается.
+# Лежат здесь, чтобы разбор аргументов не загружал code2md.outline (ast, threading)
+OUTLINE_MODES = ('skeleton', 'structure')
+
 PYTHON_DEFAULT_EXCLUDED_DIRS = {
     '__pycache__',
     '.venv',
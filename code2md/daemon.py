@@ -0,0 +1,420 @@
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+import contextlib
+import io
+import json
+import os
+from pathlib import Path
+import signal
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Any, BinaryIO
+
+from code2md.cache import DEFAULT_CACHE_MAX_BYTES, MemoryBlockCache
+from code2md.file_collector import DefaultFileCollector
+from code2md.file_writer import MarkdownFileWriter
+from code2md.git_collector import GitCollectorError, GitFileCollector
+from code2md.interfaces import FileEntry, TreeItem
+from code2md.options import build_budget, build_encodings
+from code2md.stats import SnapshotHooks
+from code2md.tokens import TokenEstimatorError
+
+if TYPE_CHECKING:
+    from code2md.outline import Outliner
+
+PROTOCOL_VERSION = 1
+
+# Заголовок кадра ответа: длина полезной нагрузки; кадр нулевой длины завершает поток
+_FRAME = struct.Struct('>I')
+_FRAME_SIZE = 64 << 10
+_MAX_REQUEST_BYTES = 4 << 20
+_MAX_JOBS = 32
+# Запас на точность mtime: изменения директории моложе него не отличить от уже учтённых (FAT — 2 с)
+_MTIME_SLACK_NS = 2_000_000_000
+
+
+class DaemonError(RuntimeError):
+    """Ошибка обмена с сервером code2md или ошибка, которую вернул сервер."""
+
+
+def default_socket_path() -> Path:
+    """Путь сокета по умолчанию: в XDG_RUNTIME_DIR или во временной директории пользователя."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return Path(runtime_dir) / 'code2md.sock'
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return Path(tempfile.gettempdir()) / f'code2md-{uid}.sock'
+
+
+class _FrameWriter(io.RawIOBase):
+    """Поток, отправляющий всё записанное в сокет кадрами с префиксом длины."""
+
+    def __init__(self, connection: socket.socket) -> None:
+        self._connection = connection
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        payload = bytes(data)
+        if payload:
+            self._connection.sendall(_FRAME.pack(len(payload)) + payload)
+        return len(payload)
+
+
+class _DirectoryRecorder(SnapshotHooks):
+    """Запоминает директории, которые прочитал сборщик."""
+
+    def __init__(self) -> None:
+        self.directories: list[str] = []
+
+    def on_directory(self, relative_path: str, seconds: float, entries: int) -> None:
+        self.directories.append(relative_path)
+
+
+class _ProjectState:
+    """Состояние одного проекта: блокировка, статистика запросов и последний обход директорий.
+
+    Обход хранится вместе с mtime каждой прочитанной директории и подходит запросу
+    с теми же исключениями, пока ни одна из них не изменилась: создание, удаление
+    и переименование файла меняют mtime его директории. Изменения содержимого файлов
+    на обход не влияют, их замечает кеш блоков по stat.
+    """
+
+    __slots__ = ('dir_mtimes', 'lock', 'requests', 'tree', 'tree_key')
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.tree_key: tuple[Any, ...] | None = None
+        # Строки дерева и (путь, относительный путь) файлов. os.DirEntry не хранятся:
+        # их закешированный stat устарел бы к следующему запросу
+        self.tree: list[tuple[str, tuple[str, str] | None]] | None = None
+        self.dir_mtimes: dict[str, int] = {}
+
+    def cached_tree(self, key: tuple[Any, ...]) -> list[TreeItem] | None:
+        """Сохранённый обход для исключений key, если ни одна его директория с тех пор не изменилась."""
+        if self.tree is None or key != self.tree_key:
+            return None
+        for dir_path, mtime_ns in self.dir_mtimes.items():
+            try:
+                if os.stat(dir_path).st_mtime_ns != mtime_ns:
+                    return None
+            except OSError:
+                return None
+        return [TreeItem(line, FileEntry(*file) if file is not None else None) for line, file in self.tree]
+
+    def remember_tree(
+        self,
+        key: tuple[Any, ...],
+        tree_items: Iterable[TreeItem],
+        start_path: Path,
+        recorder: _DirectoryRecorder,
+    ) -> Iterator[TreeItem]:
+        """Передаёт строки обхода дальше и после последней сохраняет обход для следующих запросов.
+
+        recorder должен быть hooks сборщика, выдающего tree_items. Обход не сохраняется,
+        если какая-то директория изменилась во время него или незадолго до начала:
+        такое изменение mtime могло не отразить.
+        """
+        self.tree = None
+        started_ns = time.time_ns()
+        tree = []
+        for item in tree_items:
+            file = item.file
+            tree.append((item.line, (file.fspath, file.relative_path) if file is not None else None))
+            yield item
+
+        dir_mtimes = {}
+        for relative_dir in recorder.directories:
+            dir_path = os.path.join(start_path, relative_dir) if relative_dir else os.fspath(start_path)
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                return
+            if mtime_ns > started_ns - _MTIME_SLACK_NS:
+                return
+            dir_mtimes[dir_path] = mtime_ns
+        self.tree_key = key
+        self.tree = tree
+        self.dir_mtimes = dir_mtimes
+
+
+class SnapshotServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Долгоживущий сервер снимков проектов на Unix-сокете.
+
+    Каждый запрос — одна JSON-строка с путём проекта, исключениями и параметрами.
+    Ответ — Markdown, переданный кадрами с префиксом длины, и завершающая JSON-строка
+    с итогами (или с ошибкой). Процесс держит прогретыми импорты, общий кеш блоков
+    в памяти и последний обход директорий каждого проекта, поэтому повторный снимок
+    неизменённого проекта сводится к stat директорий и файлов (с --git список файлов
+    по-прежнему запрашивается у git).
+
+    Память ограничена: кеш блоков — max_cache_bytes, число одновременно
+    обрабатываемых запросов — max_workers (у каждого буфер блоков до 8 МБ в памяти),
+    число проектов с сохранённым состоянием — max_projects. Запросы к одному проекту
+    выполняются по очереди, к разным — параллельно.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: Path,
+        max_cache_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        max_workers: int = 4,
+        max_projects: int = 32,
+        verbose: bool = False,
+    ) -> None:
+        self.socket_path = socket_path
+        self.cache = MemoryBlockCache(max_cache_bytes)
+        self.max_projects = max_projects
+        self.verbose = verbose
+        self._workers = threading.BoundedSemaphore(max_workers)
+        self._projects: OrderedDict[str, _ProjectState] = OrderedDict()
+        self._projects_lock = threading.Lock()
+        self._outliners: dict[str, Outliner] = {}
+        if verbose:
+            import logging
+
+            logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+            self.logger = logging.getLogger(__name__)
+        else:
+            self.logger = None
+
+        if socket_path.exists():
+            _remove_stale_socket(socket_path)
+        # Сокет сразу создаётся с правами 0600: chmod после bind оставлял бы окно,
+        # в которое к серверу мог подключиться другой пользователь
+        previous_umask = os.umask(0o177)
+        try:
+            super().__init__(os.fspath(socket_path), _SnapshotHandler)
+        finally:
+            os.umask(previous_umask)
+
+    def project_state(self, project_path: str) -> _ProjectState:
+        """Возвращает состояние проекта, вытесняя давно неиспользованные сверх max_projects."""
+        with self._projects_lock:
+            state = self._projects.get(project_path)
+            if state is None:
+                state = self._projects[project_path] = _ProjectState()
+                while len(self._projects) > self.max_projects:
+                    oldest, oldest_state = next(iter(self._projects.items()))
+                    if oldest_state.lock.locked():
+                        break
+                    del self._projects[oldest]
+            self._projects.move_to_end(project_path)
+            return state
+
+    def outliner(self, mode: str) -> 'Outliner':
+        """Общий для всех запросов Outliner режима mode: пул процессов и кеш структуры живут вместе с сервером."""
+        from code2md.outline import Outliner
+
+        with self._projects_lock:
+            outliner = self._outliners.get(mode)
+            if outliner is None:
+                outliner = self._outliners[mode] = Outliner(mode)
+            return outliner
+
+    def server_close(self) -> None:
+        super().server_close()
+        for outliner in self._outliners.values():
+            outliner.close()
+        self.socket_path.unlink(missing_ok=True)
+
+
+class _SnapshotHandler(socketserver.StreamRequestHandler):
+    server: SnapshotServer
+
+    def handle(self) -> None:
+        line = self.rfile.readline(_MAX_REQUEST_BYTES)
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self._finish({'ok': False, 'error': 'malformed request'})
+            return
+
+        try:
+            result = self._snapshot(request)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        except (OSError, ValueError, KeyError, TypeError, TokenEstimatorError) as exc:
+            result = {'ok': False, 'error': str(exc)}
+        except Exception as exc:  # noqa: BLE001
+            # Клиент получает кадр с ошибкой вместо оборванного соединения, сервер продолжает работу
+            import logging
+
+            logging.getLogger(__name__).exception('Необработанная ошибка при снятии снимка')
+            result = {'ok': False, 'error': f'internal error: {type(exc).__name__}: {exc}'}
+        self._finish(result)
+
+    def _finish(self, result: dict[str, Any]) -> None:
+        with contextlib.suppress(OSError):
+            self.connection.sendall(_FRAME.pack(0) + json.dumps(result).encode('utf-8') + b'\n')
+
+    def _snapshot(self, request: dict[str, Any]) -> dict[str, Any]:
+        if request.get('version') != PROTOCOL_VERSION:
+            raise ValueError(f'unsupported protocol version: {request.get("version")}')
+
+        start_path = Path(request['project_path']).resolve()
+        if not start_path.is_dir():
+            raise ValueError(f'not a directory: {start_path}')
+
+        budget, token_estimator = build_budget(**request.get('budget', {}))
+        collect_kwargs = {
+            'start_path': start_path,
+            'excluded_dirs': set(request['excluded_dirs']),
+            'excluded_files': set(request['excluded_files']),
+            'excluded_extensions': set(request['excluded_extensions']),
+            'exclude_dotfiles': bool(request['exclude_dotfiles']),
+            'include_paths': list(request.get('include_paths', ())),
+            'exclude_paths': list(request.get('exclude_paths', ())),
+        }
+
+        state = self.server.project_state(os.fspath(start_path))
+        # Сначала очередь к проекту, затем слот обработчика: запросы, ждущие тот же проект, не занимают слоты
+        with state.lock, self.server._workers:
+            state.requests += 1
+            warning = None
+            tree_items: Iterable[TreeItem] | None = None
+            tree_cached = False
+            if request.get('git'):
+                try:
+                    tree_items = GitFileCollector(verbose=self.server.verbose).iter_collect(**collect_kwargs)
+                except GitCollectorError as exc:
+                    warning = f'git listing failed, walked the directory instead: {exc}'
+            if tree_items is None:
+                tree_key = _tree_key(collect_kwargs)
+                tree_items = state.cached_tree(tree_key)
+                tree_cached = tree_items is not None
+                if tree_items is None:
+                    recorder = _DirectoryRecorder()
+                    collector = DefaultFileCollector(verbose=self.server.verbose, hooks=recorder)
+                    tree_items = state.remember_tree(
+                        tree_key, collector.iter_collect(**collect_kwargs), start_path, recorder
+                    )
+
+            session = self.server.cache.session()
+            writer = MarkdownFileWriter(
+                verbose=self.server.verbose,
+                jobs=min(max(int(request.get('jobs', 1)), 1), _MAX_JOBS),
+                cache=session,
+                budget=budget,
+                token_estimator=token_estimator,
+                dedup=bool(request.get('dedup', False)),
+                outliner=self.server.outliner(request['outline']) if request.get('outline') else None,
+                encodings=build_encodings(request.get('encodings')),
+            )
+            frames = io.BufferedWriter(_FrameWriter(self.connection), _FRAME_SIZE)
+            files_processed = writer.write_binary(
+                frames, tree_items, start_path, bool(request.get('use_markers', True))
+            )
+            frames.flush()
+
+        if self.server.logger:
+            self.server.logger.info(
+                f'{start_path}: файлов {files_processed}, попаданий в кеш {session.hits}, промахов {session.misses}'
+                f'{", обход из памяти" if tree_cached else ""}'
+            )
+        return {
+            'ok': True,
+            'files_processed': files_processed,
+            'omitted': len(budget.omitted) if budget is not None else 0,
+            'truncated': len(writer.truncated),
+            'tokens': writer.counters['tokens'] if token_estimator is not None else None,
+            'duplicates': writer.counters['duplicates'],
+            'encodings': writer.encoding_counts(),
+            'cache_hits': session.hits,
+            'cache_misses': session.misses,
+            'warning': warning,
+        }
+
+
+def _tree_key(collect_kwargs: dict[str, Any]) -> tuple[Any, ...]:
+    """Ключ сохранённого обхода: корень и исключения в сравнимом виде."""
+    return tuple(
+        tuple(sorted(value)) if isinstance(value, set) else tuple(value) if isinstance(value, list) else value
+        for value in collect_kwargs.values()
+    )
+
+
+def _remove_stale_socket(socket_path: Path) -> None:
+    """Удаляет сокет, оставшийся от завершившегося сервера; занятый сокет не трогает."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(os.fspath(socket_path))
+    except OSError:
+        socket_path.unlink()
+    else:
+        raise DaemonError(f'another code2md server is already listening on {socket_path}')
+    finally:
+        probe.close()
+
+
+def _read_exactly(stream: BinaryIO, count: int) -> bytes:
+    data = stream.read(count)
+    if len(data) != count:
+        raise DaemonError('connection closed by the server')
+    return data
+
+
+def request_snapshot(socket_path: Path, request: dict[str, Any], output: BinaryIO) -> dict[str, Any]:
+    """Запрашивает снимок у сервера и пишет полученный Markdown в output.
+
+    Args:
+        socket_path: Путь к сокету сервера
+        request: Параметры запроса (путь проекта, исключения, параметры бюджета)
+        output: Бинарный поток для Markdown
+
+    Returns:
+        Итоги, которые вернул сервер
+
+    Raises:
+        DaemonError: Если сервер недоступен или вернул ошибку; к этому моменту в output
+            может быть записана часть снимка, поэтому писать стоит во временный файл
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            connection.connect(os.fspath(socket_path))
+        except OSError as exc:
+            raise DaemonError(f'cannot connect to {socket_path}: {exc}') from exc
+
+        connection.sendall(json.dumps({'version': PROTOCOL_VERSION, **request}).encode('utf-8') + b'\n')
+        with connection.makefile('rb') as stream:
+            while True:
+                (length,) = _FRAME.unpack(_read_exactly(stream, _FRAME.size))
+                if not length:
+                    break
+                output.write(_read_exactly(stream, length))
+            result = json.loads(stream.readline() or b'{}')
+    finally:
+        connection.close()
+
+    if not result.get('ok'):
+        raise DaemonError(result.get('error', 'no response from the server'))
+    return result
+
+
+def serve(
+    socket_path: Path | None = None,
+    max_cache_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    max_workers: int = 4,
+    verbose: bool = False,
+) -> None:
+    """Запускает сервер и обслуживает запросы до прерывания (Ctrl+C или SIGTERM)."""
+
+    def stop(signum: int, frame: object) -> None:
+        raise KeyboardInterrupt
+
+    previous = signal.signal(signal.SIGTERM, stop)
+    try:
+        server = SnapshotServer(socket_path or default_socket_path(), max_cache_bytes, max_workers, verbose=verbose)
+        with server:
+            server.serve_forever()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
@@ -0,0 +1,246 @@
+import codecs
+import functools
+import re
+from typing import NamedTuple
+import unicodedata
+
+from code2md.binary_detection import BINARY_THRESHOLD, TEXT_BYTES, detect_magic
+
+# Кандидаты для текста, который не является UTF-8, в порядке приоритета
+DEFAULT_ENCODINGS = ('cp1251', 'cp1252', 'latin-1')
+
+# Доля управляющих байт (кроме пробельных), выше которой текст не подбирается, а считается бинарным
+MAX_CONTROL_RATIO = 0.01
+# Штраф лучшего кандидата относительно числа не-ASCII слов, выше которого кодировка не подобрана
+# (так CJK-кодировки не выдаются за cp1251)
+MAX_PENALTY_RATIO = 0.25
+
+_CONTROL_BYTES = bytes(byte for byte in range(32) if byte not in b'\n\r\t\f\b') + b'\x7f'
+_WORD = re.compile(r'[^\W\d_]+')
+# Не-ASCII знак, который не является буквой, между двумя буквами — признак неверной кодировки
+_GLUED_SYMBOL = re.compile(r'(?<=[^\W\d_])[^\x00-\x7f\w\s](?=[^\W\d_])')
+_C1_CONTROLS = re.compile('[\x80-\x9f]')
+# Объявления кодировки: PEP 263 (в первых двух строках) и XML
+_CODING_COOKIE = re.compile(rb'^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)')
+_XML_DECLARATION = re.compile(rb'^<\?xml[^>]*\bencoding=["\']([-\w.]+)')
+
+
+class TextEncoding(NamedTuple):
+    """Кодировка текстового файла.
+
+    name — название для сводки ('utf-8', 'utf-8-sig', 'utf-16-le', 'cp1251', ...),
+    codec — кодек для декодирования содержимого после BOM длиной bom байт.
+    """
+
+    name: str
+    codec: str
+    bom: int = 0
+
+
+UTF8 = TextEncoding('utf-8', 'utf-8')
+
+# UTF-32 LE проверяется раньше UTF-16 LE: их BOM начинаются одинаково
+_BOMS = (
+    (codecs.BOM_UTF32_LE, TextEncoding('utf-32-le', 'utf-32-le', 4)),
+    (codecs.BOM_UTF32_BE, TextEncoding('utf-32-be', 'utf-32-be', 4)),
+    (codecs.BOM_UTF8, TextEncoding('utf-8-sig', 'utf-8', 3)),
+    (codecs.BOM_UTF16_LE, TextEncoding('utf-16-le', 'utf-16-le', 2)),
+    (codecs.BOM_UTF16_BE, TextEncoding('utf-16-be', 'utf-16-be', 2)),
+)
+_BOM_PREFIXES = tuple(bom for bom, _ in _BOMS)
+
+
+def check_encodings(encodings: list[str]) -> tuple[str, ...]:
+    """Проверяет, что кодеки кандидатов существуют и декодируют байты в текст.
+
+    Returns:
+        Названия кодеков в нижнем регистре, в исходном порядке
+
+    Raises:
+        ValueError: Если кодек неизвестен или не является текстовой кодировкой
+    """
+    names = []
+    for encoding in encodings:
+        try:
+            b'a'.decode(encoding)
+        except LookupError as exc:
+            raise ValueError(str(exc)) from None
+        except UnicodeDecodeError:
+            pass
+        names.append(encoding.lower())
+    return tuple(names)
+
+
+def sniff_chunk(
+    chunk: bytes,
+    encodings: tuple[str, ...] = DEFAULT_ENCODINGS,
+    complete: bool = False,
+) -> tuple[str | None, TextEncoding | None]:
+    """Определяет по начальному фрагменту файла, бинарный ли он, и кодировку текста.
+
+    Порядок проверок: BOM, сигнатура формата, нулевой байт, валидный UTF-8 (в том числе
+    с символом, разрезанным на конце фрагмента), затем подбор кодировки из encodings
+    (см. guess_encoding; объявленная в файле кодировка, если она есть среди кандидатов,
+    выбирается первой). Если подобрать не удалось, решает доля нетекстовых байт: текст
+    считается UTF-8, и ошибка проявится при декодировании. Пустой encodings отключает подбор.
+
+    Args:
+        chunk: Первые байты файла
+        encodings: Кандидаты для не-UTF-8 текста в порядке приоритета
+        complete: Содержит ли chunk файл целиком (иначе символ на конце может быть разрезан)
+
+    Returns:
+        (вид бинарного содержимого, None) или (None, кодировка текста)
+    """
+    if not chunk:
+        return None, UTF8
+
+    if chunk.startswith(_BOM_PREFIXES):
+        for bom, encoding in _BOMS:
+            if chunk.startswith(bom):
+                try:
+                    _decode_chunk(chunk[len(bom) :], encoding.codec, complete)
+                except UnicodeDecodeError:
+                    break
+                return None, encoding
+
+    kind = detect_magic(chunk)
+    if kind is not None:
+        return kind, None
+    if b'\x00' in chunk:
+        return 'nul', None
+
+    try:
+        chunk.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        if not complete and exc.start >= len(chunk) - 3 and exc.reason == 'unexpected end of data':
+            return None, UTF8
+    else:
+        return None, UTF8
+
+    encoding = guess_encoding(chunk, encodings, complete, declared_encoding(chunk, encodings))
+    if encoding is not None:
+        return None, encoding
+
+    nontext = len(chunk.translate(None, TEXT_BYTES))
+    return ('nontext', None) if nontext / len(chunk) > BINARY_THRESHOLD else (None, UTF8)
+
+
+def guess_encoding(
+    data: bytes,
+    encodings: tuple[str, ...] = DEFAULT_ENCODINGS,
+    complete: bool = True,
+    declared: str | None = None,
+) -> TextEncoding | None:
+    """Подбирает кодировку не-UTF-8 текста из списка кандидатов.
+
+    Объявленная в файле кодировка (см. declared_encoding) выбирается, если декодирует
+    данные без ошибок. Иначе каждый кандидат, декодирующий данные, получает штраф:
+    символы C1, не-ASCII знаки, вклеенные между буквами, слова, где ASCII-буквы смешаны
+    с буквами другой письменности ('cafй' — latin-1, прочитанный как cp1251), и не-ASCII
+    слова со смешанным регистром (так выглядят двухбайтовые CJK-кодировки).
+    Выбирается кандидат с наименьшим штрафом, при равенстве — более ранний; если
+    и у него штраф больше MAX_PENALTY_RATIO от числа не-ASCII слов, текст, скорее
+    всего, в кодировке не из списка.
+
+    Returns:
+        Кодировка или None, если данные похожи на бинарные или ни один кандидат не подошёл
+    """
+    controls = len(data) - len(data.translate(None, _CONTROL_BYTES))
+    if controls > len(data) * MAX_CONTROL_RATIO:
+        return None
+
+    if declared is not None:
+        try:
+            _decode_chunk(data, declared, complete)
+            return _text_encoding(declared)
+        except UnicodeDecodeError:
+            pass
+
+    best: tuple[float, str] | None = None
+    for encoding in encodings:
+        try:
+            text = _decode_chunk(data, encoding, complete)
+        except UnicodeDecodeError:
+            continue
+        penalty = _penalty(text)
+        if penalty:
+            words = sum(1 for word in _WORD.findall(text) if not word.isascii())
+            penalty = penalty / words if words else float('inf')
+        if best is None or penalty < best[0]:
+            best = (penalty, encoding)
+            if not penalty:
+                break
+    if best is None or best[0] > MAX_PENALTY_RATIO:
+        return None
+    return _text_encoding(best[1])
+
+
+def declared_encoding(chunk: bytes, encodings: tuple[str, ...] = DEFAULT_ENCODINGS) -> str | None:
+    """Кандидат из encodings, объявленный в начале файла (PEP 263 или XML), или None.
+
+    Объявление только выбирает среди кандидатов: валидный UTF-8 декодируется как UTF-8
+    при любом объявлении, а кодек не из списка не используется.
+    """
+    declared = _declared_codec(chunk)
+    if declared is None:
+        return None
+    for encoding in encodings:
+        if codecs.lookup(encoding).name == declared:
+            return encoding
+    return None
+
+
+def _text_encoding(codec: str) -> TextEncoding:
+    """Кодировка без BOM под каноническим именем кодека ('latin1' и 'ISO-8859-1' — 'iso8859-1')."""
+    name = codecs.lookup(codec).name
+    return TextEncoding(name, name)
+
+
+def _declared_codec(chunk: bytes) -> str | None:
+    """Каноническое имя кодека из объявления PEP 263 или XML, если он известен и совместим с ASCII."""
+    match = _XML_DECLARATION.match(chunk)
+    if match is None:
+        for line in chunk.split(b'\n', 2)[:2]:
+            match = _CODING_COOKIE.match(line)
+            if match is not None:
+                break
+    if match is None:
+        return None
+    name = match.group(1).decode('ascii').lower()
+    try:
+        if b'coding'.decode(name) != 'coding':
+            return None
+    except (LookupError, UnicodeDecodeError):
+        return None
+    return codecs.lookup(name).name
+
+
+def _decode_chunk(data: bytes, codec: str, complete: bool) -> str:
+    return codecs.getincrementaldecoder(codec)().decode(data, final=complete)
+
+
+def _penalty(text: str) -> int:
+    penalty = len(_C1_CONTROLS.findall(text)) + len(_GLUED_SYMBOL.findall(text))
+    for word in _WORD.findall(text):
+        if _mixes_scripts(word) or _odd_case(word):
+            penalty += 1
+    return penalty
+
+
+def _odd_case(word: str) -> bool:
+    """Не-ASCII слово с регистром, который не встречается в тексте ('ЖДАПАФґПґЩ' — EUC-KR, прочитанный как cp1251)."""
+    return not word.isascii() and not (word.islower() or word.isupper() or word.istitle())
+
+
+def _mixes_scripts(word: str) -> bool:
+    """Слово из ASCII-букв и не-латинских букв одновременно."""
+    if word.isascii():
+        return False
+    has_ascii = any(char.isascii() for char in word)
+    return has_ascii and not all(char.isascii() or _is_latin(char) for char in word)
+
+
+@functools.lru_cache(maxsize=1024)
+def _is_latin(char: str) -> bool:
+    return unicodedata.name(char, '').startswith('LATIN')
@@ -0,0 +1,210 @@
+from collections.abc import Iterable
+import fnmatch
+import os
+import re
+
+_GLOB_CHARS = frozenset('*?[')
+_CASE_INSENSITIVE = os.path.normcase('A') == 'a'
+
+
+class PatternMatcher:
+    """Набор точных имён и glob-паттернов, скомпилированный для быстрой проверки.
+
+    Точные имена проверяются поиском в хеш-таблице, все glob-паттерны объединены
+    в одно регулярное выражение. Семантика совпадает с fnmatch.fnmatch.
+    """
+
+    __slots__ = ('_exact', '_glob')
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        exact = set()
+        globs = []
+        for pattern in patterns:
+            pattern = os.path.normcase(pattern)
+            if _GLOB_CHARS.isdisjoint(pattern):
+                exact.add(pattern)
+            else:
+                globs.append(fnmatch.translate(pattern))
+
+        self._exact = frozenset(exact)
+        self._glob = re.compile('|'.join(globs)).match if globs else None
+
+    def matches(self, name: str) -> bool:
+        """Проверяет совпадение имени хотя бы с одним паттерном."""
+        if _CASE_INSENSITIVE:
+            name = os.path.normcase(name)
+        if name in self._exact:
+            return True
+        return self._glob is not None and self._glob(name) is not None
+
+
+def translate_path_glob(pattern: str) -> str:
+    """Переводит glob относительного пути в регулярное выражение.
+
+    В отличие от fnmatch, '*', '?' и '[...]' не пересекают '/', а '**' совпадает с любым
+    числом директорий: 'src/**/*.py' подходит и для 'src/a.py', и для 'src/a/b/c.py'.
+    Паттерн сопоставляется с путём от корня проекта целиком; совпавшая директория
+    захватывает и всё своё содержимое ('docs/_build' — это и 'docs/_build/html/index.html').
+    """
+    pattern = pattern.strip('/')
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        char = pattern[i]
+        i += 1
+        if char == '*':
+            if pattern.startswith('*', i):
+                i += 1
+                if pattern.startswith('/', i) and (i == 2 or pattern[i - 3] == '/'):
+                    i += 1
+                    parts.append('(?:.*/)?')
+                else:
+                    parts.append('.*')
+            else:
+                parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', i + 1)
+            if end < 0:
+                parts.append('\\[')
+                continue
+            body = pattern[i:end].replace('\\', '\\\\')
+            if body.startswith('!'):
+                body = '^/' + body[1:]
+            elif body.startswith('^'):
+                body = '\\' + body
+            parts.append(f'[{body}]')
+            i = end + 1
+        else:
+            parts.append(re.escape(char))
+    return f'(?s:{"".join(parts)})(?:/.*)?\\Z'
+
+
+def _posix_path(path: str) -> str:
+    if _CASE_INSENSITIVE:
+        path = os.path.normcase(path)
+    return path.replace(os.sep, '/') if os.sep != '/' else path
+
+
+class PathMatcher:
+    """Glob-паттерны относительных путей (см. translate_path_glob), объединённые в одно регулярное выражение.
+
+    Пути и паттерны могут использовать как '/', так и os.sep.
+    """
+
+    __slots__ = ('_match', '_prefixes')
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        normalized = [pattern for pattern in (_posix_path(pattern).strip('/') for pattern in patterns) if pattern]
+        self._match = re.compile('|'.join(translate_path_glob(pattern) for pattern in normalized) or '(?!)').match
+        # Неизменяемые начальные директории паттернов: за их пределами совпадений быть не может
+        prefixes = set()
+        for pattern in normalized:
+            literal = []
+            for part in pattern.split('/'):
+                if not _GLOB_CHARS.isdisjoint(part):
+                    break
+                literal.append(part)
+            prefixes.add('/'.join(literal) + '/' if literal else '')
+        self._prefixes = tuple(prefixes)
+
+    def matches(self, path: str) -> bool:
+        """Проверяет, подходит ли путь (или одна из его родительских директорий) хотя бы под один паттерн."""
+        return self._match(_posix_path(path)) is not None
+
+    def may_contain(self, dir_path: str) -> bool:
+        """Проверяет, могут ли внутри директории оказаться пути, подходящие под паттерны."""
+        prefix = _posix_path(dir_path) + '/'
+        return any(prefix.startswith(literal) or literal.startswith(prefix) for literal in self._prefixes)
+
+
+def name_suffix(name: str) -> str:
+    """Возвращает расширение имени в нижнем регистре по правилам Path.suffix."""
+    i = name.rfind('.')
+    if 0 < i < len(name) - 1:
+        return name[i:].lower()
+    return ''
+
+
+class ExclusionRules:
+    """Скомпилированные правила исключения директорий и файлов.
+
+    Имена проверяются правилами excluded_dirs, excluded_files и excluded_extensions,
+    относительные пути — glob-паттернами путей (см. PathMatcher): exclude_paths исключает
+    совпавшие пути, а непустой include_paths оставляет только совпавшие с ним файлы
+    и директории, внутри которых такие файлы могут оказаться. Путевые правила
+    применяются, только если проверяющий передаёт relative_path.
+    """
+
+    __slots__ = ('_dirs', '_exclude_paths', '_extensions', '_files', '_has_paths', '_include_paths', 'exclude_dotfiles')
+
+    def __init__(
+        self,
+        excluded_dirs: Iterable[str],
+        excluded_files: Iterable[str],
+        excluded_extensions: Iterable[str],
+        exclude_dotfiles: bool,
+        include_paths: Iterable[str] = (),
+        exclude_paths: Iterable[str] = (),
+    ) -> None:
+        self._dirs = PatternMatcher(excluded_dirs)
+        self._files = PatternMatcher(excluded_files)
+        self._extensions = frozenset(excluded_extensions)
+        self.exclude_dotfiles = exclude_dotfiles
+        include_paths = list(include_paths)
+        exclude_paths = list(exclude_paths)
+        self._include_paths = PathMatcher(include_paths) if include_paths else None
+        self._exclude_paths = PathMatcher(exclude_paths) if exclude_paths else None
+        self._has_paths = bool(include_paths or exclude_paths)
+
+    def include_dir(self, name: str, relative_path: str | None = None) -> bool:
+        """Проверяет, следует ли заходить в директорию с данным именем и относительным путём."""
+        if self.exclude_dotfiles and name.startswith('.'):
+            return False
+        if self._dirs.matches(name):
+            return False
+        return relative_path is None or not self._has_paths or self._path_reason(relative_path, True) is None
+
+    def include_file(self, name: str, relative_path: str | None = None) -> bool:
+        """Проверяет, следует ли включить файл с данным именем и относительным путём."""
+        if self.exclude_dotfiles and name.startswith('.'):
+            return False
+        if self._files.matches(name):
+            return False
+        if name_suffix(name) in self._extensions:
+            return False
+        return relative_path is None or not self._has_paths or self._path_reason(relative_path, False) is None
+
+    def exclusion_reason(self, name: str, is_dir: bool, relative_path: str | None = None) -> str | None:
+        """Возвращает правило, исключающее имя ('dotfile', 'name', 'extension', 'path', 'include'), или None.
+
+        Проверки те же и в том же порядке, что у include_dir/include_file.
+        """
+        if self.exclude_dotfiles and name.startswith('.'):
+            return 'dotfile'
+        if is_dir:
+            if self._dirs.matches(name):
+                return 'name'
+        elif self._files.matches(name):
+            return 'name'
+        elif name_suffix(name) in self._extensions:
+            return 'extension'
+        if relative_path is None or not self._has_paths:
+            return None
+        return self._path_reason(relative_path, is_dir)
+
+    def _path_reason(self, relative_path: str, is_dir: bool) -> str | None:
+        # Путь директории с '/' на конце: так 'build/**' отсекает и саму build
+        if self._exclude_paths is not None and self._exclude_paths.matches(
+            relative_path + '/' if is_dir else relative_path
+        ):
+            return 'path'
+        if self._include_paths is not None:
+            if is_dir:
+                included = self._include_paths.may_contain(relative_path)
+            else:
+                included = self._include_paths.matches(relative_path)
+            if not included:
+                return 'include'
+        return None
@@ -1,87 +1,207 @@
-import fnmatch
-import logging
+from collections.abc import Iterable, Iterator
 import os
 from pathlib import Path
+import time
 
-from code2md.interfaces import FileCollector
+from code2md.exclusions import ExclusionRules
+from code2md.interfaces import FileEntry, StreamingFileCollector, TreeItem
+from code2md.stats import InstrumentedRules, SnapshotHooks
 
 
-class DefaultFileCollector(FileCollector):
-    """Сборщик файлов по умолчанию."""
+class DefaultFileCollector(StreamingFileCollector):
+    """Сборщик файлов по умолчанию.
 
-    def __init__(self, verbose: bool = False) -> None:
+    С hooks сообщает время чтения каждой директории и исключённые правилами имена.
+    """
+
+    def __init__(self, verbose: bool = False, hooks: SnapshotHooks | None = None) -> None:
         self.verbose = verbose
+        self.hooks = hooks
         if verbose:
+            import logging
+
             logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
             self.logger = logging.getLogger(__name__)
         else:
             self.logger = None
 
-    def collect(
+    def iter_collect(
         self,
         start_path: Path,
         excluded_dirs: set[str],
         excluded_files: set[str],
         excluded_extensions: set[str],
         exclude_dotfiles: bool,
-    ) -> tuple[list[str], list[Path]]:
-        """Собирает структуру директории и список файлов для включения."""
-        project_tree = []
-        files_to_include = []
-
+        include_paths: Iterable[str] = (),
+        exclude_paths: Iterable[str] = (),
+    ) -> Iterator[TreeItem]:
+        """Обходит директорию и по мере обхода отдаёт строки дерева и файлы для включения."""
         if self.logger:
             self.logger.info(f'Начинаю сбор из: {start_path}')
             self.logger.info(f'Исключенные директории: {excluded_dirs or "Нет"}')
             self.logger.info(f'Исключенные файлы: {excluded_files or "Нет"}')
             self.logger.info(f'Исключенные расширения: {excluded_extensions or "Нет"}')
             self.logger.info(f'Исключать dot-файлы: {"Да" if exclude_dotfiles else "Нет"}')
+            if include_paths:
+                self.logger.info(f'Включаемые пути: {include_paths}')
+            if exclude_paths:
+                self.logger.info(f'Исключенные пути: {exclude_paths}')
 
-        for root, dirs, files in os.walk(start_path, topdown=True):
-            dirs[:] = [
-                d
-                for d in sorted(dirs)
-                if self._should_include(d, excluded_dirs, set(), set(), exclude_dotfiles, is_dir=True)
-            ]
+        rules = self._rules(
+            excluded_dirs, excluded_files, excluded_extensions, exclude_dotfiles, include_paths, exclude_paths
+        )
+        yield from self._walk(rules, start_path, '')
 
-            root_path = Path(root)
-            level = len(root_path.relative_to(start_path).parts)
-            indent = '    ' * level
-
-            if level > 0:
-                project_tree.append(f'{indent}📂 {root_path.name}/')
-
-            sub_indent = '    ' * (level + 1)
-            for filename in sorted(files):
-                if self._should_include(filename, excluded_dirs, excluded_files, excluded_extensions, exclude_dotfiles):
-                    file_path = root_path / filename
-                    files_to_include.append(file_path)
-                    project_tree.append(f'{sub_indent}📄 {filename}')
-
-        return project_tree, files_to_include
-
-    @staticmethod
-    def _matches_patterns(name: str, patterns: set[str]) -> bool:
-        """Проверяет совпадение имени с точными именами и glob-паттернами."""
-        return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
-
-    @classmethod
-    def _should_include(
-        cls,
-        name: str,
+    def iter_collect_dir(
+        self,
+        relative_dir: str,
+        start_path: Path,
         excluded_dirs: set[str],
         excluded_files: set[str],
         excluded_extensions: set[str],
         exclude_dotfiles: bool,
-        is_dir: bool = False,
-    ) -> bool:
-        """Проверяет, следует ли включить данный файл или директорию."""
-        if exclude_dotfiles and name.startswith('.'):
-            return False
-
-        if is_dir:
-            return not cls._matches_patterns(name, excluded_dirs)
+        include_paths: Iterable[str] = (),
+        exclude_paths: Iterable[str] = (),
+    ) -> Iterator[TreeItem]:
+        """Обходит только поддерево relative_dir и отдаёт его строки так же, как iter_collect.
+
+        Строки поддерева (начиная со строки самой директории) совпадают с соответствующим
+        непрерывным участком результата iter_collect, поэтому их можно подставить вместо
+        прежних без обхода остального проекта. Включена ли сама директория, не проверяется.
+        """
+        rules = self._rules(
+            excluded_dirs, excluded_files, excluded_extensions, exclude_dotfiles, include_paths, exclude_paths
+        )
+        yield from self._walk(rules, start_path, relative_dir)
+
+    def _rules(
+        self,
+        excluded_dirs: set[str],
+        excluded_files: set[str],
+        excluded_extensions: set[str],
+        exclude_dotfiles: bool,
+        include_paths: Iterable[str],
+        exclude_paths: Iterable[str],
+    ) -> ExclusionRules | InstrumentedRules:
+        rules = ExclusionRules(
+            excluded_dirs, excluded_files, excluded_extensions, exclude_dotfiles, include_paths, exclude_paths
+        )
+        if self.hooks is not None:
+            return InstrumentedRules(rules, self.hooks)
+        return rules
+
+    def _walk(
+        self, rules: ExclusionRules | InstrumentedRules, start_path: Path, relative_dir: str
+    ) -> Iterator[TreeItem]:
+        hooks = self.hooks
+        include_dir = rules.include_dir
+        include_file = rules.include_file
+
+        # Обход в глубину с явным стеком: (путь, имя, относительный путь, уровень).
+        # Порядок совпадает с os.walk(topdown=True): сначала файлы директории,
+        # затем поддиректории; по символическим ссылкам на директории не заходим.
+        if relative_dir:
+            parts = relative_dir.split(os.sep)
+            stack = [(os.path.join(start_path, relative_dir), parts[-1], relative_dir, len(parts))]
+        else:
+            stack = [(os.fspath(start_path), start_path.name, '', 0)]
+        while stack:
+            dir_path, dir_name, relative_dir, level = stack.pop()
+            started = time.perf_counter() if hooks is not None else 0.0
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+
+            dirs = []
+            files = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                (dirs if is_dir else files).append(entry)
+
+            if hooks is not None:
+                hooks.on_directory(relative_dir, time.perf_counter() - started, len(entries))
 
-        if cls._matches_patterns(name, excluded_files):
-            return False
+            if level > 0:
+                yield TreeItem(f'{"    " * level}📂 {dir_name}/', None)
 
-        return Path(name).suffix.lower() not in excluded_extensions
+            sub_indent = '    ' * (level + 1)
+            for entry in sorted(files, key=_entry_name):
+                filename = entry.name
+                relative_path = os.path.join(relative_dir, filename) if relative_dir else filename
+                if include_file(filename, relative_path):
+                    yield TreeItem(f'{sub_indent}📄 {filename}', FileEntry(entry.path, relative_path, entry))
+
+            for entry in sorted(dirs, key=_entry_name, reverse=True):
+                relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+                if include_dir(entry.name, relative_path) and not entry.is_symlink():
+                    stack.append((entry.path, entry.name, relative_path, level + 1))
+
+
+def _entry_name(entry: os.DirEntry) -> str:
+    return entry.name
+
+
+class _TreeNode:
+    __slots__ = ('dirs', 'files')
+
+    def __init__(self) -> None:
+        self.dirs: dict[str, _TreeNode] = {}
+        self.files: list[str] = []
+
+
+def iter_tree_from_paths(
+    start_path: Path,
+    relative_paths: Iterable[str],
+    rules: ExclusionRules | InstrumentedRules | None = None,
+) -> Iterator[TreeItem]:
+    """Строит дерево проекта по готовому списку относительных путей файлов.
+
+    Порядок и формат строк совпадают с DefaultFileCollector.iter_collect. Пути могут
+    использовать как os.sep, так и '/'. Файлы, у которых сам файл (по имени и пути) или одна
+    из родительских директорий (по имени) не проходят rules, пропускаются; путевые правила
+    директорий здесь не нужны — паттерн, совпавший с директорией, совпадает и с её файлами.
+
+    Args:
+        start_path: Путь к корневой директории проекта
+        relative_paths: Относительные пути файлов
+        rules: Правила исключения (None — включать всё)
+
+    Yields:
+        Строки дерева и файлы для включения
+    """
+    root = _TreeNode()
+    for relative_path in relative_paths:
+        *parts, filename = relative_path.replace(os.sep, '/').split('/')
+        if rules is not None and not (
+            rules.include_file(filename, relative_path) and all(rules.include_dir(part) for part in parts)
+        ):
+            continue
+
+        node = root
+        for part in parts:
+            child = node.dirs.get(part)
+            if child is None:
+                child = node.dirs[part] = _TreeNode()
+            node = child
+        node.files.append(filename)
+
+    base = os.fspath(start_path)
+    stack = [(root, start_path.name, '', 0)]
+    while stack:
+        node, dir_name, relative_dir, level = stack.pop()
+        if level > 0:
+            yield TreeItem(f'{"    " * level}📂 {dir_name}/', None)
+
+        sub_indent = '    ' * (level + 1)
+        for filename in sorted(node.files):
+            relative_path = os.path.join(relative_dir, filename) if relative_dir else filename
+            yield TreeItem(f'{sub_indent}📄 {filename}', FileEntry(os.path.join(base, relative_path), relative_path))
+
+        for name in sorted(node.dirs, reverse=True):
+            relative_path = os.path.join(relative_dir, name) if relative_dir else name
+            stack.append((node.dirs[name], name, relative_path, level + 1))
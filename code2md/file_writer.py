@@ -1,79 +1,800 @@
+import codecs
+from collections import Counter, deque
+from collections.abc import Callable, Iterable, Iterator
+import functools
+import io
+import os
 from pathlib import Path
+import shutil
+import tempfile
+import time
+from typing import TYPE_CHECKING, Any, BinaryIO, NamedTuple, Optional, TextIO
 
+from code2md.budget import FileBudget
+from code2md.cache import BlockCache, MemoryCacheSession
 from code2md.consts import LANGUAGE_MAP
-from code2md.interfaces import FileWriter
+from code2md.encoding_detection import (
+    DEFAULT_ENCODINGS,
+    UTF8,
+    TextEncoding,
+    declared_encoding,
+    guess_encoding,
+    sniff_chunk,
+)
+from code2md.interfaces import FileEntry, StreamingFileWriter, TreeItem
+from code2md.stats import SnapshotHooks
+from code2md.tokens import TokenEstimator
 
+if TYPE_CHECKING:
+    from concurrent.futures import Future
 
-class MarkdownFileWriter(FileWriter):
+    from code2md.outline import Outliner
+
+_O_BINARY = getattr(os, 'O_BINARY', 0)
+# Лишние байты на перевод строки при записи в текстовом режиме ('\r\n' на Windows)
+_NEWLINE_EXTRA = len(os.linesep) - 1
+_STREAM_READ_SIZE = 1 << 20
+# Сколько байт по обе стороны от места ошибки UTF-8 смотреть при подборе кодировки
+_GUESS_WINDOW = 4096
+# Размер кодовой единицы кодировок, в которых конец файла нужно выравнивать
+_CODE_UNITS = {'utf-16-le': 2, 'utf-16-be': 2, 'utf-32-le': 4, 'utf-32-be': 4}
+
+
+def encoded_length(text: str) -> int:
+    """Длина текста в байтах результата: UTF-8 с переводами строк, как при записи в файл."""
+    length = len(text) if text.isascii() else len(text.encode('utf-8'))
+    if _NEWLINE_EXTRA:
+        length += text.count('\n') * _NEWLINE_EXTRA
+    return length
+
+
+def _read_exactly(fd: int, count: int) -> bytes:
+    """Читает count байт или меньше, если файл закончился раньше."""
+    parts = []
+    while count > 0:
+        chunk = os.read(fd, count)
+        if not chunk:
+            break
+        parts.append(chunk)
+        count -= len(chunk)
+    return b''.join(parts)
+
+
+def _content_hash(data: bytes = b'') -> Any:
+    """blake2b для хеша содержимого (кеш блоков, --dedup).
+
+    hashlib с OpenSSL заметно удлиняет запуск, а без кеша и --dedup хеш не нужен,
+    поэтому модуль загружается при первом хеше.
+    """
+    import hashlib
+
+    return hashlib.blake2b(data, digest_size=16)
+
+
+def _text_decoder(codec: str = 'utf-8') -> io.IncrementalNewlineDecoder:
+    """Потоковый декодер с теми же универсальными переводами строк, что и у Path.read_text."""
+    return io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(codec)(), translate=True)
+
+
+def _decode_prefix(data: bytes, encoding: TextEncoding) -> str:
+    """Декодирует начало файла без BOM, отбрасывая символ, разрезанный на границе."""
+    return codecs.getincrementaldecoder(encoding.codec)().decode(data[encoding.bom :])
+
+
+def _decode_suffix(data: bytes, encoding: TextEncoding, offset: int) -> str:
+    """Декодирует конец файла со смещения offset, отбрасывая продолжение символа, разрезанного на границе."""
+    start = 0
+    if encoding.codec == 'utf-8':
+        while start < min(3, len(data)) and 0x80 <= data[start] <= 0xBF:
+            start += 1
+        return data[start:].decode('utf-8')
+
+    unit = _CODE_UNITS.get(encoding.codec)
+    if unit is None:
+        # Однобайтовые кодировки режутся где угодно; для многобайтовых пропускаем до трёх байт продолжения
+        for start in range(min(3, len(data))):
+            try:
+                return data[start:].decode(encoding.codec)
+            except UnicodeDecodeError as exc:
+                if exc.start:
+                    raise
+        return data[start + 1 :].decode(encoding.codec) if data else ''
+
+    start = (encoding.bom - offset) % unit
+    high = start + 1 if encoding.codec == 'utf-16-le' else start
+    if unit == 2 and high < len(data) and 0xDC <= data[high] <= 0xDF:
+        # Вторая половина суррогатной пары, первая осталась в пропущенной середине
+        start += 2
+    return data[start:].decode(encoding.codec)
+
+
+@functools.lru_cache(maxsize=4096)
+def _language_for_name(file_name: str) -> str:
+    """Язык по имени файла: точное имя из LANGUAGE_MAP, иначе расширение (как Path.suffix, без учёта регистра).
+
+    Результат кешируется по имени, так что в проекте с тысячами файлов поиск сводится
+    к одному обращению к словарю.
+    """
+    if file_name in LANGUAGE_MAP:
+        return LANGUAGE_MAP[file_name]
+    dot = file_name.rfind('.')
+    if 0 < dot < len(file_name) - 1:
+        return LANGUAGE_MAP.get(file_name[dot:].lower(), '')
+    return ''
+
+
+class _TextBuffer:
+    """Собирает мелкие записи и передаёт их в поток крупными кусками.
+
+    Строки дерева и блоки файлов пишутся десятками тысяч маленьких вызовов write;
+    здесь они склеиваются в куски по size символов, так что нижележащий поток
+    (файл, сокет, компрессор) получает по одному вызову на кусок. При count_bytes
+    ведётся счётчик байт результата, по которому writer строит индекс смещений.
+    """
+
+    __slots__ = ('_count_bytes', '_parts', '_pending', '_size', '_stream', 'bytes_written')
+
+    def __init__(self, stream: TextIO, size: int, count_bytes: bool = False) -> None:
+        self._stream = stream
+        self._size = size
+        self._count_bytes = count_bytes
+        self._parts: list[str] = []
+        self._pending = 0
+        self.bytes_written = 0
+
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+        self._pending += len(text)
+        if self._count_bytes:
+            self.bytes_written += encoded_length(text)
+        if self._pending >= self._size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._parts:
+            self._stream.write(''.join(self._parts))
+            self._parts = []
+            self._pending = 0
+
+
+class _TimedStream(io.RawIOBase):
+    """Передаёт записи в бинарный поток, сообщая hooks объём и время каждой записи."""
+
+    def __init__(self, stream: BinaryIO, hooks: SnapshotHooks) -> None:
+        self._stream = stream
+        self._hooks = hooks
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        started = time.perf_counter()
+        self._stream.write(data)
+        self._hooks.on_output(len(data), time.perf_counter() - started)
+        return len(data)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+class FileContent(NamedTuple):
+    """Результат однократного чтения файла.
+
+    summary — как содержимое сокращено режимом --outline: 'outline' (text — структура
+    файла) или 'omitted' (содержимое не выводится); None, если не сокращено.
+    encoding — название исходной кодировки текста (см. TextEncoding.name); None для бинарных файлов.
+    """
+
+    text: str | None
+    sniffed_bytes: int
+    digest: str | None = None
+    truncated_bytes: int = 0
+    binary_kind: str | None = None
+    bytes_read: int = 0
+    summary: str | None = None
+    encoding: str | None = None
+
+    @property
+    def is_binary(self) -> bool:
+        return self.text is None
+
+
+class TextScan(NamedTuple):
+    """Итог предварительного прохода по большому текстовому файлу.
+
+    chars — число символов после нормализации переводов строк, content_chars — число
+    символов до хвостовых пробельных символов (0 для пустого файла).
+    """
+
+    chars: int
+    content_chars: int
+    digest: str | None
+    sniffed_bytes: int
+    bytes_read: int
+    encoding: TextEncoding = UTF8
+
+
+class StreamedBlock:
+    """Блок большого файла, содержимое которого читается и отдаётся кусками.
+
+    Итерация отдаёт prefix, первые chars символов файла (декодированных из encoding
+    после нормализации переводов строк, пропущенных через transform, если он задан)
+    и suffix; файл целиком в памяти не держится.
+    """
+
+    __slots__ = ('bytes_read', 'chars', 'digest', 'encoding', 'fspath', 'prefix', 'suffix', 'transform')
+
+    def __init__(
+        self,
+        fspath: str,
+        chars: int,
+        prefix: str,
+        suffix: str,
+        digest: str | None = None,
+        bytes_read: int = 0,
+        encoding: TextEncoding = UTF8,
+        transform: Callable[[str], str] | None = None,
+    ) -> None:
+        self.fspath = fspath
+        self.chars = chars
+        self.prefix = prefix
+        self.suffix = suffix
+        self.digest = digest
+        self.bytes_read = bytes_read
+        self.encoding = encoding
+        self.transform = transform
+
+    def __iter__(self) -> Iterator[str]:
+        yield self.prefix
+        remaining = self.chars
+        if remaining > 0:
+            decoder = _text_decoder(self.encoding.codec)
+            fd = os.open(self.fspath, os.O_RDONLY | _O_BINARY)
+            try:
+                if self.encoding.bom:
+                    os.lseek(fd, self.encoding.bom, os.SEEK_SET)
+                while remaining > 0:
+                    data = os.read(fd, _STREAM_READ_SIZE)
+                    text = decoder.decode(data, final=not data)[:remaining]
+                    remaining -= len(text)
+                    if text:
+                        yield text if self.transform is None else self.transform(text)
+                    if not data:
+                        break
+            finally:
+                os.close(fd)
+        yield self.suffix
+
+
+class RenderedFile(NamedTuple):
+    """Markdown-блок файла; block равен None, если блок нужно взять из кеша.
+
+    failure — 'decode_error' или 'read_error', если содержимое файла не удалось получить.
+    Для больших текстовых файлов block — StreamedBlock, а content — None.
+    """
+
+    entry: FileEntry
+    block: str | StreamedBlock | None
+    content: FileContent | None
+    failure: str | None = None
+
+
+class MarkdownFileWriter(StreamingFileWriter):
     """Записывает результаты в формате Markdown."""
 
-    _TEXT_BYTES = bytes(range(32, 127)) + b'\n\r\t\f\b'
     _CHUNK_SIZE = 8192
-    _BINARY_THRESHOLD = 0.30
+    _READ_SIZE = 1 << 20
+    _SPOOL_SIZE = 8 << 20
+    # Файлы больше этого размера не читаются в память целиком, а передаются в вывод кусками
+    _STREAM_SIZE = 8 << 20
+    _WINDOW_FACTOR = 4
+    # Суммарный размер файлов, которые одновременно читаются или ждут своей очереди на вывод
+    _WINDOW_BYTES = 64 << 20
+
+    def __init__(
+        self,
+        verbose: bool = False,
+        jobs: int = 1,
+        cache: BlockCache | MemoryCacheSession | None = None,
+        budget: FileBudget | None = None,
+        token_estimator: TokenEstimator | None = None,
+        hooks: SnapshotHooks | None = None,
+        dedup: bool = False,
+        record_offsets: bool = False,
+        outliner: Optional['Outliner'] = None,
+        encodings: tuple[str, ...] = DEFAULT_ENCODINGS,
+    ) -> None:
+        self.verbose = verbose
+        self.jobs = jobs
+        self.cache = cache
+        self.budget = budget
+        self.token_estimator = token_estimator
+        self.hooks = hooks
+        self.dedup = dedup
+        self.record_offsets = record_offsets
+        self.outliner = outliner
+        self.encodings = encodings
+        self.truncated: list[tuple[str, str]] = []
+        # (относительный путь, смещение блока в байтах от начала результата, длина блока в байтах)
+        self.offsets: list[tuple[str, int, int]] = []
+        self._first_copies: dict[str, str] = {}
+        self.counters: Counter[str] = Counter()
+        if verbose:
+            import logging
+
+            logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+            self.logger = logging.getLogger(__name__)
+        else:
+            self.logger = None
 
     @classmethod
-    def _is_binary_file(cls, file_path: Path) -> bool:
-        """Проверяет, является ли файл бинарным.
+    def _read_file(
+        cls,
+        file_path: str | Path,
+        size: int | None = None,
+        with_digest: bool = False,
+        max_bytes: int | None = None,
+        hooks: SnapshotHooks | None = None,
+        encodings: tuple[str, ...] = DEFAULT_ENCODINGS,
+    ) -> FileContent:
+        """Читает файл за одно открытие: бинарность и кодировка определяются по тому же буферу.
+
+        Файл читается через os.open/os.read: известный от сборщика размер заменяет
+        fstat, который выполнял бы Path.open.
 
         Args:
             file_path: Путь к файлу
+            size: Размер файла, если он уже известен
+            with_digest: Посчитать ли хеш содержимого (по уже прочитанным байтам)
+            max_bytes: Лимит байт; у файла большего размера читаются только начало и конец
+            hooks: Получатель времени определения бинарности и декодирования
+            encodings: Кандидаты для текста не в UTF-8 в порядке приоритета (см. sniff_chunk)
 
         Returns:
-            True, если файл бинарный, иначе False
+            FileContent с текстом файла, перекодированным в str (None для бинарных файлов)
+
+        Raises:
+            UnicodeDecodeError: Если файл не удалось декодировать ни в одной кодировке
+            OSError: Если файл не удалось прочитать
         """
+        fd = os.open(file_path, os.O_RDONLY | _O_BINARY)
         try:
-            with file_path.open('rb') as f:
-                chunk = f.read(cls._CHUNK_SIZE)
+            head = os.read(fd, cls._CHUNK_SIZE)
+            started = time.perf_counter() if hooks is not None else 0.0
+            binary_kind, encoding = sniff_chunk(head, encodings, len(head) < cls._CHUNK_SIZE)
+            if hooks is not None:
+                hooks.on_stage('sniff', time.perf_counter() - started)
+            if binary_kind is not None:
+                return FileContent(None, len(head), binary_kind=binary_kind, bytes_read=len(head))
 
-            if not chunk:
-                return False
+            if max_bytes is not None and size is not None and size > max_bytes:
+                return cls._read_truncated(fd, head, size, max_bytes, encoding, encodings)
 
-            if b'\x00' in chunk:
-                return True
+            data = head
+            if len(head) == cls._CHUNK_SIZE:
+                parts = [head]
+                request = max(size - len(head), 0) + 1 if size is not None else cls._READ_SIZE
+                while True:
+                    chunk = os.read(fd, request)
+                    if not chunk:
+                        break
+                    parts.append(chunk)
+                    request = cls._READ_SIZE
+                data = b''.join(parts)
+        finally:
+            os.close(fd)
 
-            try:
-                chunk.decode('utf-8')
-                return False
-            except UnicodeDecodeError as exc:
-                if exc.start >= len(chunk) - 4:
-                    try:
-                        chunk.decode('utf-8', errors='ignore')
-                        return False
-                    except Exception:
-                        pass
+        digest = _content_hash(data).hexdigest() if with_digest else None
 
-            nontext = sum(byte not in cls._TEXT_BYTES for byte in chunk)
-            return (nontext / len(chunk)) > cls._BINARY_THRESHOLD
+        started = time.perf_counter() if hooks is not None else 0.0
+        text, encoding = cls._decode(data, encoding, encodings)
+        if '\r' in text:
+            # Те же универсальные переводы строк, что и у Path.read_text
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        if hooks is not None:
+            hooks.on_stage('decode', time.perf_counter() - started)
 
-        except OSError:
-            return False
+        return FileContent(text, len(head), digest, bytes_read=len(data), encoding=encoding.name)
+
+    @staticmethod
+    def _decode(data: bytes, encoding: TextEncoding, encodings: tuple[str, ...]) -> tuple[str, TextEncoding]:
+        """Декодирует содержимое файла за один проход.
+
+        Если начальный фрагмент был корректным UTF-8, а дальше встречаются другие байты,
+        кодировка подбирается по окрестности ошибки, без повторного чтения файла.
+
+        Raises:
+            UnicodeDecodeError: Если подобрать кодировку не удалось
+        """
+        try:
+            return (data[encoding.bom :] if encoding.bom else data).decode(encoding.codec), encoding
+        except UnicodeDecodeError as exc:
+            if encoding != UTF8:
+                raise
+            window = data[max(exc.start - _GUESS_WINDOW, 0) : exc.start + _GUESS_WINDOW]
+            guess = guess_encoding(window, encodings, False, declared_encoding(data[:_GUESS_WINDOW], encodings))
+            if guess is None:
+                raise
+            return data.decode(guess.codec), guess
 
     @classmethod
-    def _get_language_for_file(cls, file_path: Path) -> str:
+    def _scan_file(
+        cls,
+        file_path: str | Path,
+        with_digest: bool = False,
+        hooks: SnapshotHooks | None = None,
+        encodings: tuple[str, ...] = DEFAULT_ENCODINGS,
+        encoding: TextEncoding | None = None,
+    ) -> FileContent | TextScan:
+        """Проходит по большому файлу кусками, не накапливая его содержимое.
+
+        Проверяет бинарность и кодировку по начальному фрагменту, декодируемость по всему
+        файлу и находит конец содержимого без хвостовых пробелов, чтобы блок можно было
+        записать потоково с тем же результатом, что и при чтении целиком. Если UTF-8
+        ломается дальше начального фрагмента, проход повторяется с подобранной кодировкой
+        (она передаётся в encoding).
+
+        Returns:
+            FileContent для бинарного файла, иначе TextScan
+
+        Raises:
+            UnicodeDecodeError: Если файл не удалось декодировать ни в одной кодировке
+            OSError: Если файл не удалось прочитать
+        """
+        fd = os.open(file_path, os.O_RDONLY | _O_BINARY)
+        try:
+            head = os.read(fd, cls._CHUNK_SIZE)
+            if encoding is None:
+                started = time.perf_counter() if hooks is not None else 0.0
+                binary_kind, encoding = sniff_chunk(head, encodings)
+                if hooks is not None:
+                    hooks.on_stage('sniff', time.perf_counter() - started)
+                if binary_kind is not None:
+                    return FileContent(None, len(head), binary_kind=binary_kind, bytes_read=len(head))
+
+            hasher = _content_hash() if with_digest else None
+            decoder = _text_decoder(encoding.codec)
+            chars = content_chars = bytes_read = 0
+            decode_seconds = 0.0
+            data = head
+            while True:
+                if hasher is not None:
+                    hasher.update(data)
+                started = time.perf_counter() if hooks is not None else 0.0
+                try:
+                    text = decoder.decode(data[encoding.bom :] if not bytes_read and encoding.bom else data, not data)
+                except UnicodeDecodeError as exc:
+                    if encoding != UTF8:
+                        raise
+                    window = data[max(exc.start - _GUESS_WINDOW, 0) : exc.start + _GUESS_WINDOW]
+                    guess = guess_encoding(window, encodings, False, declared_encoding(head, encodings))
+                    if guess is None:
+                        raise
+                    return cls._scan_file(file_path, with_digest, hooks, encodings, guess)
+                bytes_read += len(data)
+                if hooks is not None:
+                    decode_seconds += time.perf_counter() - started
+                stripped = len(text.rstrip())
+                if stripped:
+                    content_chars = chars + stripped
+                chars += len(text)
+                if not data:
+                    break
+                data = os.read(fd, cls._READ_SIZE)
+        finally:
+            os.close(fd)
+
+        if hooks is not None:
+            hooks.on_stage('decode', decode_seconds)
+        digest = hasher.hexdigest() if hasher is not None else None
+        return TextScan(chars, content_chars, digest, len(head), bytes_read, encoding)
+
+    @classmethod
+    def _read_truncated(
+        cls,
+        fd: int,
+        head: bytes,
+        size: int,
+        max_bytes: int,
+        encoding: TextEncoding = UTF8,
+        encodings: tuple[str, ...] = DEFAULT_ENCODINGS,
+    ) -> FileContent:
+        """Читает только первые и последние max_bytes / 2 байт файла, пропуская середину.
+
+        Если начальный фрагмент был UTF-8, а прочитанные части им не являются, кодировка
+        подбирается по ним же.
+        """
+        tail_size = max_bytes // 2
+        first = head[: max_bytes - tail_size]
+        if len(first) < max_bytes - tail_size:
+            first += _read_exactly(fd, max_bytes - tail_size - len(first))
+        os.lseek(fd, size - tail_size, os.SEEK_SET)
+        last = _read_exactly(fd, tail_size)
+
+        skipped = size - len(first) - len(last)
+        try:
+            prefix = _decode_prefix(first, encoding)
+            suffix = _decode_suffix(last, encoding, size - tail_size)
+        except UnicodeDecodeError:
+            guess = None
+            if encoding == UTF8:
+                guess = guess_encoding(first + b'\n' + last, encodings, False, declared_encoding(first, encodings))
+            if guess is None:
+                raise
+            encoding = guess
+            prefix = _decode_prefix(first, encoding)
+            suffix = _decode_suffix(last, encoding, size - tail_size)
+        text = f'{prefix}\n\n[... пропущено {skipped} байт ...]\n\n{suffix}'
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+        bytes_read = max(len(head), len(first)) + len(last)
+        return FileContent(text, len(head), None, skipped, bytes_read=bytes_read, encoding=encoding.name)
+
+    @classmethod
+    def _get_language_for_file(cls, file_path: Path | FileEntry) -> str:
         """Определяет язык для подсветки синтаксиса на основе расширения файла или имени файла.
 
         Args:
-            file_path: Путь к файлу
+            file_path: Путь к файлу или запись сборщика (у неё имя берётся без создания Path)
 
         Returns:
             Строка с названием языка для подсветки синтаксиса
         """
-        file_name = file_path.name
-        if file_name in LANGUAGE_MAP:
-            return LANGUAGE_MAP[file_name]
+        return _language_for_name(file_path.name)
 
-        extension = file_path.suffix.lower()
-        if extension in LANGUAGE_MAP:
-            return LANGUAGE_MAP[extension]
+    def render_file(
+        self,
+        entry: FileEntry,
+        use_markers: bool,
+        max_bytes: int | None = None,
+    ) -> RenderedFile:
+        """Формирует Markdown-блок одного файла; при заданных hooks замеряет время и исход.
 
-        return ''
+        Кеш только читается, поэтому метод можно вызывать из рабочих потоков; готовый
+        результат передаётся в finish_block().
+        """
+        hooks = self.hooks
+        if hooks is None:
+            return self._render_block(entry, use_markers, max_bytes)
+
+        started = time.perf_counter()
+        rendered = self._render_block(entry, use_markers, max_bytes)
+        elapsed = time.perf_counter() - started
+
+        content = rendered.content
+        bytes_read = content.bytes_read if content is not None else 0
+        if rendered.block is None:
+            outcome = 'cached'
+        elif rendered.failure is not None:
+            outcome = rendered.failure
+        elif isinstance(rendered.block, StreamedBlock):
+            outcome = 'streamed'
+            bytes_read = rendered.block.bytes_read
+        elif content.is_binary:
+            outcome = 'binary'
+        elif content.summary is not None:
+            outcome = content.summary
+        elif content.truncated_bytes:
+            outcome = 'truncated'
+        elif not content.text.strip():
+            outcome = 'empty'
+        else:
+            outcome = 'text'
+        hooks.on_file(entry.relative_path, elapsed, bytes_read, outcome)
+        return rendered
+
+    def _render_block(
+        self,
+        entry: FileEntry,
+        use_markers: bool,
+        max_bytes: int | None = None,
+    ) -> RenderedFile:
+        """Формирует Markdown-блок одного файла.
+
+        Args:
+            entry: Файл для включения
+            use_markers: Добавлять ли явные маркеры начала/конца файла
+            max_bytes: Лимит байт содержимого (None — без ограничения)
+
+        Returns:
+            RenderedFile с текстом блока и результатом чтения (None, если файл прочитать не удалось)
+        """
+        try:
+            size = entry.size
+        except OSError:
+            size = None
+
+        # Обрезанные блоки не кешируются: по stat не отличить их от бинарных файлов
+        may_truncate = max_bytes is not None and size is not None and size > max_bytes
+        if self.cache is not None and not may_truncate and self.cache.is_fresh(entry):
+            return RenderedFile(entry, None, None)
+
+        outliner = self.outliner
+        with_digest = self.cache is not None or self.dedup or outliner is not None
+        file_content = None
+        error = None
+        try:
+            if size is not None and size > self._STREAM_SIZE and not may_truncate:
+                scan = self._scan_file(entry.fspath, with_digest, self.hooks, self.encodings)
+                if isinstance(scan, FileContent):
+                    file_content = scan
+                elif outliner is not None and outliner.mode == 'structure':
+                    # Структура больших файлов не извлекается: их пришлось бы прочитать в память целиком
+                    file_content = FileContent(
+                        '', scan.sniffed_bytes, scan.digest, bytes_read=scan.bytes_read, summary='omitted'
+                    )
+                else:
+                    return RenderedFile(entry, self._format_stream(entry, scan, use_markers), None)
+            else:
+                file_content = self._read_file(entry.fspath, size, with_digest, max_bytes, self.hooks, self.encodings)
+                if self.cache is not None and not may_truncate and self.cache.matches(entry, file_content.digest):
+                    # Файл тронули, но содержимое прежнее: блок берётся из кеша без повторного рендеринга
+                    return RenderedFile(entry, None, file_content)
+                if outliner is not None and file_content.text and file_content.text.strip():
+                    file_content = self._outline(entry, file_content, outliner)
+        except Exception as e:
+            error = e
+
+        failure = None
+        if error is not None:
+            failure = 'decode_error' if isinstance(error, UnicodeDecodeError) else 'read_error'
+        return RenderedFile(entry, self._format_block(entry, file_content, error, use_markers), file_content, failure)
+
+    def _outline(self, entry: FileEntry, file_content: FileContent, outliner: 'Outliner') -> FileContent:
+        """Заменяет содержимое файла его структурой согласно режиму outliner."""
+        started = time.perf_counter() if self.hooks is not None else 0.0
+        outline = outliner.outline(file_content.text, self._get_language_for_file(entry), file_content.digest)
+        if self.hooks is not None:
+            self.hooks.on_stage('outline', time.perf_counter() - started)
+        if outline is not None:
+            return file_content._replace(text=outline, summary='outline')
+        if outliner.mode == 'structure':
+            return file_content._replace(summary='omitted')
+        return file_content
+
+    def _format_block(
+        self,
+        entry: FileEntry,
+        file_content: FileContent | None,
+        error: Exception | None,
+        use_markers: bool,
+    ) -> str:
+        """Оформляет результат чтения файла в Markdown-блок.
+
+        Args:
+            entry: Файл для включения
+            file_content: Результат чтения (None, если прочитать не удалось)
+            error: Ошибка чтения или декодирования
+            use_markers: Добавлять ли явные маркеры начала/конца файла
+
+        Returns:
+            Текст блока
+        """
+        parts = [self._format_head(entry, use_markers)]
+
+        if isinstance(error, UnicodeDecodeError):
+            parts.append('[Файл содержит не-UTF-8 символы - содержимое не отображается]\n')
+        elif error is not None:
+            parts.append(f'Не удалось прочитать файл: {error!s}\n')
+        elif file_content.is_binary:
+            parts.append('[Бинарный файл - содержимое не отображается]\n')
+        elif file_content.summary == 'omitted':
+            parts.append('[Режим структуры: содержимое файла не отображается]\n')
+        elif not file_content.text.strip():
+            parts.append('[Пустой файл]\n')
+        else:
+            language = self._get_language_for_file(entry)
+            parts.append(self._format_encoding(file_content.encoding))
+            if file_content.summary == 'outline':
+                parts.append('[Структура файла: объявления и docstring, тела опущены]\n')
+            parts.append(f'```{language}\n')
+            parts.append(file_content.text.rstrip())
+            parts.append('\n```\n')
+
+        parts.append(self._format_tail(entry, use_markers))
+        return ''.join(parts)
+
+    def _format_stream(self, entry: FileEntry, scan: TextScan, use_markers: bool) -> StreamedBlock:
+        """Оформляет блок большого текстового файла, содержимое которого пишется кусками."""
+        head = self._format_head(entry, use_markers)
+        tail = self._format_tail(entry, use_markers)
+        if not scan.content_chars:
+            return StreamedBlock(
+                entry.fspath, 0, f'{head}[Пустой файл]\n{tail}', '', scan.digest, scan.bytes_read, scan.encoding
+            )
+
+        language = self._get_language_for_file(entry)
+        return StreamedBlock(
+            entry.fspath,
+            scan.content_chars,
+            f'{head}{self._format_encoding(scan.encoding.name)}```{language}\n',
+            f'\n```\n{tail}',
+            scan.digest,
+            scan.bytes_read,
+            scan.encoding,
+        )
+
+    @staticmethod
+    def _format_encoding(encoding: str | None) -> str:
+        """Пометка о перекодировании для текста не в UTF-8 (пустая строка для UTF-8, в том числе с BOM)."""
+        return f'[Перекодирован в UTF-8 из {encoding}]\n' if encoding not in (None, 'utf-8', 'utf-8-sig') else ''
+
+    @staticmethod
+    def _format_head(entry: FileEntry, use_markers: bool) -> str:
+        marker = f'<!-- FILE: {entry.relative_path} START -->\n' if use_markers else ''
+        return f'{marker}### 📄 Файл: `{entry.relative_path}`\n'
+
+    @staticmethod
+    def _format_tail(entry: FileEntry, use_markers: bool) -> str:
+        marker = f'<!-- FILE: {entry.relative_path} END -->\n' if use_markers else ''
+        return f'{marker}\n'
+
+    def _render_files(
+        self,
+        files_to_include: Iterable[FileEntry],
+        use_markers: bool,
+    ) -> Iterator[RenderedFile]:
+        """Формирует блоки файлов в исходном порядке, при jobs > 1 читая их параллельно.
+
+        Одновременно в работе находится не больше jobs * _WINDOW_FACTOR файлов общим
+        размером (по stat) не больше _WINDOW_BYTES; файл, который один больше этого
+        размера, обрабатывается без соседей. Окно ограничивает и память под готовые блоки,
+        и переупорядочивание результатов. Бюджет применяется до чтения, поэтому
+        пропущенные файлы не открываются.
+        """
+        if self.budget is not None:
+            plans = self.budget.plan(files_to_include)
+        else:
+            plans = ((entry, None) for entry in files_to_include)
+
+        if self.jobs <= 1:
+            for entry, max_bytes in plans:
+                yield self.render_file(entry, use_markers, max_bytes)
+            return
+
+        # concurrent.futures (а с ним logging) загружается, только когда чтение действительно параллельное
+        from concurrent.futures import ThreadPoolExecutor
+
+        window = self.jobs * self._WINDOW_FACTOR
+        pending: deque[tuple[Future[RenderedFile], int]] = deque()
+        pending_bytes = 0
+        executor = ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix='code2md')
+        try:
+            for entry, max_bytes in plans:
+                size = self._memory_size(entry, max_bytes)
+                # Сначала освобождается место под новый файл, чтобы окно не превышало лимит
+                while pending and (len(pending) >= window or pending_bytes + size > self._WINDOW_BYTES):
+                    future, done_size = pending.popleft()
+                    pending_bytes -= done_size
+                    yield future.result()
+                pending.append((executor.submit(self.render_file, entry, use_markers, max_bytes), size))
+                pending_bytes += size
+
+            while pending:
+                yield pending.popleft()[0].result()
+        finally:
+            for future, _ in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _memory_size(self, entry: FileEntry, max_bytes: int | None) -> int:
+        """Оценка памяти под блок файла: его размер, но не больше того, что будет прочитано в память."""
+        try:
+            size = entry.size
+        except OSError:
+            return 0
+        if max_bytes is not None and size > max_bytes:
+            # Обрезаемый файл читается в память: начало и конец общим размером max_bytes
+            return max_bytes
+        # Большие файлы передаются в вывод кусками и в памяти целиком не держатся
+        return size if size <= self._STREAM_SIZE else _STREAM_READ_SIZE
 
-    @classmethod
     def write(
-        cls,
+        self,
         output_file: Path,
         project_tree: list[str],
-        files_to_include: list[Path],
+        files_to_include: list[FileEntry | Path],
         start_path: Path,
         use_markers: bool = False,
     ) -> None:
@@ -82,74 +803,306 @@ class MarkdownFileWriter(FileWriter):
         Args:
             output_file: Путь к выходному файлу
             project_tree: Список строк дерева проекта
-            files_to_include: Список путей к файлам для включения
+            files_to_include: Список файлов для включения (FileEntry от сборщика или пути)
+            start_path: Путь к корневой директории проекта
+            use_markers: Добавлять ли явные маркеры начала/конца файла
+        """
+        self._open_cache(start_path, use_markers)
+
+        with output_file.open('w', encoding='utf-8') as f:
+            out = _TextBuffer(f, self._READ_SIZE, self.record_offsets)
+            header = self.render_header(project_tree, start_path)
+            out.write(header)
+            self.count_tokens(header)
+
+            entries = (FileEntry.from_path(item, start_path) for item in files_to_include)
+            self._write_blocks(out, entries, use_markers)
+            self._write_summary(out)
+            out.flush()
+
+        self.log_counters()
+
+    @staticmethod
+    def render_header(project_tree: list[str], start_path: Path) -> str:
+        """Формирует начало документа: дерево проекта и заголовок раздела содержимого."""
+        tree = '\n'.join(project_tree)
+        return f'# 🌳 Структура проекта: {start_path.name}\n\n```\n{tree}\n```\n\n---\n\n# 📜 Содержимое файлов\n\n'
+
+    def write_stream(
+        self,
+        output_file: Path,
+        items: Iterable[TreeItem],
+        start_path: Path,
+        use_markers: bool = False,
+    ) -> int:
+        """Записывает результат, не дожидаясь окончания обхода.
+
+        Строки дерева пишутся в выходной файл сразу по мере получения, а блоки файлов
+        формируются параллельно обходу и накапливаются в SpooledTemporaryFile (в памяти
+        до _SPOOL_SIZE, дальше на диске). После обхода буфер дописывается за деревом,
+        поэтому результат совпадает с write().
+
+        Args:
+            output_file: Путь к выходному файлу
+            items: Поток строк дерева и файлов от StreamingFileCollector.iter_collect
             start_path: Путь к корневой директории проекта
             use_markers: Добавлять ли явные маркеры начала/конца файла
+
+        Returns:
+            Количество включённых файлов
         """
         with output_file.open('w', encoding='utf-8') as f:
-            f.write(f'# 🌳 Структура проекта: {start_path.name}\n\n')
-            f.write('```\n')
-            f.write('\n'.join(project_tree))
-            f.write('\n```\n\n')
-            f.write('---\n\n')
+            return self.write_to(f, items, start_path, use_markers)
 
-            f.write('# 📜 Содержимое файлов\n\n')
+    def write_binary(
+        self,
+        stream: BinaryIO,
+        items: Iterable[TreeItem],
+        start_path: Path,
+        use_markers: bool = False,
+    ) -> int:
+        """Записывает результат write_stream() в бинарный поток: stdout, BytesIO, компрессор.
 
-            for file_path in files_to_include:
-                relative_path = file_path.relative_to(start_path)
-                language = cls._get_language_for_file(file_path)
+        Перевод строк такой же, как при записи в файл, поэтому байты совпадают
+        с результатом write_stream(). Поток после записи не закрывается. При заданных
+        hooks каждая запись в поток сообщается через on_output.
 
-                if use_markers:
-                    f.write(f'<!-- FILE: {relative_path} START -->\n')
+        Returns:
+            Количество включённых файлов
+        """
+        if self.hooks is not None:
+            stream = _TimedStream(stream, self.hooks)
+        text = io.TextIOWrapper(stream, encoding='utf-8')
+        try:
+            return self.write_to(text, items, start_path, use_markers)
+        finally:
+            text.flush()
+            text.detach()
 
-                f.write(f'### 📄 Файл: `{relative_path}`\n')
+    def write_to(
+        self,
+        f: TextIO,
+        items: Iterable[TreeItem],
+        start_path: Path,
+        use_markers: bool = False,
+    ) -> int:
+        """Записывает результат write_stream() в уже открытый текстовый поток.
 
-                if cls._is_binary_file(file_path):
-                    f.write('[Бинарный файл - содержимое не отображается]\n')
+        Args:
+            f: Текстовый поток (файл, сокет, stdout)
+            items: Поток строк дерева и файлов от StreamingFileCollector.iter_collect
+            start_path: Путь к корневой директории проекта
+            use_markers: Добавлять ли явные маркеры начала/конца файла
 
-                    if use_markers:
-                        f.write(f'<!-- FILE: {relative_path} END -->\n')
+        Returns:
+            Количество включённых файлов
+        """
+        self._open_cache(start_path, use_markers)
 
-                    f.write('\n')
-                    continue
+        included = 0
+        tree_lines = 0
+        out = _TextBuffer(f, self._READ_SIZE, self.record_offsets)
 
-                try:
-                    content = file_path.read_text(encoding='utf-8')
-                except UnicodeDecodeError:
-                    f.write('[Файл содержит не-UTF-8 символы - содержимое не отображается]\n')
+        def tree_files() -> Iterator[FileEntry]:
+            nonlocal included, tree_lines
+            for line, entry in items:
+                out.write(f'{line}\n')
+                tree_lines += 1
+                self.count_tokens(line)
+                if entry is not None:
+                    included += 1
+                    yield entry
 
-                    if use_markers:
-                        f.write(f'<!-- FILE: {relative_path} END -->\n')
+        with tempfile.SpooledTemporaryFile(max_size=self._SPOOL_SIZE, mode='w+', encoding='utf-8', newline='') as spool:
+            out.write(f'# 🌳 Структура проекта: {start_path.name}\n\n```\n')
 
-                    f.write('\n')
-                    continue
-                except Exception as e:
-                    f.write(f'Не удалось прочитать файл: {e!s}\n')
+            spooled = _TextBuffer(spool, self._READ_SIZE, self.record_offsets)
+            self._write_blocks(spooled, tree_files(), use_markers)
+            spooled.flush()
 
-                    if use_markers:
-                        f.write(f'<!-- FILE: {relative_path} END -->\n')
+            if not tree_lines:
+                # Пустое дерево: write() выводит пустую строку между ограничителями
+                out.write('\n')
+            out.write('```\n\n---\n\n# 📜 Содержимое файлов\n\n')
+            out.flush()
+            if self.record_offsets:
+                # Блоки записаны в буфер раньше дерева: сдвигаем их смещения на длину начала документа
+                header_bytes = out.bytes_written
+                self.offsets = [(path, offset + header_bytes, length) for path, offset, length in self.offsets]
 
-                    f.write('\n')
-                    continue
+            spool.seek(0)
+            shutil.copyfileobj(spool, f, self._READ_SIZE)
+            self._write_summary(f)
 
-                if not content.strip():
-                    f.write('[Пустой файл]\n')
+        self.log_counters()
+        return included
 
-                    if use_markers:
-                        f.write(f'<!-- FILE: {relative_path} END -->\n')
+    def render_blocks(
+        self,
+        entries: Iterable[FileEntry],
+        start_path: Path,
+        use_markers: bool = False,
+    ) -> Iterator[tuple[FileEntry, str]]:
+        """Отдаёт готовые Markdown-блоки файлов в исходном порядке.
 
-                    f.write('\n')
-                    continue
+        Учитывает кеш (в пространстве имён проекта и параметров рендеринга, как write_to),
+        бюджет, дедупликацию и число потоков writer'а и обновляет его счётчики. Для каждого
+        файла, включённого бюджетом, отдаётся пара (файл, блок).
+        """
+        self.start_run(start_path, use_markers)
+        for rendered in self._render_files(entries, use_markers):
+            block = self.finish_block(rendered, use_markers)
+            yield rendered.entry, block if isinstance(block, str) else ''.join(block)
 
-                if language:
-                    f.write(f'```{language}\n')
-                else:
-                    f.write('```\n')
+    def start_run(self, start_path: Path, use_markers: bool = False) -> None:
+        """Начинает проход по файлам проекта для писателя, который сам планирует чтение и вывод.
+
+        Открывает пространство имён кеша и сбрасывает состояние прошлого прохода. Дальше
+        блоки формирует render_file(), дополняет finish_block() (в исходном порядке файлов),
+        выведенный текст учитывает count_tokens(), а итоги прохода пишет в лог log_counters().
+        """
+        self._open_cache(start_path, use_markers)
+        self._start_run()
+
+    def _start_run(self) -> None:
+        """Сбрасывает состояние, относящееся к одному проходу по файлам."""
+        self.truncated = []
+        self._first_copies = {}
+
+    def finish_block(self, rendered: RenderedFile, use_markers: bool = False) -> str | StreamedBlock:
+        """Дополняет готовый блок работой с кешем, учётом обрезанных файлов и дедупликацией.
+
+        Вызывается в потоке, владеющем кешем, в исходном порядке файлов.
+        """
+        entry, block, file_content, failure = rendered
+        cache = self.cache
+        digest = file_content.digest if file_content is not None else None
+        if block is None:
+            block, digest = cache.load_with_digest(entry)
+            if file_content is not None:
+                cache.revalidate(entry)
+        elif isinstance(block, StreamedBlock):
+            # Блоки больших файлов не кешируются: их пришлось бы собрать в памяти целиком
+            digest = block.digest
+        elif file_content is not None and file_content.truncated_bytes:
+            self.truncated.append(
+                (entry.relative_path, f'обрезан, пропущено {file_content.truncated_bytes} байт из середины')
+            )
+        elif cache is not None and failure != 'read_error':
+            # Ошибка чтения (нет прав, файл занят) может быть временной: блок с ней не кешируется,
+            # иначе он выдавался бы до изменения mtime. Ошибка декодирования зависит только от содержимого
+            cache.store(entry, block, digest)
+
+        if self.dedup and digest is not None:
+            block = self._deduplicate(entry, block, digest, use_markers)
+
+        if file_content is not None:
+            if file_content.is_binary:
+                self.counters[f'binary:{file_content.binary_kind}'] += 1
+            else:
+                # Раньше файл открывался второй раз и начальный фрагмент перечитывался
+                self.counters['opens_saved'] += 1
+                self.counters['bytes_saved'] += file_content.sniffed_bytes
+                self.counters[f'encoding:{file_content.encoding}'] += 1
+        elif isinstance(block, StreamedBlock):
+            self.counters[f'encoding:{block.encoding.name}'] += 1
+
+        return block
+
+    def _deduplicate(
+        self, entry: FileEntry, block: str | StreamedBlock, digest: str, use_markers: bool
+    ) -> str | StreamedBlock:
+        """Заменяет блок повторной копии ссылкой на первый файл с тем же содержимым.
+
+        Решение зависит только от хеша и самого блока, поэтому одинаково для блоков
+        из кеша и свежепрочитанных. Блок, который короче ссылки, остаётся как есть.
+        """
+        first_path = self._first_copies.setdefault(digest, entry.relative_path)
+        if first_path == entry.relative_path:
+            return block
+
+        reference = self._format_reference(entry, first_path, use_markers)
+        block_chars = len(block) if isinstance(block, str) else block.chars
+        if len(reference) >= block_chars and isinstance(block, str):
+            return block
+
+        self.counters['duplicates'] += 1
+        self.counters['duplicate_chars_saved'] += block_chars - len(reference)
+        return reference
+
+    def _format_reference(self, entry: FileEntry, first_path: str, use_markers: bool) -> str:
+        """Оформляет блок-ссылку повторной копии на первый файл с тем же содержимым."""
+        return (
+            f'{self._format_head(entry, use_markers)}'
+            f'[Содержимое совпадает с файлом `{first_path}` - повторно не отображается]\n'
+            f'{self._format_tail(entry, use_markers)}'
+        )
+
+    def _write_blocks(self, f: TextIO | _TextBuffer, entries: Iterable[FileEntry], use_markers: bool) -> None:
+        """Пишет блоки файлов в поток; при record_offsets запоминает их смещения (f — _TextBuffer).
+
+        Блоки больших файлов пишутся кусками по мере чтения.
+        """
+        offsets = self.offsets = []
+        self._start_run()
+        for rendered in self._render_files(entries, use_markers):
+            block = self.finish_block(rendered, use_markers)
+            start = f.bytes_written if self.record_offsets else 0
+            if isinstance(block, str):
+                f.write(block)
+                self.count_tokens(block)
+            else:
+                for part in block:
+                    f.write(part)
+                    self.count_tokens(part)
+            if self.record_offsets:
+                offsets.append((rendered.entry.relative_path, start, f.bytes_written - start))
+
+    def count_tokens(self, text: str) -> None:
+        """Добавляет выведенный текст к счётчику токенов (при заданном token_estimator)."""
+        if self.token_estimator is not None:
+            self.counters['tokens'] += self.token_estimator.count(text)
+
+    def _write_summary(self, f: TextIO | _TextBuffer) -> None:
+        """Дописывает раздел с файлами, пропущенными или обрезанными из-за бюджета."""
+        f.write(self.render_summary())
+
+    def render_summary(self) -> str:
+        """Перечисляет файлы, пропущенные или обрезанные из-за бюджета (пустая строка, если таких нет)."""
+        rows = (self.budget.omitted if self.budget is not None else []) + self.truncated
+        if not rows:
+            return ''
+
+        summary = ''.join(f'- `{path}` — {reason}\n' for path, reason in rows)
+        self.count_tokens(summary)
+        return f'# ✂️ Пропущенные и обрезанные файлы\n\n{summary}\n'
+
+    def _open_cache(self, start_path: Path, use_markers: bool) -> None:
+        if self.cache is not None:
+            max_file_bytes = getattr(self.budget, 'max_file_bytes', None)
+            self.cache.open_namespace(
+                BlockCache.make_namespace(start_path, use_markers, max_file_bytes, *self._render_options())
+            )
 
-                f.write(content.rstrip())
-                f.write('\n```\n')
+    def _render_options(self) -> tuple[str, ...]:
+        """Параметры рендеринга для пространства имён кеша: кандидаты кодировок и режим --outline."""
+        options = [f'encodings:{",".join(self.encodings)}']
+        if self.outliner is not None:
+            options.append(f'outline:{self.outliner.mode}')
+        return tuple(options)
 
-                if use_markers:
-                    f.write(f'<!-- FILE: {relative_path} END -->\n')
+    def encoding_counts(self) -> dict[str, int]:
+        """Число прочитанных текстовых файлов по исходной кодировке (блоки из кеша не учитываются)."""
+        return {key.partition(':')[2]: count for key, count in self.counters.items() if key.startswith('encoding:')}
 
-                f.write('\n')
+    def log_counters(self) -> None:
+        """Пишет в лог итоги прохода: сэкономленные чтения, виды бинарных файлов и кодировки."""
+        if self.logger:
+            self.logger.info(
+                f'Одно чтение на файл: сэкономлено открытий {self.counters["opens_saved"]}, '
+                f'повторно не прочитано байт {self.counters["bytes_saved"]}'
+            )
+            binary = {key.partition(':')[2]: count for key, count in self.counters.items() if key.startswith('binary:')}
+            if binary:
+                self.logger.info(f'Бинарные файлы по видам: {binary}')
+            self.logger.info(f'Текстовые файлы по кодировкам: {self.encoding_counts()}')
@@ -0,0 +1,199 @@
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, TextIO
+
+from code2md.cache import BlockCache
+from code2md.file_writer import FileContent, MarkdownFileWriter, StreamedBlock, TextScan, _TextBuffer
+from code2md.interfaces import FileEntry, TreeItem
+
+OFFSET_INDEX_VERSION = 1
+OFFSET_INDEX_SUFFIX = '.index.json'
+
+
+class JsonlFileWriter(MarkdownFileWriter):
+    """Записывает снимок в JSON Lines: по одной записи на файл.
+
+    Конвейер тот же, что у MarkdownFileWriter (параллельное чтение, бюджет, кеш,
+    дедупликация), меняется только оформление: вместо Markdown-блока — JSON-объект
+    с ключами path, kind, size и, в зависимости от kind, language, content,
+    truncated_bytes, binary_kind, error, duplicate_of, reason. В режиме --outline
+    kind = 'outline' означает, что content — структура файла, а содержимое файлов
+    без структуры в режиме structure опускается (kind = 'omitted', reason = 'outline').
+    Файлы, пропущенные бюджетом, дописываются в конце записями с kind = 'omitted'. Содержимое
+    передаётся без обрезки пробелов, с нормализованными переводами строк; текст не в UTF-8
+    перекодируется, а его исходная кодировка указывается в ключе encoding.
+    """
+
+    def _record_line(self, entry: FileEntry, kind: str, details: dict[str, Any]) -> str:
+        try:
+            size: int | None = entry.size
+        except OSError:
+            size = None
+        return _json_line({'path': entry.relative_path, 'kind': kind, 'size': size, **details})
+
+    def _format_block(
+        self,
+        entry: FileEntry,
+        file_content: FileContent | None,
+        error: Exception | None,
+        use_markers: bool,
+    ) -> str:
+        details: dict[str, Any] = {}
+        if isinstance(error, UnicodeDecodeError):
+            kind = 'decode_error'
+        elif error is not None:
+            kind = 'read_error'
+            details['error'] = str(error)
+        elif file_content.is_binary:
+            kind = 'binary'
+            details['binary_kind'] = file_content.binary_kind
+        elif file_content.summary == 'omitted':
+            kind = 'omitted'
+            details['reason'] = 'outline'
+        else:
+            kind = 'text' if file_content.text.strip() else 'empty'
+            if file_content.summary == 'outline':
+                kind = 'outline'
+            details['language'] = self._get_language_for_file(entry)
+            if file_content.encoding != 'utf-8':
+                details['encoding'] = file_content.encoding
+            details['content'] = file_content.text
+            if file_content.truncated_bytes:
+                details['truncated_bytes'] = file_content.truncated_bytes
+
+        return self._record_line(entry, kind, details)
+
+    def _format_stream(self, entry: FileEntry, scan: TextScan, use_markers: bool) -> StreamedBlock:
+        details = {'language': self._get_language_for_file(entry)}
+        if scan.encoding.name != 'utf-8':
+            details['encoding'] = scan.encoding.name
+        details['content'] = ''
+
+        line = self._record_line(entry, 'text' if scan.content_chars else 'empty', details)
+        # content — последний ключ записи: содержимое вставляется между его кавычками по частям
+        return StreamedBlock(
+            entry.fspath,
+            scan.chars,
+            line[:-3],
+            line[-3:],
+            scan.digest,
+            scan.bytes_read,
+            scan.encoding,
+            transform=_json_escape,
+        )
+
+    def _format_reference(self, entry: FileEntry, first_path: str, use_markers: bool) -> str:
+        return _json_line({'path': entry.relative_path, 'kind': 'duplicate', 'duplicate_of': first_path})
+
+    @staticmethod
+    def render_header(project_tree: list[str], start_path: Path) -> str:
+        return ''
+
+    def render_summary(self) -> str:
+        """Записи о файлах, пропущенных бюджетом (обрезанные отмечены в своих записях)."""
+        if self.budget is None or not self.budget.omitted:
+            return ''
+        summary = ''.join(
+            _json_line({'path': path, 'kind': 'omitted', 'reason': reason}) for path, reason in self.budget.omitted
+        )
+        self.count_tokens(summary)
+        return summary
+
+    def write_to(
+        self,
+        f: TextIO,
+        items: Iterable[TreeItem],
+        start_path: Path,
+        use_markers: bool = False,
+    ) -> int:
+        """Записывает записи файлов в уже открытый текстовый поток сразу по мере обхода.
+
+        Returns:
+            Количество включённых файлов
+        """
+        self._open_cache(start_path, use_markers)
+
+        included = 0
+        out = _TextBuffer(f, self._READ_SIZE, self.record_offsets)
+
+        def files() -> Iterator[FileEntry]:
+            nonlocal included
+            for _, entry in items:
+                if entry is not None:
+                    included += 1
+                    yield entry
+
+        self._write_blocks(out, files(), use_markers)
+        self._write_summary(out)
+        out.flush()
+
+        self.log_counters()
+        return included
+
+    def _open_cache(self, start_path: Path, use_markers: bool) -> None:
+        if self.cache is not None:
+            max_file_bytes = getattr(self.budget, 'max_file_bytes', None)
+            self.cache.open_namespace(
+                BlockCache.make_namespace(start_path, 'jsonl', max_file_bytes, *self._render_options())
+            )
+
+
+# json нужен только формату jsonl и индексу смещений, поэтому импортируется по месту
+def _json_line(record: dict[str, Any]) -> str:
+    import json
+
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def _json_escape(text: str) -> str:
+    import json
+
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+# Формат вывода -> (расширение файла, класс writer'а)
+FORMATS: dict[str, tuple[str, type[MarkdownFileWriter]]] = {
+    'markdown': ('.md', MarkdownFileWriter),
+    'jsonl': ('.jsonl', JsonlFileWriter),
+}
+
+
+def write_offset_index(
+    index_file: Path,
+    output_file: Path,
+    output_format: str,
+    offsets: list[tuple[str, int, int]],
+) -> None:
+    """Сохраняет индекс смещений блоков рядом с результатом.
+
+    Смещение и длина указаны в байтах несжатого результата, поэтому блок файла можно
+    прочитать через seek/mmap без разбора всего документа.
+
+    Args:
+        index_file: Путь к файлу индекса
+        output_file: Результат, к которому относится индекс
+        output_format: Формат результата ('markdown' или 'jsonl')
+        offsets: Записи (относительный путь, смещение, длина) из MarkdownFileWriter.offsets
+    """
+    import json
+
+    index = {
+        'version': OFFSET_INDEX_VERSION,
+        'output': output_file.name,
+        'format': output_format,
+        'files': [{'path': path, 'offset': offset, 'length': length} for path, offset, length in offsets],
+    }
+    index_file.write_text(json.dumps(index, ensure_ascii=False), encoding='utf-8')
+
+
+def read_indexed_block(output_file: Path, index_file: Path, relative_path: str) -> bytes | None:
+    """Читает блок одного файла по индексу смещений; None, если пути нет в индексе."""
+    import json
+
+    index = json.loads(index_file.read_text(encoding='utf-8'))
+    for record in index['files']:
+        if record['path'] == relative_path:
+            with output_file.open('rb') as f:
+                f.seek(record['offset'])
+                return f.read(record['length'])
+    return None
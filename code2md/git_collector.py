@@ -0,0 +1,101 @@
+from collections.abc import Iterable, Iterator
+import os
+from pathlib import Path
+import subprocess
+import time
+
+from code2md.exclusions import ExclusionRules
+from code2md.file_collector import iter_tree_from_paths
+from code2md.interfaces import StreamingFileCollector, TreeItem
+from code2md.stats import InstrumentedRules, SnapshotHooks
+
+_GITLINK_MODE = '160000'
+_SYMLINK_MODE = '120000'
+
+
+class GitCollectorError(RuntimeError):
+    """Raised when the file list cannot be obtained from git."""
+
+
+class GitFileCollector(StreamingFileCollector):
+    """Сборщик, берущий список файлов из индекса git вместо обхода директорий.
+
+    Включаются отслеживаемые файлы и неотслеживаемые, не попавшие под .gitignore,
+    .git/info/exclude и глобальные исключения. Игнорируемые директории git не обходит
+    вовсе, а обычные правила исключения code2md применяются поверх этого списка.
+    Подмодули и удалённые из рабочей копии файлы пропускаются.
+    """
+
+    def __init__(self, verbose: bool = False, hooks: SnapshotHooks | None = None) -> None:
+        self.verbose = verbose
+        self.hooks = hooks
+        if verbose:
+            import logging
+
+            logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+            self.logger = logging.getLogger(__name__)
+        else:
+            self.logger = None
+
+    def iter_collect(
+        self,
+        start_path: Path,
+        excluded_dirs: set[str],
+        excluded_files: set[str],
+        excluded_extensions: set[str],
+        exclude_dotfiles: bool,
+        include_paths: Iterable[str] = (),
+        exclude_paths: Iterable[str] = (),
+    ) -> Iterator[TreeItem]:
+        """Отдаёт строки дерева и файлы для включения по данным git.
+
+        Список файлов запрашивается у git сразу при вызове, поэтому GitCollectorError
+        возникает до начала записи результата.
+        """
+        started = time.perf_counter()
+        relative_paths = self._list_files(start_path)
+        if self.hooks is not None:
+            self.hooks.on_phase('git', time.perf_counter() - started)
+
+        if self.logger:
+            self.logger.info(f'Файлов в индексе git и неотслеживаемых: {len(relative_paths)}')
+
+        rules = ExclusionRules(
+            excluded_dirs, excluded_files, excluded_extensions, exclude_dotfiles, include_paths, exclude_paths
+        )
+        if self.hooks is not None:
+            rules = InstrumentedRules(rules, self.hooks)
+        return iter_tree_from_paths(start_path, relative_paths, rules)
+
+    def _list_files(self, start_path: Path) -> list[str]:
+        """Возвращает пути файлов относительно start_path в формате git (через '/')."""
+        files = set()
+        for line in self._git(start_path, '--stage'):
+            meta, _, path = line.partition('\t')
+            mode = meta.split(' ', 1)[0]
+            if mode == _GITLINK_MODE:
+                continue
+            if mode == _SYMLINK_MODE and os.path.isdir(os.path.join(start_path, path)):
+                # DefaultFileCollector не заходит в ссылки на директории и не показывает их
+                continue
+            files.add(path)
+
+        files.update(self._git(start_path, '--others', '--exclude-standard'))
+        files.difference_update(self._git(start_path, '--deleted'))
+        return list(files)
+
+    @staticmethod
+    def _git(start_path: Path, *args: str) -> list[str]:
+        try:
+            result = subprocess.run(
+                ['git', 'ls-files', '-z', *args],
+                cwd=start_path,
+                check=True,
+                capture_output=True,
+            )
+        except FileNotFoundError as exc:
+            raise GitCollectorError('git executable was not found') from exc
+        except subprocess.CalledProcessError as exc:
+            raise GitCollectorError(os.fsdecode(exc.stderr).strip() or str(exc)) from exc
+
+        return [os.fsdecode(path) for path in result.stdout.split(b'\0') if path]
@@ -1,5 +1,78 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+import os
 from pathlib import Path
+from typing import NamedTuple, Union
+
+
+class FileEntry:
+    """Файл, отобранный сборщиком, вместе с уже известными о нём метаданными.
+
+    Сборщик передаёт сюда os.DirEntry, поэтому тип файла и результат stat берутся
+    из него и не запрашиваются у файловой системы повторно.
+    """
+
+    __slots__ = ('_dir_entry', '_path', '_stat', 'fspath', 'relative_path')
+
+    def __init__(self, fspath: str, relative_path: str, dir_entry: os.DirEntry | None = None) -> None:
+        self.fspath = fspath
+        self.relative_path = relative_path
+        self._dir_entry = dir_entry
+        self._path: Path | None = None
+        self._stat: os.stat_result | None = None
+
+    @classmethod
+    def from_path(cls, path: Union[Path, 'FileEntry'], start_path: Path) -> 'FileEntry':
+        """Создаёт запись для пути, полученного не от сборщика."""
+        if isinstance(path, FileEntry):
+            return path
+        return cls(os.fspath(path), str(path.relative_to(start_path)))
+
+    def __fspath__(self) -> str:
+        return self.fspath
+
+    def __repr__(self) -> str:
+        return f'FileEntry({self.relative_path!r})'
+
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            self._path = Path(self.fspath)
+        return self._path
+
+    @property
+    def name(self) -> str:
+        return self._dir_entry.name if self._dir_entry is not None else self.path.name
+
+    def stat(self) -> os.stat_result:
+        """Возвращает stat файла (по ссылке), запрашивая его не больше одного раза."""
+        if self._stat is None:
+            if self._dir_entry is not None:
+                self._stat = self._dir_entry.stat()
+            else:
+                self._stat = os.stat(self.fspath)
+        return self._stat
+
+    @property
+    def size(self) -> int:
+        return self.stat().st_size
+
+    @property
+    def mtime(self) -> float:
+        return self.stat().st_mtime
+
+    @property
+    def is_symlink(self) -> bool:
+        if self._dir_entry is not None:
+            return self._dir_entry.is_symlink()
+        return os.path.islink(self.fspath)
+
+
+class TreeItem(NamedTuple):
+    """Очередная строка дерева проекта; для файлов — вместе с самим файлом."""
+
+    line: str
+    file: FileEntry | None
 
 
 class FileCollector(ABC):
@@ -13,6 +86,8 @@ class FileCollector(ABC):
         excluded_files: set[str],
         excluded_extensions: set[str],
         exclude_dotfiles: bool,
+        include_paths: Iterable[str] = (),
+        exclude_paths: Iterable[str] = (),
     ) -> tuple[list[str], list[Path]]:
         pass
 
@@ -25,7 +100,114 @@ class FileWriter(ABC):
         self,
         output_file: Path,
         project_tree: list[str],
-        files_to_include: list[Path],
+        files_to_include: list[FileEntry | Path],
+        start_path: Path,
+    ) -> None:
+        pass
+
+
+class StreamingFileCollector(FileCollector):
+    """Сборщик, отдающий дерево проекта по мере обхода."""
+
+    @abstractmethod
+    def iter_collect(
+        self,
+        start_path: Path,
+        excluded_dirs: set[str],
+        excluded_files: set[str],
+        excluded_extensions: set[str],
+        exclude_dotfiles: bool,
+        include_paths: Iterable[str] = (),
+        exclude_paths: Iterable[str] = (),
+    ) -> Iterator[TreeItem]:
+        pass
+
+    def collect(
+        self,
+        start_path: Path,
+        excluded_dirs: set[str],
+        excluded_files: set[str],
+        excluded_extensions: set[str],
+        exclude_dotfiles: bool,
+        include_paths: Iterable[str] = (),
+        exclude_paths: Iterable[str] = (),
+    ) -> tuple[list[str], list[Path]]:
+        """Собирает результат iter_collect в списки строк дерева и путей файлов."""
+        project_tree, entries = self.collect_entries(
+            start_path,
+            excluded_dirs,
+            excluded_files,
+            excluded_extensions,
+            exclude_dotfiles,
+            include_paths,
+            exclude_paths,
+        )
+        return project_tree, [entry.path for entry in entries]
+
+    def collect_entries(
+        self,
+        start_path: Path,
+        excluded_dirs: set[str],
+        excluded_files: set[str],
+        excluded_extensions: set[str],
+        exclude_dotfiles: bool,
+        include_paths: Iterable[str] = (),
+        exclude_paths: Iterable[str] = (),
+    ) -> tuple[list[str], list[FileEntry]]:
+        """Как collect, но отдаёт файлы в виде FileEntry с уже полученными при обходе метаданными.
+
+        Писатели принимают FileEntry наравне с путями и не запрашивают stat повторно.
+        """
+        project_tree = []
+        files_to_include = []
+        for line, entry in self.iter_collect(
+            start_path,
+            excluded_dirs,
+            excluded_files,
+            excluded_extensions,
+            exclude_dotfiles,
+            include_paths,
+            exclude_paths,
+        ):
+            project_tree.append(line)
+            if entry is not None:
+                files_to_include.append(entry)
+        return project_tree, files_to_include
+
+
+class StreamingFileWriter(FileWriter):
+    """Писатель, начинающий запись до завершения обхода."""
+
+    @abstractmethod
+    def write_stream(
+        self,
+        output_file: Path,
+        items: Iterable[TreeItem],
+        start_path: Path,
+    ) -> int:
+        pass
+
+
+class AsyncSink(ABC):
+    """Асинхронный приёмник текста результата: файл, сокет или буфер в памяти."""
+
+    @abstractmethod
+    async def write(self, text: str) -> None:
+        pass
+
+    async def aclose(self) -> None:  # noqa: B027
+        """Дописывает буферизованные данные и освобождает ресурсы приёмника."""
+
+
+class AsyncFileWriter(ABC):
+    """Асинхронный интерфейс для записи результатов, не блокирующий цикл событий."""
+
+    @abstractmethod
+    async def write(
+        self,
+        sink: AsyncSink,
+        project_tree: list[str],
+        files_to_include: list[FileEntry | Path],
         start_path: Path,
     ) -> None:
         pass
@@ -1,25 +1,66 @@
 import argparse
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+import contextlib
+import functools
 from pathlib import Path
+import sys
+import time
+from typing import TYPE_CHECKING, BinaryIO, Optional
 
-from code2md.clipboard_helper import copy_file_to_clipboard
-from code2md.consts import (
-    FRONTEND_DEFAULT_EXCLUDED_DIRS,
-    FRONTEND_DEFAULT_EXCLUDED_EXTENSIONS,
-    FRONTEND_DEFAULT_EXCLUDED_FILES,
-    GENERAL_EXCLUDED_DIRS,
-    GENERAL_EXCLUDED_EXTENSIONS,
-    GENERAL_EXCLUDED_FILES,
-    PYTHON_DEFAULT_EXCLUDED_DIRS,
-    PYTHON_DEFAULT_EXCLUDED_EXTENSIONS,
-    PYTHON_DEFAULT_EXCLUDED_FILES,
-)
+from code2md.budget import SizeBudget
+from code2md.cache import DEFAULT_CACHE_MAX_BYTES, BlockCache
+from code2md.config import ConfigError, find_config, load_config
+from code2md.consts import OUTLINE_MODES
+from code2md.encoding_detection import DEFAULT_ENCODINGS
 from code2md.file_collector import DefaultFileCollector
 from code2md.file_writer import MarkdownFileWriter
+from code2md.formats import FORMATS, OFFSET_INDEX_SUFFIX, write_offset_index
+from code2md.interfaces import StreamingFileCollector, TreeItem
+from code2md.options import build_budget, build_encodings, build_exclusions, parse_byte_size, split_list
+from code2md.output import COMPRESSIONS, OutputError, check_compression, compressed_suffix, open_compressed
+from code2md.stats import SnapshotStats
+from code2md.tokens import PRIORITIES, TokenEstimator, TokenEstimatorError
+
+if TYPE_CHECKING:
+    from code2md.outline import Outliner
+
+# Modules of optional modes (--serve/--client, --git, --watch, sharding, --copy, --outline) are imported
+# inside those modes, so a plain run on a small project does not pay for loading them
 
 MAX_MARKER_FILES = 100
 MAX_MARKER_BYTES = 200_000
 
 
+def _positive_int(value: str) -> int:
+    """Argparse type for integer options that must be >= 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'expected a positive integer, got {value}')
+    return number
+
+
+def _byte_size(value: str) -> int:
+    """Argparse type for byte sizes: a plain number or one with a K/M/G suffix (e.g. "64M")."""
+    try:
+        return parse_byte_size(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from None
+
+
+def _build_outliner(args: argparse.Namespace) -> Optional['Outliner']:
+    """Outliner for --outline, or None; code2md.outline (ast, threading) is only loaded when asked for.
+
+    With --jobs 1 files are rendered one at a time, so a process pool would only add a round trip
+    per file: outlines are then extracted in-process.
+    """
+    if not args.outline:
+        return None
+    from code2md.outline import Outliner
+
+    return Outliner(args.outline, processes=None if args.jobs > 1 else 1)
+
+
 def main() -> None:
     """Entry point for the code2md CLI."""
     parser = argparse.ArgumentParser(
@@ -75,79 +116,639 @@ def main() -> None:
         action='store_true',
         help='Add standard exclusions for frontend projects.',
     )
+    parser.add_argument(
+        '--include-paths',
+        help='Comma-separated globs of paths relative to the project root; only matching files\n'
+        'are included (e.g. "src/**/*.py,README.md"). "*" stays within one directory,\n'
+        '"**" spans any number of them, and a matching directory includes its whole subtree.',
+    )
+    parser.add_argument(
+        '--exclude-paths',
+        help='Comma-separated globs of paths relative to the project root to exclude,\n'
+        'with the same syntax as --include-paths (e.g. "docs/_build,src/**/generated").',
+    )
+    parser.add_argument(
+        '--config',
+        metavar='PATH',
+        help='Read options from this TOML file instead of <project>/.code2md.toml or\n'
+        'the [tool.code2md] table of <project>/pyproject.toml.',
+    )
+    parser.add_argument(
+        '--no-config',
+        action='store_true',
+        help='Ignore project config files.',
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='NAME',
+        help='Apply the named profile ([profiles.NAME]) from the config on top of its top-level options.\n'
+        'Options given on the command line always take precedence over the config.',
+    )
+    parser.add_argument(
+        '--git',
+        action='store_true',
+        help='Take the file list from git (tracked plus untracked, non-ignored files)\n'
+        'instead of walking the directory tree; ignored directories are never entered.',
+    )
     parser.add_argument(
         '--copy',
         action='store_true',
         help='Copy the generated Markdown file to the system clipboard.',
     )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        type=_positive_int,
+        default=1,
+        help='Number of threads used to read files concurrently (default: 1).\nThe output is identical for any value.',
+    )
+    parser.add_argument(
+        '--max-file-bytes',
+        type=_byte_size,
+        nargs='?',
+        const=MAX_MARKER_BYTES,
+        help=f'Per-file content cap; larger files keep only their head and tail\n'
+        f'(default when given without a value: {MAX_MARKER_BYTES}).',
+    )
+    parser.add_argument(
+        '--max-total-bytes',
+        type=_byte_size,
+        help='Total content budget; files that do not fit (by their size on disk) are skipped\n'
+        'without being read and listed in a summary section.',
+    )
+    parser.add_argument(
+        '--max-files',
+        type=_positive_int,
+        nargs='?',
+        const=MAX_MARKER_FILES,
+        help=f'Maximum number of files whose contents are included\n'
+        f'(default when given without a value: {MAX_MARKER_FILES}).',
+    )
+    parser.add_argument(
+        '--max-tokens',
+        type=_positive_int,
+        help='Token budget for the whole snapshot: files are ranked by --priority and\n'
+        'rendered in full, truncated or omitted so that the estimate fits.',
+    )
+    parser.add_argument(
+        '--tokenizer',
+        default='heuristic',
+        help='Token estimator: "heuristic[:chars_per_token]" (default, 4 chars per token)\n'
+        'or "tiktoken[:encoding]" (exact count, requires the tiktoken package).',
+    )
+    parser.add_argument(
+        '--priority',
+        choices=PRIORITIES,
+        default='depth',
+        help='Ranking used by --max-tokens: shallow files first (depth, default),\n'
+        'small files first (size) or tree order (order).',
+    )
+    parser.add_argument(
+        '--priority-patterns',
+        help='Comma-separated path or name globs ranked ahead of everything else\n'
+        'by --max-tokens, in the given order (e.g. "README.md,src/**/*.py").',
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help='Directory for a persistent cache of rendered file blocks.\n'
+        'Unchanged files (same size and mtime) are spliced from the cache without being read;\n'
+        'touched files whose content hash still matches reuse their cached block.',
+    )
+    parser.add_argument(
+        '--cache-max-bytes',
+        type=_byte_size,
+        default=DEFAULT_CACHE_MAX_BYTES,
+        help='Size limit of the block cache; least recently used blocks are evicted (default: 256M).',
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running and update the Markdown file whenever project files change.\n'
+        'Only changed files are re-read; the file is rewritten from the first changed block.',
+    )
+    parser.add_argument(
+        '--debounce',
+        type=float,
+        default=0.3,
+        help='Seconds of quiet to wait before applying a burst of changes in --watch mode (default: 0.3).',
+    )
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='Run a resident snapshot server on a Unix socket (see --socket); it keeps\n'
+        'imports and an in-memory block cache (bounded by --cache-max-bytes) warm.',
+    )
+    parser.add_argument(
+        '--client',
+        action='store_true',
+        help='Ask a running --serve process to build the snapshot instead of doing it in-process.',
+    )
+    parser.add_argument(
+        '--socket',
+        help='Unix socket path for --serve and --client\n'
+        '(default: $XDG_RUNTIME_DIR/code2md.sock, else code2md-<uid>.sock in the temp directory).',
+    )
+    parser.add_argument(
+        '--stdout',
+        action='store_true',
+        help='Write the Markdown to standard output instead of a file (status messages go to stderr).',
+    )
+    parser.add_argument(
+        '--compress',
+        choices=tuple(COMPRESSIONS),
+        help='Compress the output on the fly; the file name gets the matching suffix\n'
+        '(e.g. .md.gz). zstd requires Python 3.14+.',
+    )
+    parser.add_argument(
+        '--format',
+        choices=tuple(FORMATS),
+        default='markdown',
+        help='Output format: markdown (default) or jsonl (one JSON record per file).',
+    )
+    parser.add_argument(
+        '--index',
+        action='store_true',
+        help='Also write <output>.index.json with the byte offset and length of every file\n'
+        'block, so consumers can seek straight to a file without parsing the output.',
+    )
+    parser.add_argument(
+        '--shard-size',
+        type=_byte_size,
+        help='Split the output into shards of about SIZE of source files each (e.g. "50M"),\n'
+        'written in parallel (see --jobs) to <project>_structure/ with an index.json of paths.',
+    )
+    parser.add_argument(
+        '--shard-by-dir',
+        action='store_true',
+        help='Write one shard per top-level directory (plus one for root files);\n'
+        'with --shard-size, large directories are split further.',
+    )
+    parser.add_argument(
+        '--dedup',
+        action='store_true',
+        help='Emit the body of byte-identical files once; later copies become a short\n'
+        'reference to the first path. Hashes are taken from the single read of each file.',
+    )
+    parser.add_argument(
+        '--outline',
+        nargs='?',
+        const='skeleton',
+        choices=OUTLINE_MODES,
+        help='Replace file bodies with an outline: signatures, class/def names and docstrings\n'
+        '(Python via ast, other languages from LANGUAGE_MAP via regex). "skeleton" (default)\n'
+        'keeps files without an outline in full, "structure" omits their contents.\n'
+        'Parsing runs in a process pool and is cached by content hash.',
+    )
+    parser.add_argument(
+        '--encodings',
+        metavar='CODECS',
+        help='Comma-separated codecs to try, in order, for text that is not UTF-8\n'
+        f'(default: {",".join(DEFAULT_ENCODINGS)}; "none" disables detection). Detected files\n'
+        'are transcoded to UTF-8; UTF-8/16/32 files with a BOM are recognised by the BOM.',
+    )
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='Time each stage (walk, rule matching, sniffing, decoding, writing) and print\n'
+        'counters with the slowest files and directories at the end.',
+    )
 
     parser.set_defaults(exclude_dotfiles=True)
     args = parser.parse_args()
 
-    start_path = Path(args.project_path).resolve()
+    config_file = None
+    if args.no_config and (args.config or args.profile):
+        parser.error('--no-config cannot be combined with --config or --profile')
+    if not args.no_config and not args.serve:
+        config_file = Path(args.config) if args.config else find_config(Path(args.project_path))
+        if config_file is None and args.profile:
+            parser.error('--profile requires a config file (.code2md.toml or [tool.code2md] in pyproject.toml)')
+    if config_file is not None:
+        try:
+            config_options = load_config(config_file, args.profile)
+        except ConfigError as exc:
+            parser.error(str(exc))
+        if config_options:
+            # Config options become parser defaults, so explicit command-line flags still override them
+            parser.set_defaults(**config_options)
+            args = parser.parse_args()
+        else:
+            config_file = None
 
-    excluded_dirs = set(GENERAL_EXCLUDED_DIRS)
-    excluded_files = set(GENERAL_EXCLUDED_FILES)
-    excluded_extensions = set(GENERAL_EXCLUDED_EXTENSIONS)
+    if args.serve or args.client:
+        from code2md.daemon import DaemonError, default_socket_path, request_snapshot, serve
 
-    if args.add_python_defaults:
-        excluded_dirs.update(PYTHON_DEFAULT_EXCLUDED_DIRS)
-        excluded_files.update(PYTHON_DEFAULT_EXCLUDED_FILES)
-        excluded_extensions.update(PYTHON_DEFAULT_EXCLUDED_EXTENSIONS)
+        socket_path = Path(args.socket) if args.socket else default_socket_path()
+    if args.serve:
+        print(f'🛰️ Serving snapshots on {socket_path} (press Ctrl+C to stop)')
+        try:
+            serve(socket_path, args.cache_max_bytes, verbose=args.verbose)
+        except KeyboardInterrupt:
+            print('\n🛑 Server stopped.')
+        except DaemonError as exc:
+            parser.error(str(exc))
+        return
 
-    if args.add_frontend_defaults:
-        excluded_dirs.update(FRONTEND_DEFAULT_EXCLUDED_DIRS)
-        excluded_files.update(FRONTEND_DEFAULT_EXCLUDED_FILES)
-        excluded_extensions.update(FRONTEND_DEFAULT_EXCLUDED_EXTENSIONS)
+    if args.client and (args.watch or args.cache_dir):
+        parser.error('--client cannot be combined with --watch or --cache-dir')
 
-    if args.exclude_dirs:
-        excluded_dirs.update(d.strip() for d in args.exclude_dirs.split(',') if d.strip())
+    if args.dedup and args.watch:
+        parser.error('--dedup cannot be combined with --watch')
 
-    if args.exclude_files:
-        excluded_files.update(f.strip() for f in args.exclude_files.split(',') if f.strip())
+    if args.stats and (args.client or args.watch):
+        parser.error('--stats cannot be combined with --client or --watch')
 
-    if args.exclude_extensions:
-        excluded_extensions.update(
-            f'.{e.strip().lstrip(".")}'
-            for e in args.exclude_extensions.split(',')
-            if e.strip()
-        )
+    if args.stdout and (args.copy or args.watch):
+        parser.error('--stdout cannot be combined with --copy or --watch')
+
+    if args.compress:
+        if args.watch:
+            parser.error('--compress cannot be combined with --watch')
+        try:
+            check_compression(args.compress)
+        except OutputError as exc:
+            parser.error(str(exc))
+
+    if args.watch and (
+        args.max_file_bytes is not None
+        or args.max_total_bytes is not None
+        or args.max_files is not None
+        or args.max_tokens is not None
+    ):
+        parser.error('--watch cannot be combined with --max-file-bytes, --max-total-bytes, --max-files or --max-tokens')
+
+    if args.format != 'markdown' and (args.watch or args.client):
+        parser.error(f'--format {args.format} cannot be combined with --watch or --client')
+    if args.index and (args.watch or args.client or args.stdout or args.compress):
+        parser.error('--index cannot be combined with --watch, --client, --stdout or --compress')
+
+    sharded = args.shard_size is not None or args.shard_by_dir
+    if sharded and (args.format != 'markdown' or args.index):
+        parser.error('sharding cannot be combined with --format or --index')
+    if sharded and (args.watch or args.client or args.stdout or args.copy or args.cache_dir):
+        parser.error('sharding cannot be combined with --watch, --client, --stdout, --copy or --cache-dir')
+    if sharded and (args.max_total_bytes is not None or args.max_files is not None or args.max_tokens is not None):
+        parser.error('sharding cannot be combined with --max-total-bytes, --max-files or --max-tokens')
+
+    try:
+        encodings = build_encodings(args.encodings)
+    except ValueError as exc:
+        parser.error(f'--encodings: {exc}')
+
+    start_path = Path(args.project_path).resolve()
+
+    excluded_dirs, excluded_files, excluded_extensions = build_exclusions(
+        args.add_python_defaults,
+        args.add_frontend_defaults,
+        args.exclude_dirs,
+        args.exclude_files,
+        args.exclude_extensions,
+    )
 
     output_dir = Path(args.output_dir).resolve() if args.output_dir else start_path
-    output_dir.mkdir(parents=True, exist_ok=True)
+    if not args.stdout:
+        output_dir.mkdir(parents=True, exist_ok=True)
 
-    output_filename = f'{start_path.name}_structure.md'
+    output_suffix, writer_class = FORMATS[args.format]
+    output_filename = f'{start_path.name}_structure{output_suffix}'
+    if args.compress:
+        output_filename += compressed_suffix(args.compress)
     output_file = output_dir / output_filename
 
     excluded_files.add(output_filename)
+    index_file = output_dir / f'{output_filename}{OFFSET_INDEX_SUFFIX}'
+    if args.index:
+        excluded_files.add(index_file.name)
+    if args.client and not args.stdout:
+        # The server walks the project while the client is still writing the partial file
+        excluded_files.add(_partial_path(output_file).name)
+    shard_dir = output_dir / f'{start_path.name}_structure'
+    if sharded:
+        excluded_dirs.add(shard_dir.name)
 
-    file_collector = DefaultFileCollector(verbose=args.verbose)
-    project_tree, files_to_include = file_collector.collect(
-        start_path=start_path,
-        excluded_dirs=excluded_dirs,
-        excluded_files=excluded_files,
-        excluded_extensions=excluded_extensions,
-        exclude_dotfiles=args.exclude_dotfiles,
-    )
+    priority_patterns = split_list(args.priority_patterns)
+    try:
+        budget, token_estimator = build_budget(
+            args.max_file_bytes,
+            args.max_total_bytes,
+            args.max_files,
+            args.max_tokens,
+            args.tokenizer,
+            args.priority,
+            priority_patterns,
+        )
+    except (TokenEstimatorError, ValueError) as exc:
+        parser.error(str(exc))
 
-    file_writer = MarkdownFileWriter()
-    file_writer.write(
-        output_file=output_file,
-        project_tree=project_tree,
-        files_to_include=files_to_include,
-        start_path=start_path,
-        use_markers=True,
+    collect_kwargs = {
+        'start_path': start_path,
+        'excluded_dirs': excluded_dirs,
+        'excluded_files': excluded_files,
+        'excluded_extensions': excluded_extensions,
+        'exclude_dotfiles': args.exclude_dotfiles,
+        'include_paths': split_list(args.include_paths),
+        'exclude_paths': split_list(args.exclude_paths),
+    }
+
+    stats = SnapshotStats() if args.stats else None
+    started = time.perf_counter()
+    file_collector: StreamingFileCollector = DefaultFileCollector(verbose=args.verbose, hooks=stats)
+
+    if args.watch:
+        _run_watch(args, file_collector, collect_kwargs, output_file, encodings)
+        return
+
+    echo = functools.partial(print, file=sys.stderr if args.stdout else sys.stdout)
+    destination = 'standard output' if args.stdout else output_file
+    if config_file is not None:
+        echo(f'⚙️ Using config {config_file}' + (f' (profile "{args.profile}")' if args.profile else ''))
+
+    if args.client:
+        request = {
+            'project_path': str(start_path),
+            'excluded_dirs': sorted(excluded_dirs),
+            'excluded_files': sorted(excluded_files),
+            'excluded_extensions': sorted(excluded_extensions),
+            'exclude_dotfiles': args.exclude_dotfiles,
+            'include_paths': collect_kwargs['include_paths'],
+            'exclude_paths': collect_kwargs['exclude_paths'],
+            'git': args.git,
+            'jobs': args.jobs,
+            'use_markers': True,
+            'dedup': args.dedup,
+            'outline': args.outline,
+            'encodings': list(encodings),
+            'budget': {
+                'max_file_bytes': args.max_file_bytes,
+                'max_total_bytes': args.max_total_bytes,
+                'max_files': args.max_files,
+                'max_tokens': args.max_tokens,
+                'tokenizer': args.tokenizer,
+                'priority': args.priority,
+                'priority_patterns': priority_patterns,
+            },
+        }
+        try:
+            # An error mid-stream must not leave a truncated snapshot in place of the previous one
+            with _open_output(args, output_file, atomic=True) as f:
+                result = request_snapshot(socket_path, request, f)
+        except DaemonError as exc:
+            echo(f'❌ Snapshot server error: {exc}')
+            raise SystemExit(1) from None
+
+        if result.get('warning'):
+            echo(f'⚠️ {result["warning"]}')
+        if args.copy:
+            _copy_output(output_file)
+        echo(f'✅ Done! Project structure saved to: {destination}')
+        echo(f'📊 Total files processed: {result["files_processed"]}')
+        if result['omitted'] or result['truncated']:
+            echo(f'✂️ Omitted by budget: {result["omitted"]}, truncated: {result["truncated"]}')
+        if result.get('duplicates'):
+            echo(f'♻️ Duplicate files replaced by references: {result["duplicates"]}')
+        if result.get('encodings'):
+            echo(f'🔤 Encodings of files read: {_format_counts(result["encodings"])}')
+        if result['tokens'] is not None:
+            echo(f'🔢 Estimated tokens: {result["tokens"]}')
+        echo(f'🗃️ Server cache: {result["cache_hits"]} hits, {result["cache_misses"]} misses')
+        return
+
+    if args.git:
+        from code2md.git_collector import GitCollectorError, GitFileCollector
+
+        try:
+            tree_items = GitFileCollector(verbose=args.verbose, hooks=stats).iter_collect(**collect_kwargs)
+        except GitCollectorError as exc:
+            echo(f'⚠️ Failed to list files via git, walking the directory instead: {exc}')
+            tree_items = file_collector.iter_collect(**collect_kwargs)
+    else:
+        tree_items = file_collector.iter_collect(**collect_kwargs)
+
+    if sharded:
+        _write_sharded(args, tree_items, start_path, shard_dir, encodings, token_estimator, stats, echo)
+        if stats is not None:
+            stats.on_phase('total', time.perf_counter() - started)
+            echo(stats.format_report())
+        return
+
+    block_cache = BlockCache(Path(args.cache_dir).resolve(), args.cache_max_bytes) if args.cache_dir else None
+    outliner = _build_outliner(args)
+
+    file_writer = writer_class(
+        verbose=args.verbose,
+        jobs=args.jobs,
+        cache=block_cache,
+        budget=budget,
+        token_estimator=token_estimator,
+        hooks=stats,
+        dedup=args.dedup,
+        record_offsets=args.index,
+        outliner=outliner,
+        encodings=encodings,
     )
+    try:
+        with _open_output(args, output_file) as f:
+            files_processed = file_writer.write_binary(f, tree_items, start_path, use_markers=True)
+    finally:
+        if block_cache is not None:
+            block_cache.close()
+        if outliner is not None:
+            outliner.close()
+
+    if args.index:
+        write_offset_index(index_file, output_file, args.format, file_writer.offsets)
 
     if args.copy:
+        _copy_output(output_file)
+
+    echo(f'✅ Done! Project structure saved to: {destination}')
+    if args.index:
+        echo(f'🗂️ Offset index: {index_file}')
+    echo(f'📊 Total files processed: {files_processed}')
+    if budget is not None and (budget.omitted or file_writer.truncated):
+        echo(f'✂️ Omitted by budget: {len(budget.omitted)}, truncated: {len(file_writer.truncated)}')
+    if file_writer.counters['duplicates']:
+        echo(
+            f'♻️ Duplicate files replaced by references: {file_writer.counters["duplicates"]} '
+            f'({file_writer.counters["duplicate_chars_saved"]} characters saved)'
+        )
+    if outliner is not None:
+        echo(f'🧩 Outlines: {outliner.misses} parsed, {outliner.hits} reused by content hash')
+    encoding_counts = file_writer.encoding_counts()
+    if encoding_counts:
+        echo(f'🔤 Encodings of files read: {_format_counts(encoding_counts)}')
+    if token_estimator is not None:
+        echo(f'🔢 Estimated tokens: {file_writer.counters["tokens"]}')
+    if block_cache is not None:
+        echo(
+            f'🗃️ Cache hit rate: {block_cache.hit_rate:.1%} '
+            f'({block_cache.hits} hits, {block_cache.misses} misses, {block_cache.evicted} evicted)'
+        )
+    if stats is not None:
+        stats.on_phase('total', time.perf_counter() - started)
+        echo(stats.format_report())
+
+
+def _write_sharded(
+    args: argparse.Namespace,
+    tree_items: Iterable[TreeItem],
+    start_path: Path,
+    shard_dir: Path,
+    encodings: tuple[str, ...],
+    token_estimator: TokenEstimator | None,
+    stats: SnapshotStats | None,
+    echo: Callable[..., None],
+) -> None:
+    """Splits the snapshot into shards, writes them in parallel and reports the result."""
+    from code2md.shards import INDEX_NAME, plan_shards, write_shards
+
+    entries = [entry for _, entry in tree_items if entry is not None]
+    plans = plan_shards(entries, args.shard_size, args.shard_by_dir)
+    writers: list[MarkdownFileWriter] = []
+    # One outliner for all shards: its process pool and content-hash cache are shared
+    outliner = _build_outliner(args)
+
+    def make_writer() -> MarkdownFileWriter:
+        # A budget records the files it omitted, so every shard needs its own
+        budget = SizeBudget(args.max_file_bytes) if args.max_file_bytes is not None else None
+        writer = MarkdownFileWriter(
+            verbose=args.verbose,
+            budget=budget,
+            token_estimator=token_estimator,
+            hooks=stats,
+            dedup=args.dedup,
+            outliner=outliner,
+            encodings=encodings,
+        )
+        writers.append(writer)
+        return writer
+
+    try:
+        index = write_shards(
+            plans, shard_dir, start_path, make_writer, args.jobs, use_markers=True, compress=args.compress
+        )
+    finally:
+        if outliner is not None:
+            outliner.close()
+
+    echo(f'✅ Done! {len(plans)} shard(s) saved to: {shard_dir}')
+    echo(f'🗂️ Path index: {shard_dir / INDEX_NAME}')
+    echo(f'📊 Total files processed: {len(index["files"])}')
+    truncated = sum(len(writer.truncated) for writer in writers)
+    if truncated:
+        echo(f'✂️ Truncated: {truncated}')
+    duplicates = sum(writer.counters['duplicates'] for writer in writers)
+    if duplicates:
+        echo(f'♻️ Duplicate files replaced by references (within each shard): {duplicates}')
+    encoding_counts: Counter[str] = Counter()
+    for writer in writers:
+        encoding_counts.update(writer.encoding_counts())
+    if encoding_counts:
+        echo(f'🔤 Encodings of files read: {_format_counts(encoding_counts)}')
+    if token_estimator is not None:
+        echo(f'🔢 Estimated tokens: {sum(writer.counters["tokens"] for writer in writers)}')
+
+
+def _format_counts(counts: dict[str, int]) -> str:
+    """Formats per-encoding file counts, most frequent first: "utf-8 120, cp1251 3"."""
+    return ', '.join(f'{name} {count}' for name, count in sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+
+@contextlib.contextmanager
+def _open_output(args: argparse.Namespace, output_file: Path, atomic: bool = False) -> Iterator[BinaryIO]:
+    """Opens the binary destination of the snapshot: the output file or stdout, optionally compressed.
+
+    With atomic, the file is written under a temporary name and replaces output_file only on success.
+    """
+    with contextlib.ExitStack() as stack:
+        if args.stdout:
+            stream: BinaryIO = sys.stdout.buffer
+            stack.callback(stream.flush)
+        elif atomic:
+            stream = stack.enter_context(_atomic_output(output_file))
+        else:
+            stream = stack.enter_context(output_file.open('wb'))
+        if args.compress:
+            stream = stack.enter_context(open_compressed(stream, args.compress))
+        yield stream
+
+
+def _partial_path(output_file: Path) -> Path:
+    """Temporary name of an output file that is still being written."""
+    return output_file.with_name(f'.{output_file.name}.partial')
+
+
+@contextlib.contextmanager
+def _atomic_output(output_file: Path) -> Iterator[BinaryIO]:
+    """Writes to a temporary file next to output_file and renames it into place if no exception was raised."""
+    partial_file = _partial_path(output_file)
+    try:
+        with partial_file.open('wb') as f:
+            yield f
+        partial_file.replace(output_file)
+    finally:
+        partial_file.unlink(missing_ok=True)
+
+
+def _copy_output(output_file: Path) -> None:
+    """Copies the generated file to the clipboard, reporting failures instead of raising."""
+    from code2md.clipboard_helper import copy_file_to_clipboard
+
+    try:
+        copy_file_to_clipboard(output_file)
+        print('📋 Generated Markdown file has been copied to the system clipboard.')
+    except Exception as exc:  # noqa: BLE001
+        print(f'⚠️ Failed to copy generated file to clipboard: {exc}')
+
+
+def _run_watch(
+    args: argparse.Namespace,
+    file_collector: StreamingFileCollector,
+    collect_kwargs: dict,
+    output_file: Path,
+    encodings: tuple[str, ...],
+) -> None:
+    """Builds the snapshot once and keeps it up to date until interrupted."""
+    from code2md.git_collector import GitCollectorError, GitFileCollector
+    from code2md.watch import SnapshotWatcher
+
+    if args.git:
+        git_collector = GitFileCollector(verbose=args.verbose)
         try:
-            copy_file_to_clipboard(output_file)
-            print('📋 Generated Markdown file has been copied to the system clipboard.')
-        except Exception as exc:  # noqa: BLE001
-            print(f'⚠️ Failed to copy generated file to clipboard: {exc}')
+            git_collector.collect(**collect_kwargs)
+            file_collector = git_collector
+        except GitCollectorError as exc:
+            print(f'⚠️ Failed to list files via git, walking the directory instead: {exc}')
+
+    block_cache = BlockCache(Path(args.cache_dir).resolve(), args.cache_max_bytes) if args.cache_dir else None
+    outliner = _build_outliner(args)
+    file_writer = MarkdownFileWriter(
+        verbose=args.verbose, jobs=args.jobs, cache=block_cache, outliner=outliner, encodings=encodings
+    )
 
+    def on_update(rendered: int, elapsed: float) -> None:
+        print(f'🔄 Updated {output_file.name}: {rendered} file(s) re-rendered in {elapsed * 1000:.0f} ms')
+
+    watcher = SnapshotWatcher(
+        collector=file_collector,
+        collect_kwargs=collect_kwargs,
+        writer=file_writer,
+        output_file=output_file,
+        use_markers=True,
+        debounce=args.debounce,
+        on_update=on_update,
+    )
+    print(f'👀 Watching {collect_kwargs["start_path"]} (press Ctrl+C to stop)')
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print('\n🛑 Watch stopped.')
+    finally:
+        if block_cache is not None:
+            block_cache.close()
+        if outliner is not None:
+            outliner.close()
     print(f'✅ Done! Project structure saved to: {output_file}')
-    print(f'📊 Total files processed: {len(files_to_include)}')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,149 @@
+from collections.abc import Iterable
+
+from code2md.budget import FileBudget, SizeBudget
+from code2md.consts import (
+    FRONTEND_DEFAULT_EXCLUDED_DIRS,
+    FRONTEND_DEFAULT_EXCLUDED_EXTENSIONS,
+    FRONTEND_DEFAULT_EXCLUDED_FILES,
+    GENERAL_EXCLUDED_DIRS,
+    GENERAL_EXCLUDED_EXTENSIONS,
+    GENERAL_EXCLUDED_FILES,
+    PYTHON_DEFAULT_EXCLUDED_DIRS,
+    PYTHON_DEFAULT_EXCLUDED_EXTENSIONS,
+    PYTHON_DEFAULT_EXCLUDED_FILES,
+)
+from code2md.encoding_detection import DEFAULT_ENCODINGS, check_encodings
+from code2md.tokens import TokenBudget, TokenEstimator, get_token_estimator
+
+_SIZE_SUFFIXES = {'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30}
+
+ListOption = str | Iterable[str] | None
+
+
+def parse_byte_size(value: str) -> int:
+    """Разбирает размер в байтах: число или число с суффиксом K/M/G (например, "64M").
+
+    Raises:
+        ValueError: Если размер некорректен или отрицателен
+    """
+    text = value.strip().lower().removesuffix('b')
+    multiplier = _SIZE_SUFFIXES.get(text[-1:], 1)
+    if multiplier != 1:
+        text = text[:-1]
+    try:
+        number = int(text) * multiplier
+    except ValueError:
+        raise ValueError(f'invalid size: {value}') from None
+    if number < 0:
+        raise ValueError(f'size must not be negative, got {value}')
+    return number
+
+
+def format_byte_size(size: int) -> str:
+    """Форматирует размер в байтах для вывода: "512 B", "1.5 MB"."""
+    if size < 1024:
+        return f'{size} B'
+    scaled = float(size)
+    for unit in ('KB', 'MB', 'GB'):
+        scaled /= 1024
+        if scaled < 1024 or unit == 'GB':
+            break
+    return f'{scaled:.1f} {unit}'
+
+
+def split_list(value: ListOption) -> list[str]:
+    """Разбирает список из строки через запятую или из готовой последовательности строк."""
+    if value is None:
+        return []
+    items = value.split(',') if isinstance(value, str) else value
+    return [item.strip() for item in items if item.strip()]
+
+
+def build_encodings(value: ListOption = None) -> tuple[str, ...]:
+    """Собирает кандидатов для текста не в UTF-8: список кодеков через запятую или 'none'.
+
+    Без значения используются DEFAULT_ENCODINGS; 'none' отключает подбор кодировки.
+
+    Raises:
+        ValueError: Если кодек неизвестен
+    """
+    if value is None:
+        return DEFAULT_ENCODINGS
+    encodings = split_list(value)
+    if [encoding.lower() for encoding in encodings] == ['none']:
+        return ()
+    return check_encodings(encodings)
+
+
+def build_exclusions(
+    add_python_defaults: bool = False,
+    add_frontend_defaults: bool = False,
+    exclude_dirs: ListOption = None,
+    exclude_files: ListOption = None,
+    exclude_extensions: ListOption = None,
+) -> tuple[set[str], set[str], set[str]]:
+    """Собирает множества исключений: общие, наборы по умолчанию и пользовательские.
+
+    Args:
+        add_python_defaults: Добавить стандартные исключения для Python-проектов
+        add_frontend_defaults: Добавить стандартные исключения для frontend-проектов
+        exclude_dirs: Имена или glob-шаблоны директорий
+        exclude_files: Имена или glob-шаблоны файлов
+        exclude_extensions: Расширения файлов (с точкой или без)
+
+    Returns:
+        Кортеж (директории, файлы, расширения)
+    """
+    excluded_dirs = set(GENERAL_EXCLUDED_DIRS)
+    excluded_files = set(GENERAL_EXCLUDED_FILES)
+    excluded_extensions = set(GENERAL_EXCLUDED_EXTENSIONS)
+
+    if add_python_defaults:
+        excluded_dirs.update(PYTHON_DEFAULT_EXCLUDED_DIRS)
+        excluded_files.update(PYTHON_DEFAULT_EXCLUDED_FILES)
+        excluded_extensions.update(PYTHON_DEFAULT_EXCLUDED_EXTENSIONS)
+
+    if add_frontend_defaults:
+        excluded_dirs.update(FRONTEND_DEFAULT_EXCLUDED_DIRS)
+        excluded_files.update(FRONTEND_DEFAULT_EXCLUDED_FILES)
+        excluded_extensions.update(FRONTEND_DEFAULT_EXCLUDED_EXTENSIONS)
+
+    excluded_dirs.update(split_list(exclude_dirs))
+    excluded_files.update(split_list(exclude_files))
+    excluded_extensions.update(f'.{e.lstrip(".")}' for e in split_list(exclude_extensions))
+
+    return excluded_dirs, excluded_files, excluded_extensions
+
+
+def build_budget(
+    max_file_bytes: int | None = None,
+    max_total_bytes: int | None = None,
+    max_files: int | None = None,
+    max_tokens: int | None = None,
+    tokenizer: str = 'heuristic',
+    priority: str = 'depth',
+    priority_patterns: Iterable[str] = (),
+) -> tuple[FileBudget | None, TokenEstimator | None]:
+    """Собирает бюджет содержимого и оценщик токенов из параметров командной строки.
+
+    Оценщик создаётся, только если задан бюджет токенов или нестандартный токенизатор.
+
+    Returns:
+        Пара (бюджет или None, оценщик токенов или None)
+
+    Raises:
+        TokenEstimatorError: Если выбранный токенизатор недоступен
+        ValueError: Если спецификация токенизатора некорректна
+    """
+    budget: FileBudget | None = None
+    if max_file_bytes is not None or max_total_bytes is not None or max_files is not None:
+        budget = SizeBudget(max_file_bytes, max_total_bytes, max_files)
+
+    token_estimator = None
+    if max_tokens is not None or tokenizer != 'heuristic':
+        token_estimator = get_token_estimator(tokenizer)
+
+    if max_tokens is not None:
+        budget = TokenBudget(max_tokens, token_estimator, priority, list(priority_patterns), inner=budget)
+
+    return budget, token_estimator
@@ -0,0 +1,263 @@
+import ast
+from collections import OrderedDict
+import functools
+import os
+import re
+import threading
+from typing import TYPE_CHECKING
+
+from code2md.consts import OUTLINE_MODES
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+_CACHE_SIZE = 1 << 16
+# Короткие тексты дешевле разобрать на месте, чем передавать в процесс пула
+_POOL_MIN_CHARS = 16 << 10
+
+_FunctionNode = ast.FunctionDef | ast.AsyncFunctionDef
+
+_JS_DECLARATIONS = (
+    r'(?:export\s+(?:default\s+)?)?(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?(?:function\b|class\b)'
+    r'|(?:export\s+)?(?:const|let|var)\s+[\w$]+\s*=\s*(?:async\s*)?(?:function\b|\([^)\n]*\)\s*=>|[\w$]+\s*=>)'
+    r'|(?:(?:public|private|protected|static|readonly|async|get|set)\s+)*'
+    r'(?!(?:if|for|while|switch|catch|return|function|with)\b)[\w$]+\s*(?:<[^>\n]*>)?\s*\([^)\n]*\)'
+    r'\s*(?::\s*[^{=;\n]+)?\{\s*$'
+)
+_TS_DECLARATIONS = r'(?:export\s+)?(?:declare\s+)?(?:interface|type|enum|namespace|module)\s+[\w$]+|' + _JS_DECLARATIONS
+_JVM_DECLARATIONS = (
+    r'(?:@\w+\s+)*(?:(?:public|private|protected|internal|static|final|abstract|sealed|open|override|data|inline'
+    r'|suspend|async|virtual|partial|readonly|synchronized|native|default|implicit|lazy|case|extern|unsafe)\s+)*'
+    r'(?:class|interface|enum|record|struct|object|trait|fun|def|func|init|protocol|extension|namespace|mixin)\b'
+    r'|(?:(?:public|private|protected|internal|static|final|abstract|override|virtual|async|synchronized)\s+)+'
+    r'[\w<>\[\],.? ]+\('
+)
+_C_DECLARATIONS = (
+    r'#define\s+\w+'
+    r'|(?:typedef\s+)?(?:struct|class|union|enum|namespace)\s+\w+[^;\n]*$'
+    r'|(?:template\s*<[^>\n]*>\s*)?[A-Za-z_][\w:<>,*& \t]*[ \t*&]~?[\w:]+[ \t]*\([^;\n]*\)[ \t]*'
+    r'(?:const[ \t]*)?(?:override[ \t]*)?\{?[ \t]*$'
+    r'|@(?:interface|implementation|protocol)\b|[-+][ \t]*\('
+)
+
+# Язык из LANGUAGE_MAP -> (объявления, разрешён ли отступ перед объявлением)
+_DECLARATIONS = {
+    'javascript': (_JS_DECLARATIONS, True),
+    'jsx': (_JS_DECLARATIONS, True),
+    'typescript': (_TS_DECLARATIONS, True),
+    'tsx': (_TS_DECLARATIONS, True),
+    'go': (r'(?:package|func|type)\b', False),
+    'rust': (
+        r'(?:pub(?:\([\w:\s]+\))?\s+)?(?:(?:async|const|unsafe|extern\s+"\w+")\s+)*'
+        r'(?:fn|struct|enum|trait|impl|mod|type|union|macro_rules!)\W',
+        True,
+    ),
+    'java': (_JVM_DECLARATIONS, True),
+    'kotlin': (_JVM_DECLARATIONS, True),
+    'scala': (_JVM_DECLARATIONS, True),
+    'csharp': (_JVM_DECLARATIONS, True),
+    'swift': (_JVM_DECLARATIONS, True),
+    'dart': (_JVM_DECLARATIONS, True),
+    'c': (_C_DECLARATIONS, False),
+    'cpp': (_C_DECLARATIONS, False),
+    'objectivec': (_C_DECLARATIONS, False),
+    'ruby': (r'(?:class|module|def)\b|attr_(?:reader|writer|accessor)\b', True),
+    'php': (
+        r'(?:(?:abstract|final|public|private|protected|static|readonly)\s+)*(?:class|interface|trait|enum|function)\b',
+        True,
+    ),
+    'bash': (r'function\s+[\w-]+|[\w-]+\s*\(\)\s*(?:\{|$)', True),
+    'lua': (r'(?:local\s+)?function\b', True),
+    'perl': (r'(?:sub|package)\b', True),
+    'r': (r'[\w.]+\s*(?:<-|=)\s*function\b', True),
+    'powershell': (r'(?i:function|filter|class)\b', True),
+    'sql': (r'(?i:create|alter)\b', True),
+    'graphql': (r'(?:type|interface|enum|input|union|scalar|schema|query|mutation|subscription|fragment)\b', False),
+    'markdown': (r'#{1,6}\s', False),
+}
+
+_PYTHON_PATTERN = re.compile(r'^[ \t]*(?:@|(?:async[ \t]+)?def\b|class\b)[^\n]*', re.MULTILINE)
+
+
+def supports_outline(language: str) -> bool:
+    """Проверяет, умеет ли extract_outline извлекать структуру файлов этого языка."""
+    return language == 'python' or language in _DECLARATIONS
+
+
+@functools.cache
+def _pattern(language: str) -> re.Pattern | None:
+    """Регулярное выражение строк объявлений; компилируется при первом файле языка, а не при импорте."""
+    if language not in _DECLARATIONS:
+        return None
+    declarations, indented = _DECLARATIONS[language]
+    return re.compile(('^[ \\t]*(?:' if indented else '^(?:') + declarations + ')[^\\n]*', re.MULTILINE)
+
+
+def extract_outline(text: str, language: str) -> str | None:
+    """Извлекает структуру исходного текста без тел функций.
+
+    Для Python разбирает модуль через ast и оставляет сигнатуры классов и функций
+    (с декораторами) и docstring'и; если модуль не разбирается, как и для остальных
+    языков из LANGUAGE_MAP, строки объявлений выбираются регулярным выражением.
+
+    Args:
+        text: Содержимое файла
+        language: Язык из LANGUAGE_MAP
+
+    Returns:
+        Текст структуры или None, если язык не поддерживается либо объявлений не найдено
+    """
+    if language == 'python':
+        outline = _outline_python(text)
+        if outline is not None:
+            return outline or None
+        # Модуль не разбирается (например, обрезан бюджетом): берём строки объявлений
+        pattern = _PYTHON_PATTERN
+    else:
+        pattern = _pattern(language)
+        if pattern is None:
+            return None
+
+    lines = []
+    for match in pattern.finditer(text):
+        line = match.group().rstrip()
+        if line.endswith('{'):
+            line = line[:-1].rstrip()
+        lines.append(line)
+    return '\n'.join(lines) or None
+
+
+def _outline_python(text: str) -> str | None:
+    """Структура Python-модуля через ast; None, если модуль не разбирается."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+
+    lines: list[str] = []
+    docstring = ast.get_docstring(tree)
+    if docstring:
+        lines.extend(_docstring_lines(docstring, ''))
+    _outline_body(tree.body, '', lines)
+    return '\n'.join(lines)
+
+
+def _outline_body(body: list[ast.stmt], indent: str, lines: list[str]) -> None:
+    for node in body:
+        if not isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if not indent and lines:
+            lines.append('')
+        lines.extend(f'{indent}@{ast.unparse(decorator)}' for decorator in node.decorator_list)
+        if isinstance(node, ast.ClassDef):
+            bases = [ast.unparse(base) for base in node.bases]
+            bases.extend(ast.unparse(keyword) for keyword in node.keywords)
+            lines.append(f'{indent}class {node.name}({", ".join(bases)}):' if bases else f'{indent}class {node.name}:')
+        else:
+            lines.append(f'{indent}{_function_signature(node)}:')
+
+        docstring = ast.get_docstring(node)
+        if docstring:
+            lines.extend(_docstring_lines(docstring, indent + '    '))
+        count = len(lines)
+        if isinstance(node, ast.ClassDef):
+            _outline_body(node.body, indent + '    ', lines)
+        if len(lines) == count:
+            lines.append(f'{indent}    ...')
+
+
+def _function_signature(node: _FunctionNode) -> str:
+    prefix = 'async def' if isinstance(node, ast.AsyncFunctionDef) else 'def'
+    returns = f' -> {ast.unparse(node.returns)}' if node.returns is not None else ''
+    return f'{prefix} {node.name}({ast.unparse(node.args)}){returns}'
+
+
+def _docstring_lines(docstring: str, indent: str) -> list[str]:
+    doc_lines = docstring.replace('"""', r'\"\"\"').splitlines()
+    if len(doc_lines) == 1:
+        return [f'{indent}"""{doc_lines[0]}"""']
+    return [
+        f'{indent}"""{doc_lines[0]}',
+        *(f'{indent}{line}' if line else '' for line in doc_lines[1:]),
+        f'{indent}"""',
+    ]
+
+
+class Outliner:
+    """Этап извлечения структуры файлов для режимов --outline.
+
+    Разбор — нагрузка на процессор, поэтому крупные тексты разбираются в пуле из
+    processes процессов (при processes <= 1 — на месте, в вызывающем потоке). Результаты
+    кешируются в памяти по хешу содержимого, так что одинаковые файлы и файлы, не
+    изменившиеся между снимками одного процесса (--watch, --serve), не разбираются
+    повторно. Методы можно вызывать из нескольких потоков.
+    """
+
+    def __init__(self, mode: str = 'skeleton', processes: int | None = None, cache_size: int = _CACHE_SIZE) -> None:
+        if mode not in OUTLINE_MODES:
+            raise ValueError(f'unknown outline mode: {mode}')
+        self.mode = mode
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[tuple[str, str], str | None] = OrderedDict()
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def outline(self, text: str, language: str, digest: str | None = None) -> str | None:
+        """Возвращает структуру текста (см. extract_outline).
+
+        Args:
+            text: Содержимое файла
+            language: Язык из LANGUAGE_MAP
+            digest: Хеш содержимого; без него результат не кешируется
+
+        Returns:
+            Текст структуры или None, если её не удалось извлечь
+        """
+        if not supports_outline(language):
+            return None
+
+        key = (language, digest) if digest is not None else None
+        if key is not None:
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return self._cache[key]
+
+        if self.processes > 1 and len(text) >= _POOL_MIN_CHARS:
+            outline = self._pool().submit(extract_outline, text, language).result()
+        else:
+            outline = extract_outline(text, language)
+
+        if key is not None:
+            with self._lock:
+                self.misses += 1
+                self._cache[key] = outline
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return outline
+
+    def _pool(self) -> 'ProcessPoolExecutor':
+        # Пул процессов (а с ним и multiprocessing) загружается, только когда нужен
+        from concurrent.futures import ProcessPoolExecutor
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processes)
+            return self._executor
+
+    def close(self) -> None:
+        """Останавливает пул процессов; кеш остаётся доступным."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def __enter__(self) -> 'Outliner':
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
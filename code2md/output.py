@@ -0,0 +1,70 @@
+from collections.abc import Callable
+import io
+from typing import BinaryIO
+
+
+class OutputError(RuntimeError):
+    """Выбранный формат вывода недоступен в текущем окружении."""
+
+
+# Модули сжатия импортируются при первом использовании: без --compress они не нужны,
+# а их загрузка заметна на фоне запуска CLI для небольших проектов
+
+
+def _open_gzip(stream: BinaryIO) -> BinaryIO:
+    import gzip
+
+    # mtime=0 и пустое имя делают архив воспроизводимым: одинаковый снимок — одинаковые байты
+    return gzip.GzipFile(filename='', mode='wb', fileobj=stream, mtime=0)
+
+
+def _open_bz2(stream: BinaryIO) -> BinaryIO:
+    import bz2
+
+    return bz2.BZ2File(stream, 'wb')
+
+
+def _open_xz(stream: BinaryIO) -> BinaryIO:
+    import lzma
+
+    return lzma.LZMAFile(stream, 'wb')
+
+
+def _open_zstd(stream: BinaryIO) -> BinaryIO:
+    try:
+        from compression import zstd  # Python 3.14+
+    except ImportError:
+        raise OutputError('zstd compression requires Python 3.14 or newer (compression.zstd)') from None
+    return zstd.ZstdFile(stream, 'wb')
+
+
+# Формат сжатия -> (суффикс файла, функция, оборачивающая бинарный поток)
+COMPRESSIONS: dict[str, tuple[str, Callable[[BinaryIO], BinaryIO]]] = {
+    'gzip': ('.gz', _open_gzip),
+    'bz2': ('.bz2', _open_bz2),
+    'xz': ('.xz', _open_xz),
+    'zstd': ('.zst', _open_zstd),
+}
+
+
+def compressed_suffix(method: str) -> str:
+    """Возвращает суффикс имени файла для формата сжатия."""
+    return COMPRESSIONS[method][0]
+
+
+def open_compressed(stream: BinaryIO, method: str) -> BinaryIO:
+    """Оборачивает бинарный поток в компрессор; закрытие компрессора не закрывает stream.
+
+    Raises:
+        OutputError: Если формат не поддерживается в этой версии Python
+    """
+    return COMPRESSIONS[method][1](stream)
+
+
+def check_compression(method: str) -> None:
+    """Проверяет, что формат сжатия доступен, не создавая выходной файл.
+
+    Raises:
+        OutputError: Если формат не поддерживается в этой версии Python
+    """
+    open_compressed(io.BytesIO(), method).close()
@@ -0,0 +1,184 @@
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+from pathlib import Path
+import re
+from typing import Any, NamedTuple
+
+from code2md.file_collector import iter_tree_from_paths
+from code2md.file_writer import MarkdownFileWriter
+from code2md.interfaces import FileEntry, TreeItem
+from code2md.output import compressed_suffix, open_compressed
+
+INDEX_VERSION = 1
+INDEX_NAME = 'index.json'
+
+_UNSAFE_CHARS = re.compile(r'[^\w.-]+')
+
+
+class ShardPlan(NamedTuple):
+    """Файлы одного шарда в исходном порядке.
+
+    directory — верхнеуровневая директория при разбиении по директориям
+    ('.' для файлов в корне проекта), иначе None.
+    """
+
+    name: str
+    entries: list[FileEntry]
+    directory: str | None = None
+
+
+def _top_directory(entry: FileEntry) -> str:
+    head, sep, _ = entry.relative_path.partition(os.sep)
+    return head if sep else '.'
+
+
+def _entry_size(entry: FileEntry) -> int:
+    try:
+        return entry.size
+    except OSError:
+        return 0
+
+
+def _split_by_size(entries: list[FileEntry], max_bytes: int | None) -> Iterator[list[FileEntry]]:
+    """Режет список на подряд идущие куски с суммарным размером на диске не больше max_bytes.
+
+    Файл больше max_bytes попадает в отдельный шард целиком.
+    """
+    if max_bytes is None:
+        yield entries
+        return
+
+    chunk: list[FileEntry] = []
+    chunk_bytes = 0
+    for entry in entries:
+        size = _entry_size(entry)
+        if chunk and chunk_bytes + size > max_bytes:
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(entry)
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+
+def plan_shards(
+    entries: list[FileEntry],
+    max_bytes: int | None = None,
+    by_directory: bool = False,
+) -> list[ShardPlan]:
+    """Разбивает файлы снимка на шарды.
+
+    Порядок файлов сохраняется: шарды, прочитанные подряд, дают тот же порядок
+    блоков, что и один общий файл. При by_directory каждая верхнеуровневая
+    директория (и отдельно файлы корня) становится своим шардом; вместе с max_bytes
+    слишком большие директории дополнительно режутся по размеру.
+
+    Args:
+        entries: Файлы в порядке сборщика
+        max_bytes: Лимит суммарного размера файлов шарда на диске (None — без лимита)
+        by_directory: Разбивать ли по верхнеуровневым директориям
+
+    Returns:
+        Список шардов; имена нумеруются с 0001
+    """
+    groups: list[tuple[str | None, list[FileEntry]]] = []
+    if by_directory:
+        for entry in entries:
+            directory = _top_directory(entry)
+            if not groups or groups[-1][0] != directory:
+                groups.append((directory, []))
+            groups[-1][1].append(entry)
+    elif entries:
+        groups.append((None, entries))
+
+    plans = []
+    for directory, group in groups:
+        for chunk in _split_by_size(group, max_bytes):
+            name = f'{len(plans) + 1:04d}'
+            if directory is not None:
+                name += '-root' if directory == '.' else f'-{_UNSAFE_CHARS.sub("_", directory)}'
+            plans.append(ShardPlan(name, chunk, directory))
+    return plans
+
+
+def _shard_items(start_path: Path, entries: list[FileEntry]) -> Iterator[TreeItem]:
+    """Строки дерева только для файлов шарда; файлы отдаются исходными FileEntry (с уже известным stat)."""
+    by_path = {entry.relative_path: entry for entry in entries}
+    for line, entry in iter_tree_from_paths(start_path, by_path):
+        yield TreeItem(line, by_path[entry.relative_path] if entry is not None else None)
+
+
+def _remove_previous(output_dir: Path) -> None:
+    """Удаляет шарды, перечисленные в индексе предыдущего запуска."""
+    try:
+        previous = json.loads((output_dir / INDEX_NAME).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return
+    for shard in previous.get('shards', []):
+        (output_dir / Path(shard['file']).name).unlink(missing_ok=True)
+
+
+def write_shards(
+    plans: list[ShardPlan],
+    output_dir: Path,
+    start_path: Path,
+    make_writer: Callable[[], MarkdownFileWriter],
+    jobs: int = 1,
+    use_markers: bool = True,
+    compress: str | None = None,
+) -> dict[str, Any]:
+    """Записывает шарды параллельно и сохраняет индекс путей.
+
+    Каждый шард — самостоятельный снимок: своё дерево (только его файлы), блоки
+    с теми же маркерами START/END и свой раздел пропущенных файлов. Индекс
+    (index.json) перечисляет шарды и сопоставляет каждому пути номер шарда, чтобы
+    потребитель мог загружать шарды по мере надобности.
+
+    Args:
+        plans: Шарды из plan_shards()
+        output_dir: Директория для шардов и индекса (создаётся при необходимости)
+        start_path: Путь к корневой директории проекта
+        make_writer: Создаёт writer для одного шарда; вызывается в потоке шарда
+        jobs: Сколько шардов записывать одновременно
+        use_markers: Добавлять ли явные маркеры начала/конца файла
+        compress: Формат сжатия шардов (см. output.COMPRESSIONS) или None
+
+    Returns:
+        Содержимое индекса
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    _remove_previous(output_dir)
+    suffix = '.md' + (compressed_suffix(compress) if compress else '')
+
+    def write_one(plan: ShardPlan) -> dict[str, Any]:
+        shard_file = output_dir / f'{plan.name}{suffix}'
+        writer = make_writer()
+        with shard_file.open('wb') as f:
+            if compress:
+                with open_compressed(f, compress) as stream:
+                    files = writer.write_binary(stream, _shard_items(start_path, plan.entries), start_path, use_markers)
+            else:
+                files = writer.write_binary(f, _shard_items(start_path, plan.entries), start_path, use_markers)
+        return {
+            'file': shard_file.name,
+            'directory': plan.directory,
+            'files': files,
+            'bytes': shard_file.stat().st_size,
+            'first': plan.entries[0].relative_path,
+            'last': plan.entries[-1].relative_path,
+        }
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1), thread_name_prefix='code2md-shard') as executor:
+        shards = list(executor.map(write_one, plans))
+
+    index = {
+        'version': INDEX_VERSION,
+        'project': start_path.name,
+        'use_markers': use_markers,
+        'shards': shards,
+        'files': {entry.relative_path: number for number, plan in enumerate(plans) for entry in plan.entries},
+    }
+    (output_dir / INDEX_NAME).write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding='utf-8')
+    return index
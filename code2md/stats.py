@@ -0,0 +1,220 @@
+from collections import Counter
+import heapq
+import time
+
+from code2md.exclusions import ExclusionRules
+from code2md.options import format_byte_size
+
+
+class SnapshotHooks:
+    """Точки подключения к этапам снимка для профилирования и инструментирования.
+
+    Все методы по умолчанию ничего не делают: наследник переопределяет только нужные.
+    Сборщики и writer принимают hooks=None и в этом случае не замеряют время вовсе.
+    on_file, on_stage и on_output вызываются из потоков чтения при jobs > 1, поэтому
+    реализация должна быть потокобезопасной.
+    """
+
+    def on_phase(self, phase: str, seconds: float) -> None:
+        """Завершён крупный этап: 'git' (список файлов из git), 'total' (снимок целиком)."""
+
+    def on_directory(self, relative_path: str, seconds: float, entries: int) -> None:
+        """Прочитано содержимое директории (relative_path пуст для корня)."""
+
+    def on_prune(self, kind: str, rule: str, name: str) -> None:
+        """Имя исключено правилом.
+
+        Args:
+            kind: 'dir' или 'file'
+            rule: 'dotfile', 'name', 'extension', 'path' или 'include' (см. ExclusionRules.exclusion_reason)
+            name: Исключённое имя. В режиме --git правила проверяются для каждого пути,
+                поэтому исключённая директория учитывается по разу на каждый файл в ней
+        """
+
+    def on_stage(self, stage: str, seconds: float) -> None:
+        """Завершён этап обработки одного имени или файла: 'match', 'sniff', 'decode', 'outline'."""
+
+    def on_file(self, relative_path: str, seconds: float, bytes_read: int, outcome: str) -> None:
+        """Сформирован блок файла.
+
+        Args:
+            relative_path: Путь файла относительно корня проекта
+            seconds: Время формирования блока, включая чтение
+            bytes_read: Прочитано байт содержимого (0 для блока из кеша)
+            outcome: 'text', 'empty', 'truncated', 'streamed', 'outline', 'omitted' (режим --outline),
+                'binary', 'cached', 'decode_error' или 'read_error'; для 'streamed' время включает
+                только предварительный проход
+        """
+
+    def on_output(self, bytes_written: int, seconds: float) -> None:
+        """В выходной поток записан кусок результата."""
+
+
+class InstrumentedRules:
+    """Обёртка над ExclusionRules, замеряющая проверки и сообщающая причины исключения."""
+
+    __slots__ = ('_hooks', '_rules')
+
+    def __init__(self, rules: ExclusionRules, hooks: SnapshotHooks) -> None:
+        self._rules = rules
+        self._hooks = hooks
+
+    def include_dir(self, name: str, relative_path: str | None = None) -> bool:
+        return self._check(name, 'dir', relative_path)
+
+    def include_file(self, name: str, relative_path: str | None = None) -> bool:
+        return self._check(name, 'file', relative_path)
+
+    def _check(self, name: str, kind: str, relative_path: str | None) -> bool:
+        started = time.perf_counter()
+        reason = self._rules.exclusion_reason(name, kind == 'dir', relative_path)
+        self._hooks.on_stage('match', time.perf_counter() - started)
+        if reason is None:
+            return True
+        self._hooks.on_prune(kind, reason, name)
+        return False
+
+
+class SnapshotStats(SnapshotHooks):
+    """Счётчики и таймеры снимка с итоговой сводкой и списком самых медленных файлов и директорий."""
+
+    _STAGE_NAMES = {
+        'match': 'rule matching',
+        'sniff': 'binary sniffing',
+        'decode': 'decoding',
+        'outline': 'outline extraction',
+    }
+    _OUTCOMES = (
+        'text',
+        'empty',
+        'truncated',
+        'streamed',
+        'outline',
+        'omitted',
+        'binary',
+        'cached',
+        'decode_error',
+        'read_error',
+    )
+
+    def __init__(self, top: int = 10) -> None:
+        self.top = top
+        self.phases: Counter[str] = Counter()
+        self.stage_seconds: Counter[str] = Counter()
+        self.stage_calls: Counter[str] = Counter()
+        self.directories = 0
+        self.directory_entries = 0
+        self.directory_seconds = 0.0
+        self.pruned: Counter[tuple[str, str]] = Counter()
+        self.outcomes: Counter[str] = Counter()
+        self.file_seconds = 0.0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.write_seconds = 0.0
+        self._slowest_files: list[tuple[float, str, int, str]] = []
+        self._slowest_dirs: list[tuple[float, str, int]] = []
+        # Статистика собирается только с --stats: threading загружается здесь, а не при импорте
+        import threading
+
+        self._lock = threading.Lock()
+
+    def on_phase(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase] += seconds
+
+    def on_directory(self, relative_path: str, seconds: float, entries: int) -> None:
+        with self._lock:
+            self.directories += 1
+            self.directory_entries += entries
+            self.directory_seconds += seconds
+            self._push(self._slowest_dirs, (seconds, relative_path or '.', entries))
+
+    def on_prune(self, kind: str, rule: str, name: str) -> None:
+        with self._lock:
+            self.pruned[kind, rule] += 1
+
+    def on_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stage_seconds[stage] += seconds
+            self.stage_calls[stage] += 1
+
+    def on_file(self, relative_path: str, seconds: float, bytes_read: int, outcome: str) -> None:
+        with self._lock:
+            self.outcomes[outcome] += 1
+            self.file_seconds += seconds
+            self.bytes_read += bytes_read
+            self._push(self._slowest_files, (seconds, relative_path, bytes_read, outcome))
+
+    def on_output(self, bytes_written: int, seconds: float) -> None:
+        with self._lock:
+            self.bytes_written += bytes_written
+            self.write_seconds += seconds
+
+    def _push(self, heap: list, item: tuple) -> None:
+        if len(heap) < self.top:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    @property
+    def files(self) -> int:
+        return sum(self.outcomes.values())
+
+    def slowest_files(self) -> list[tuple[float, str, int, str]]:
+        """Самые медленные файлы: (секунды, путь, прочитано байт, исход) по убыванию времени."""
+        with self._lock:
+            return sorted(self._slowest_files, reverse=True)
+
+    def slowest_directories(self) -> list[tuple[float, str, int]]:
+        """Самые медленные директории: (секунды, путь, число записей) по убыванию времени."""
+        with self._lock:
+            return sorted(self._slowest_dirs, reverse=True)
+
+    def format_report(self) -> str:
+        """Формирует текстовую сводку для вывода в консоль."""
+        lines = ['📈 Snapshot stats:']
+        if self.phases:
+            lines.append('  Phases: ' + ', '.join(f'{name} {seconds:.3f} s' for name, seconds in self.phases.items()))
+        if self.directories:
+            lines.append(
+                f'  Walk: {self.directories} dirs visited, {self.directory_entries} entries listed '
+                f'in {self.directory_seconds:.3f} s'
+            )
+        for kind in ('dir', 'file'):
+            rules = {rule: count for (pruned_kind, rule), count in self.pruned.items() if pruned_kind == kind}
+            if rules:
+                by_rule = ', '.join(f'{rule} {count}' for rule, count in sorted(rules.items()))
+                lines.append(f'  Pruned {kind}s: {sum(rules.values())} ({by_rule})')
+
+        outcomes = ', '.join(
+            f'{outcome.replace("_", " ")} {self.outcomes[outcome]}'
+            for outcome in self._OUTCOMES
+            if self.outcomes[outcome]
+        )
+        lines.append(
+            f'  Files: {self.files} rendered in {self.file_seconds:.3f} s of reader time ({outcomes or "none"})'
+        )
+        for stage, label in self._STAGE_NAMES.items():
+            if self.stage_calls[stage]:
+                lines.append(
+                    f'  {label.capitalize()}: {self.stage_calls[stage]} calls, {self.stage_seconds[stage]:.3f} s'
+                )
+        lines.append(
+            f'  I/O: {format_byte_size(self.bytes_read)} read, {format_byte_size(self.bytes_written)} written '
+            f'in {self.write_seconds:.3f} s'
+        )
+
+        slowest_files = self.slowest_files()
+        if slowest_files:
+            lines.append('  Slowest files:')
+            lines.extend(
+                f'    {seconds * 1000:9.2f} ms  {path} ({format_byte_size(size)}, {outcome.replace("_", " ")})'
+                for seconds, path, size, outcome in slowest_files
+            )
+        slowest_dirs = self.slowest_directories()
+        if slowest_dirs:
+            lines.append('  Slowest directories:')
+            lines.extend(
+                f'    {seconds * 1000:9.2f} ms  {path} ({entries} entries)' for seconds, path, entries in slowest_dirs
+            )
+        return '\n'.join(lines)
@@ -0,0 +1,211 @@
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator, Sequence
+import fnmatch
+import math
+import os
+
+from code2md.budget import FileBudget, FilePlan
+from code2md.interfaces import FileEntry
+
+PRIORITIES = ('depth', 'size', 'order')
+
+# Символов на блок помимо содержимого: строка дерева, заголовок, маркеры, ограждение кода
+_BLOCK_OVERHEAD_CHARS = 80
+# Заголовки разделов результата
+_HEADER_CHARS = 160
+# Строка итогового списка пропущенных файлов помимо пути (кириллица — по 2 байта)
+_SUMMARY_LINE_CHARS = 100
+# Меньше этого остатка файл не обрезается, а пропускается
+_MIN_TRUNCATED_TOKENS = 64
+
+
+class TokenEstimatorError(RuntimeError):
+    """Raised when a token estimator backend is unavailable."""
+
+
+class TokenEstimator(ABC):
+    """Оценка числа токенов для упаковки результата в контекстное окно."""
+
+    bytes_per_token = 4.0
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Считает токены в тексте."""
+
+    def estimate_size(self, size: int) -> int:
+        """Оценивает число токенов файла по его размеру, не читая его."""
+        return math.ceil(size / self.bytes_per_token)
+
+
+class HeuristicTokenEstimator(TokenEstimator):
+    """Быстрая оценка: фиксированное число символов на токен."""
+
+    def __init__(self, chars_per_token: float = 4.0) -> None:
+        if not chars_per_token > 0:
+            raise ValueError(f'chars_per_token must be positive, got {chars_per_token}')
+        self.bytes_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.bytes_per_token)
+
+
+class TiktokenEstimator(TokenEstimator):
+    """Точный подсчёт токенизатором tiktoken (необязательная зависимость).
+
+    Размер ещё не прочитанных файлов по-прежнему оценивается эвристически.
+    """
+
+    def __init__(self, encoding: str = 'cl100k_base') -> None:
+        try:
+            import tiktoken
+        except ImportError as exc:
+            raise TokenEstimatorError('tiktoken is not installed (pip install tiktoken)') from exc
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def get_token_estimator(spec: str) -> TokenEstimator:
+    """Создаёт оценщик по описанию: "heuristic[:chars_per_token]" или "tiktoken[:encoding]".
+
+    Raises:
+        TokenEstimatorError: Если токенизатор неизвестен или недоступен
+        ValueError: Если chars_per_token не положительное число
+    """
+    name, _, option = spec.partition(':')
+    if name == 'heuristic':
+        if not option:
+            return HeuristicTokenEstimator()
+        try:
+            chars_per_token = float(option)
+        except ValueError:
+            raise ValueError(f'invalid chars_per_token in tokenizer "{spec}"') from None
+        return HeuristicTokenEstimator(chars_per_token)
+    if name == 'tiktoken':
+        return TiktokenEstimator(option) if option else TiktokenEstimator()
+    raise TokenEstimatorError(f'Unknown tokenizer: {spec}')
+
+
+class TokenBudget(FileBudget):
+    """Упаковка файлов в бюджет токенов.
+
+    Файлы ранжируются по приоритету: сначала подходящие под priority_patterns
+    (в порядке паттернов), затем по выбранному критерию — глубине, размеру или
+    исходному порядку. В порядке ранга каждый файл выводится целиком, если
+    помещается в остаток бюджета; остаток после них делится на обрезку не
+    поместившихся файлов, а файлы, которым не хватило и на обрезку, пропускаются.
+    Оценка идёт только по размеру из stat, файлы при этом не читаются. Вывод
+    сохраняет исходный порядок файлов.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        estimator: TokenEstimator,
+        priority: str = 'depth',
+        priority_patterns: Sequence[str] = (),
+        inner: FileBudget | None = None,
+    ) -> None:
+        super().__init__()
+        if priority not in PRIORITIES:
+            raise ValueError(f'Unknown priority: {priority}')
+        self.max_tokens = max_tokens
+        self.estimator = estimator
+        self.priority = priority
+        self.priority_patterns = list(priority_patterns)
+        self.inner = inner
+
+    def _pattern_rank(self, relative_path: str) -> int:
+        posix_path = relative_path.replace(os.sep, '/')
+        name = posix_path.rsplit('/', 1)[-1]
+        for rank, pattern in enumerate(self.priority_patterns):
+            if fnmatch.fnmatch(posix_path, pattern) or fnmatch.fnmatch(name, pattern):
+                return rank
+        return len(self.priority_patterns)
+
+    def _pack(
+        self,
+        order: list[int],
+        costs: list[tuple[int, int]],
+        upstream: list[FilePlan],
+        available: int,
+    ) -> dict[int, int | None]:
+        """Жадно распределяет бюджет в порядке ранга; -1 означает пропуск файла.
+
+        Сначала в порядке ранга берутся файлы, помещающиеся целиком, так что обрезка
+        крупного файла не вытесняет следующие за ним небольшие; остаток затем отдаётся
+        на обрезку не поместившихся файлов, тоже в порядке ранга.
+        """
+        limits: dict[int, int | None] = {}
+        remaining = available
+        oversized = []
+        for index in order:
+            content_tokens, overhead = costs[index]
+            if content_tokens + overhead <= remaining:
+                limits[index] = upstream[index][1]
+                remaining -= content_tokens + overhead
+            else:
+                oversized.append(index)
+
+        for index in oversized:
+            overhead = costs[index][1]
+            if remaining - overhead >= _MIN_TRUNCATED_TOKENS:
+                limits[index] = int((remaining - overhead) * self.estimator.bytes_per_token)
+                remaining = 0
+            else:
+                limits[index] = -1
+        return limits
+
+    def plan(self, entries: Iterable[FileEntry]) -> Iterator[FilePlan]:
+        upstream = list(self.inner.plan(entries) if self.inner is not None else ((e, None) for e in entries))
+        self.omitted = list(self.inner.omitted) if self.inner is not None else []
+
+        estimator = self.estimator
+        costs = []
+        for entry, max_bytes in upstream:
+            try:
+                size = entry.size
+            except OSError:
+                size = 0
+            if max_bytes is not None:
+                size = min(size, max_bytes)
+            overhead = estimator.estimate_size(_BLOCK_OVERHEAD_CHARS + 3 * len(entry.relative_path))
+            costs.append((estimator.estimate_size(size), overhead))
+
+        def rank(index: int) -> tuple:
+            entry = upstream[index][0]
+            if self.priority == 'depth':
+                criterion = entry.relative_path.count(os.sep)
+            elif self.priority == 'size':
+                criterion = costs[index][0]
+            else:
+                criterion = 0
+            return self._pattern_rank(entry.relative_path), criterion, index
+
+        order = sorted(range(len(upstream)), key=rank)
+
+        # Заголовки, строки директорий в дереве и итоговый список пропущенных файлов тоже
+        # занимают токены. Размер списка зависит от результата упаковки, поэтому резерв
+        # под него уточняется за несколько проходов.
+        directories = {os.path.dirname(entry.relative_path) for entry, _ in upstream}
+        fixed = estimator.estimate_size(_HEADER_CHARS + sum(len(d) + 8 for d in directories))
+        reserve = fixed
+        for _ in range(3):
+            limits = self._pack(order, costs, upstream, self.max_tokens - reserve)
+            omitted_cost = sum(
+                estimator.estimate_size(_SUMMARY_LINE_CHARS + len(upstream[index][0].relative_path))
+                for index, limit in limits.items()
+                if limit == -1
+            )
+            if fixed + omitted_cost <= reserve:
+                break
+            reserve = fixed + omitted_cost
+
+        for index, (entry, _) in enumerate(upstream):
+            limit = limits[index]
+            if limit == -1:
+                tokens = sum(costs[index])
+                self.omitted.append((entry.relative_path, f'не помещается в бюджет токенов (≈{tokens})'))
+            else:
+                yield entry, limit
@@ -0,0 +1,434 @@
+from collections.abc import Callable, Iterator
+import ctypes
+import ctypes.util
+import logging
+import os
+from pathlib import Path
+import select
+import struct
+import threading
+import time
+from typing import Any
+
+from code2md.exclusions import ExclusionRules
+from code2md.file_writer import MarkdownFileWriter
+from code2md.interfaces import FileEntry, StreamingFileCollector, TreeItem
+
+# Маски inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+
+_CONTENT_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_ATTRIB
+_STRUCTURE_MASK = _IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE_SELF | _IN_MOVE_SELF
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class ChangeBatch:
+    """Накопленные изменения.
+
+    paths — относительные пути изменённых файлов, dirs — относительные пути директорий,
+    чьё содержимое нужно обойти заново, rescan — нужен ли полный повторный обход со сверкой stat.
+    """
+
+    __slots__ = ('dirs', 'paths', 'rescan')
+
+    def __init__(self, paths: set[str] | None = None, dirs: set[str] | None = None, rescan: bool = False) -> None:
+        self.paths = paths if paths is not None else set()
+        self.dirs = dirs if dirs is not None else set()
+        self.rescan = rescan
+
+    def __bool__(self) -> bool:
+        return self.rescan or bool(self.paths) or bool(self.dirs)
+
+    def merge(self, other: 'ChangeBatch') -> None:
+        self.paths |= other.paths
+        self.dirs |= other.dirs
+        self.rescan = self.rescan or other.rescan
+
+
+class PollingEventSource:
+    """Запасной источник событий: периодически просит полный повторный обход со сверкой stat."""
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = interval
+        self._next = time.monotonic() + interval
+
+    def wait(self, timeout: float) -> ChangeBatch:
+        delay = self._next - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return ChangeBatch()
+        time.sleep(max(delay, 0))
+        self._next = time.monotonic() + self.interval
+        return ChangeBatch(rescan=True)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyEventSource:
+    """Источник событий на inotify (Linux), подключаемый через ctypes.
+
+    Наблюдает за всеми директориями, которые сборщик не отсекает правилами,
+    и добавляет наблюдение за новыми директориями по мере их появления.
+    Изменение структуры директории отмечает для повторного обхода только её саму.
+    """
+
+    def __init__(self, start_path: Path, rules: ExclusionRules, ignored_paths: frozenset[str] = frozenset()) -> None:
+        libc_name = ctypes.util.find_library('c')
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError('inotify is not available')
+        self._libc = libc
+        self._rules = rules
+        self._ignored = ignored_paths
+        self._start = os.fspath(start_path)
+        self._watches: dict[int, str] = {}
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._watch_tree(self._start)
+
+    def _watch_tree(self, top: str) -> None:
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _CONTENT_MASK | _STRUCTURE_MASK)
+            if wd < 0:
+                continue
+            self._watches[wd] = directory
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False) and self._include_dir(entry.name, entry.path):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+
+    def _forget_tree(self, top: str) -> None:
+        """Снимает наблюдение с директории и её поддиректорий (директория перемещена или удалена)."""
+        prefix = top + os.sep
+        for wd, directory in list(self._watches.items()):
+            if directory == top or directory.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+
+    def _include_dir(self, name: str, path: str) -> bool:
+        return self._rules.include_dir(name, os.path.relpath(path, self._start))
+
+    def _relative(self, path: str) -> str:
+        return '' if path == self._start else os.path.relpath(path, self._start)
+
+    def wait(self, timeout: float) -> ChangeBatch:
+        batch = ChangeBatch()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return batch
+
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return batch
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                batch.rescan = True
+                continue
+            if mask & _IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            full_path = os.path.join(directory, name) if name else directory
+            if full_path in self._ignored:
+                continue
+
+            if mask & _STRUCTURE_MASK:
+                if not name:
+                    # Удалена или перемещена сама наблюдаемая директория: её родитель получит своё событие
+                    if directory == self._start:
+                        batch.rescan = True
+                    continue
+                batch.dirs.add(self._relative(directory))
+                if mask & _IN_ISDIR:
+                    if mask & _IN_MOVED_FROM:
+                        self._forget_tree(full_path)
+                    elif mask & (_IN_CREATE | _IN_MOVED_TO) and self._include_dir(name, full_path):
+                        self._watch_tree(full_path)
+                elif mask & (_IN_CREATE | _IN_MOVED_TO):
+                    # Замена файла переименованием (vim, sed -i, os.replace) не порождает IN_MODIFY
+                    batch.paths.add(self._relative(full_path))
+            elif name and not mask & _IN_ISDIR:
+                batch.paths.add(self._relative(full_path))
+
+        return batch
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class SnapshotWatcher:
+    """Держит снимок проекта в памяти и обновляет выходной файл по изменениям.
+
+    Дерево и отрендеренные блоки файлов хранятся в памяти в виде уже закодированных
+    байт. При изменении содержимого перечитываются только изменённые файлы. При изменении
+    структуры (создание, удаление, переименование) заново обходятся только затронутые
+    директории, а их файлы сверяются по stat; полный обход нужен лишь после потери событий
+    или со сборщиком, не умеющим обходить отдельные директории. Выходной файл переписывается начиная с первого изменившегося
+    блока, всё до него остаётся на месте. Всплески событий (например, git checkout)
+    объединяются: обновление выполняется после debounce секунд тишины.
+    """
+
+    def __init__(
+        self,
+        collector: StreamingFileCollector,
+        collect_kwargs: dict[str, Any],
+        writer: MarkdownFileWriter,
+        output_file: Path,
+        use_markers: bool = True,
+        debounce: float = 0.3,
+        max_delay: float = 5.0,
+        on_update: Callable[[int, float], None] | None = None,
+    ) -> None:
+        self.collector = collector
+        self.collect_kwargs = collect_kwargs
+        self.writer = writer
+        self.output_file = output_file
+        self.use_markers = use_markers
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.on_update = on_update
+        self.start_path: Path = collect_kwargs['start_path']
+        if writer.dedup:
+            # Блок повторной копии зависит от предыдущих файлов, а обновляются только изменённые
+            raise ValueError('SnapshotWatcher does not support a writer with dedup enabled')
+        self.logger = logging.getLogger(__name__)
+
+        self._header = b''
+        self._tree: list[TreeItem] = []
+        self._order: list[str] = []
+        self._entries: dict[str, FileEntry] = {}
+        self._stats: dict[str, tuple[int, int]] = {}
+        self._blocks: dict[str, bytes] = {}
+        self._segments: list[bytes] = []
+        self._symlinks: list[str] = []
+        self.writes = 0
+
+    @staticmethod
+    def _encode(text: str) -> bytes:
+        # Те же байты, что получаются при записи в текстовом режиме
+        if os.linesep != '\n':
+            text = text.replace('\n', os.linesep)
+        return text.encode('utf-8')
+
+    def _render(self, entries: list[FileEntry]) -> None:
+        for entry, block in self.writer.render_blocks(entries, self.start_path, self.use_markers):
+            self._blocks[entry.relative_path] = self._encode(block)
+            self._stats[entry.relative_path] = _stat_key(entry)
+
+    def _index(self) -> list[FileEntry]:
+        """Обновляет заголовок и индексы файлов по дереву; возвращает файлы в порядке вывода."""
+        self._header = self._encode(self.writer.render_header([item.line for item in self._tree], self.start_path))
+        entries = [item.file for item in self._tree if item.file is not None]
+        self._order = [entry.relative_path for entry in entries]
+        self._entries = {entry.relative_path: entry for entry in entries}
+        self._symlinks = [entry.relative_path for entry in entries if entry.is_symlink]
+        return entries
+
+    def build(self) -> int:
+        """Полностью собирает снимок и записывает выходной файл; возвращает число файлов."""
+        self._tree = list(self.collector.iter_collect(**self.collect_kwargs))
+        entries = self._index()
+        self._blocks = {}
+        self._render(entries)
+        self._flush()
+        return len(entries)
+
+    def _rewalk(self, dirs: set[str]) -> list[FileEntry] | None:
+        """Заново обходит поддеревья директорий и подставляет их строки в дерево.
+
+        Возвращает файлы обойдённых поддеревьев или None, если нужен полный обход
+        (сборщик не умеет обходить отдельные директории или директории нет в дереве).
+        """
+        walk_dir = getattr(self.collector, 'iter_collect_dir', None)
+        if walk_dir is None or '' in dirs:
+            return None
+
+        rewalked: list[FileEntry] = []
+        tops: list[str] = []
+        for relative_dir in sorted(dirs):
+            # Поддиректория уже обойдённой директории обойдена вместе с ней
+            if any(relative_dir.startswith(top + os.sep) for top in tops):
+                continue
+            tops.append(relative_dir)
+
+            paths = _item_paths(self._tree)
+            start = next(
+                (i for i, item in enumerate(self._tree) if item.file is None and paths[i] == relative_dir), None
+            )
+            if start is None:
+                return None
+            # Поддерево в дереве — непрерывный участок: обход идёт в глубину
+            prefix = relative_dir + os.sep
+            end = start + 1
+            while end < len(paths) and paths[end].startswith(prefix):
+                end += 1
+
+            items = list(walk_dir(relative_dir, **self.collect_kwargs))
+            self._tree[start:end] = items
+            rewalked.extend(item.file for item in items if item.file is not None)
+        return rewalked
+
+    def refresh(self, batch: ChangeBatch) -> int:
+        """Применяет накопленные изменения; возвращает число перерендеренных файлов."""
+        known = self._entries
+        structure_changed = batch.rescan or bool(batch.dirs)
+        rewalked = None if batch.rescan or not batch.dirs else self._rewalk(batch.dirs)
+        if structure_changed and rewalked is None:
+            self._tree = list(self.collector.iter_collect(**self.collect_kwargs))
+            rewalked = [item.file for item in self._tree if item.file is not None]
+        if structure_changed:
+            self._index()
+            for path in set(self._blocks) - set(self._entries):
+                del self._blocks[path]
+                self._stats.pop(path, None)
+
+        changed = {path for path in batch.paths if path in self._entries}
+        # Файлы обойдённых заново директорий могли смениться целиком (переименование поверх,
+        # перемещённая директория) без событий по их путям, поэтому сверяются по stat
+        for entry in rewalked or ():
+            path = entry.relative_path
+            if path not in known or self._stats.get(path) != _stat_key(entry):
+                changed.add(path)
+        # События приходят по пути ссылки-цели, поэтому символические ссылки сверяются по stat
+        for path in self._symlinks:
+            if self._stats.get(path) != _stat_key(FileEntry(self._entries[path].fspath, path)):
+                changed.add(path)
+
+        to_render = [FileEntry(self._entries[path].fspath, path) for path in self._order if path in changed]
+        self._render(to_render)
+        for entry in to_render:
+            self._entries[entry.relative_path] = entry
+
+        if structure_changed or to_render:
+            self._flush()
+        return len(to_render)
+
+    def _flush(self) -> None:
+        """Дописывает выходной файл с первого отличающегося сегмента."""
+        segments = [self._header, *(self._blocks[path] for path in self._order)]
+        previous = self._segments
+
+        first_changed = 0
+        offset = 0
+        limit = min(len(previous), len(segments))
+        while first_changed < limit and (
+            previous[first_changed] is segments[first_changed] or previous[first_changed] == segments[first_changed]
+        ):
+            offset += len(segments[first_changed])
+            first_changed += 1
+
+        if first_changed == len(segments) == len(previous) and self.output_file.exists():
+            return
+
+        mode = 'r+b' if previous and self.output_file.exists() else 'wb'
+        if mode == 'wb':
+            first_changed = 0
+            offset = 0
+        with self.output_file.open(mode) as f:
+            f.seek(offset)
+            f.writelines(segments[first_changed:])
+            f.truncate()
+        self._segments = segments
+        self.writes += 1
+
+    def _batches(self, source: Any, stop: threading.Event) -> Iterator[ChangeBatch]:
+        """Отдаёт пачки изменений, объединяя всплески событий."""
+        while not stop.is_set():
+            batch = source.wait(0.5)
+            if not batch:
+                continue
+            deadline = time.monotonic() + self.max_delay
+            while time.monotonic() < deadline:
+                more = source.wait(self.debounce)
+                if not more:
+                    break
+                batch.merge(more)
+            yield batch
+
+    def run(self, stop: threading.Event | None = None, poll_interval: float = 1.0) -> None:
+        """Строит снимок и обновляет его до установки stop (или до KeyboardInterrupt)."""
+        stop = stop or threading.Event()
+        self.build()
+
+        rules = ExclusionRules(
+            self.collect_kwargs['excluded_dirs'],
+            self.collect_kwargs['excluded_files'],
+            self.collect_kwargs['excluded_extensions'],
+            self.collect_kwargs['exclude_dotfiles'],
+            self.collect_kwargs.get('include_paths', ()),
+            self.collect_kwargs.get('exclude_paths', ()),
+        )
+        try:
+            source: Any = InotifyEventSource(self.start_path, rules, frozenset({os.fspath(self.output_file)}))
+        except OSError as exc:
+            self.logger.info(f'inotify недоступен ({exc}), изменения отслеживаются опросом')
+            source = PollingEventSource(poll_interval)
+
+        try:
+            for batch in self._batches(source, stop):
+                started = time.perf_counter()
+                writes = self.writes
+                rendered = self.refresh(batch)
+                if self.on_update is not None and self.writes != writes:
+                    self.on_update(rendered, time.perf_counter() - started)
+        finally:
+            source.close()
+
+
+def _item_paths(items: list[TreeItem]) -> list[str]:
+    """Относительные пути строк дерева: путь файла или путь директории.
+
+    Путь директории восстанавливается по отступу и имени в строке вида '<отступ>📂 имя/'.
+    """
+    parents: list[str] = []
+    paths = []
+    for item in items:
+        if item.file is not None:
+            paths.append(item.file.relative_path)
+            continue
+        name = item.line.lstrip(' ')
+        level = (len(item.line) - len(name)) // 4
+        del parents[level - 1 :]
+        parents.append(name[2:-1])
+        paths.append(os.path.join(*parents))
+    return paths
+
+
+def _stat_key(entry: FileEntry) -> tuple[int, int]:
+    try:
+        stat = entry.stat()
+    except OSError:
+        return (-1, -1)
+    return (stat.st_size, stat.st_mtime_ns)
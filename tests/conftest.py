@@ -0,0 +1,35 @@
+from collections.abc import Callable
+from pathlib import Path
+import sys
+
+import pytest
+
+from code2md.main import main
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    """Небольшой проект с файлами в разных кодировках, бинарным файлом и большим текстом."""
+    root = tmp_path / 'proj'
+    (root / 'pkg' / 'sub').mkdir(parents=True)
+    (root / 'pkg' / '__init__.py').write_text('')
+    (root / 'pkg' / 'app.py').write_text('def main() -> None:\n    print("привет")\n', encoding='utf-8')
+    (root / 'pkg' / 'sub' / 'legacy.txt').write_bytes('café, naïve\n'.encode('latin-1'))
+    (root / 'pkg' / 'sub' / 'data.bin').write_bytes(bytes(range(256)) * 4)
+    (root / 'README.md').write_text('# Проект\n\nОписание.\n', encoding='utf-8')
+    # Многобайтные символы попадают на границы блоков чтения
+    line = 'строка с юникодом — ü ß € 😀 ' * 3 + '\n'
+    (root / 'big.txt').write_text(line * 4000, encoding='utf-8')
+    return root
+
+
+@pytest.fixture
+def snapshot(monkeypatch: pytest.MonkeyPatch) -> Callable[..., bytes]:
+    """Запускает CLI для проекта и возвращает байты результата."""
+
+    def run(project: Path, output_dir: Path, *args: str) -> bytes:
+        monkeypatch.setattr(sys, 'argv', ['code2md', str(project), '-o', str(output_dir), *args])
+        main()
+        return (output_dir / f'{project.name}_structure.md').read_bytes()
+
+    return run
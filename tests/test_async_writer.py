@@ -0,0 +1,39 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from code2md.async_writer import AsyncFileSink, AsyncMarkdownFileWriter, MemorySink
+from code2md.budget import SizeBudget
+from code2md.file_collector import DefaultFileCollector
+from code2md.file_writer import MarkdownFileWriter
+from code2md.interfaces import FileEntry
+
+
+def _collect(project: Path) -> tuple[list[str], list[FileEntry]]:
+    return DefaultFileCollector().collect_entries(project, set(), set(), set(), True)
+
+
+@pytest.mark.parametrize('use_markers', [False, True])
+def test_async_matches_sync(project: Path, tmp_path: Path, use_markers: bool) -> None:
+    project_tree, files = _collect(project)
+    MarkdownFileWriter().write(tmp_path / 'sync.md', project_tree, files, project, use_markers)
+
+    asyncio.run(
+        AsyncMarkdownFileWriter(concurrency=3).write(
+            AsyncFileSink(tmp_path / 'async.md'), project_tree, files, project, use_markers
+        )
+    )
+    assert (tmp_path / 'async.md').read_bytes() == (tmp_path / 'sync.md').read_bytes()
+
+
+def test_async_matches_sync_with_budget(project: Path, tmp_path: Path) -> None:
+    project_tree, files = _collect(project)
+    sync_writer = MarkdownFileWriter(budget=SizeBudget(max_file_bytes=1000, max_files=4))
+    sync_writer.write(tmp_path / 'sync.md', project_tree, files, project)
+
+    sink = MemorySink()
+    async_writer = AsyncMarkdownFileWriter(budget=SizeBudget(max_file_bytes=1000, max_files=4))
+    asyncio.run(async_writer.write(sink, project_tree, files, project))
+    assert sink.getvalue() == (tmp_path / 'sync.md').read_text(encoding='utf-8')
+    assert async_writer.truncated == sync_writer.truncated
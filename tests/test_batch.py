@@ -0,0 +1,67 @@
+from collections.abc import Callable
+import json
+from pathlib import Path
+
+import pytest
+
+from code2md.batch import ManifestError, load_manifest, run_batch
+
+
+def _write_manifest(tmp_path: Path, data: object) -> Path:
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps(data))
+    return manifest
+
+
+def test_manifest_defaults_and_paths(project: Path, tmp_path: Path) -> None:
+    manifest = _write_manifest(
+        tmp_path,
+        {
+            'defaults': {'max_file_bytes': '1K', 'exclude_dirs': ['sub']},
+            'projects': ['proj', {'path': 'proj/pkg', 'max_file_bytes': 10, 'output_dir': 'out'}],
+        },
+    )
+    first, second = load_manifest(manifest)
+    assert first.start_path == project
+    assert first.output_file == project / 'proj_structure.md'
+    assert first.options == {'max_file_bytes': 1024, 'exclude_dirs': ['sub']}
+    assert second.start_path == project / 'pkg'
+    assert second.output_file == tmp_path / 'out' / 'pkg_structure.md'
+    assert second.options['max_file_bytes'] == 10
+
+
+def test_text_manifest(project: Path, tmp_path: Path) -> None:
+    manifest = tmp_path / 'projects.txt'
+    manifest.write_text('# nightly\nproj\n\n')
+    (job,) = load_manifest(manifest, tmp_path / 'out')
+    assert job.start_path == project
+    assert job.output_file == tmp_path / 'out' / 'proj_structure.md'
+
+
+@pytest.mark.parametrize(
+    ('data', 'message'),
+    [
+        ([{'path': 'proj', 'colour': 'red'}], 'unknown options: colour'),
+        ([{'exclude_dirs': ['x']}], '"path" is required'),
+        (['proj', 'proj'], 'would both write'),
+        ([{'path': 'proj', 'max_file_bytes': 'lots'}], 'max_file_bytes'),
+    ],
+)
+def test_invalid_manifest(project: Path, tmp_path: Path, data: object, message: str) -> None:
+    with pytest.raises(ManifestError, match=message):
+        load_manifest(_write_manifest(tmp_path, data))
+
+
+def test_failures_are_isolated(snapshot: Callable[..., bytes], project: Path, tmp_path: Path) -> None:
+    manifest = _write_manifest(tmp_path, ['missing', 'proj'])
+    reported = []
+    missing, ok = run_batch(load_manifest(manifest, tmp_path / 'out'), workers=2, on_report=reported.append)
+
+    assert len(reported) == 2
+    assert not missing.ok
+    assert 'not a directory' in missing.error
+    assert ok.ok
+    assert ok.files == 6
+    output = (tmp_path / 'out' / 'proj_structure.md').read_bytes()
+    assert ok.output_bytes == len(output)
+    assert output == snapshot(project, tmp_path / 'cli')
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from code2md.bench import TreeSpec, generate_tree, measure_once, summarize
+
+SPEC = TreeSpec(
+    files=60, depth=2, fanout=3, size_median=256, binary_ratio=0.1, non_utf8_ratio=0.1, node_modules_files=5
+)
+
+
+def _contents(root: Path) -> dict[str, bytes]:
+    return {path.relative_to(root).as_posix(): path.read_bytes() for path in root.rglob('*') if path.is_file()}
+
+
+def test_generated_tree_is_deterministic(tmp_path: Path) -> None:
+    first = generate_tree(tmp_path / 'a', SPEC)
+    second = generate_tree(tmp_path / 'b', SPEC)
+
+    assert first == second
+    assert _contents(tmp_path / 'a') == _contents(tmp_path / 'b')
+    generate_tree(tmp_path / 'c', SPEC._replace(seed=1))
+    assert _contents(tmp_path / 'a') != _contents(tmp_path / 'c')
+
+
+def test_generated_tree_matches_stats(tmp_path: Path) -> None:
+    stats = generate_tree(tmp_path, SPEC)
+    contents = _contents(tmp_path)
+    project = {name: data for name, data in contents.items() if not name.startswith('node_modules/')}
+
+    assert stats.files == len(project) == SPEC.files
+    assert stats.excluded == len(contents) - len(project) == SPEC.node_modules_files
+    assert stats.directories == 1 + 3 + 9
+    assert stats.total_bytes == sum(map(len, project.values()))
+    assert stats.binary == sum(name.endswith('.bin') for name in project)
+    assert stats.non_utf8 == sum(name.rsplit('/', 1)[-1].startswith('legacy_') for name in project)
+
+
+def test_measure_once_skips_excluded_tree(tmp_path: Path) -> None:
+    stats = generate_tree(tmp_path / 'tree', SPEC)
+    output_file = tmp_path / 'snapshot.md'
+
+    run = measure_once(tmp_path / 'tree', output_file)
+
+    # node_modules отсекается исключениями по умолчанию для frontend-проектов
+    assert run['files'] == stats.files
+    assert run['input_bytes'] == stats.total_bytes
+    assert run['output_bytes'] == output_file.stat().st_size
+    summary = summarize([run, run])
+    assert summary['files'] == stats.files
+    assert summary['total_seconds'] == run['collect_seconds'] + run['write_seconds']
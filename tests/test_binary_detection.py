@@ -0,0 +1,49 @@
+from pathlib import Path
+import random
+
+import pytest
+
+from code2md.binary_detection import BINARY_THRESHOLD, MAGIC_SIGNATURES, TEXT_BYTES, detect_magic
+from code2md.encoding_detection import UTF8, sniff_chunk
+from code2md.file_collector import DefaultFileCollector
+from code2md.file_writer import MarkdownFileWriter
+
+
+@pytest.mark.parametrize(('offset', 'signature', 'kind'), MAGIC_SIGNATURES)
+def test_magic_signatures(offset: int, signature: bytes, kind: str) -> None:
+    chunk = b'\x01' * offset + signature + b'payload'
+    assert detect_magic(chunk) == kind
+    assert sniff_chunk(chunk) == (kind, None)
+    # Сигнатура с нулевым байтом: без неё файл всё равно был бы признан бинарным
+    assert b'\x00' in signature
+
+
+def test_text_is_not_magic() -> None:
+    assert detect_magic(b'PK is not a zip') is None
+    assert detect_magic(b'MZ') is None
+    assert detect_magic(b'x' * 300) is None
+
+
+def test_nul_and_nontext() -> None:
+    assert sniff_chunk(b'text\x00text') == ('nul', None)
+    nontext = bytes(range(0x80, 0x100)) * 4
+    assert sniff_chunk(nontext, encodings=()) == ('nontext', None)
+    assert sniff_chunk(b'plain text\n', complete=True) == (None, UTF8)
+
+
+def test_translate_count_matches_per_byte_count() -> None:
+    rng = random.Random(0)
+    for _ in range(50):
+        chunk = bytes(rng.randrange(256) for _ in range(rng.randrange(1, 512)))
+        expected = sum(byte not in TEXT_BYTES for byte in chunk)
+        assert len(chunk.translate(None, TEXT_BYTES)) == expected
+    assert 0 < BINARY_THRESHOLD < 1
+
+
+def test_writer_counts_binary_kinds(project: Path, tmp_path: Path) -> None:
+    (project / 'image.png').write_bytes(MAGIC_SIGNATURES[0][1] + bytes(64))
+    project_tree, files = DefaultFileCollector().collect_entries(project, set(), set(), set(), True)
+    writer = MarkdownFileWriter()
+    writer.write(tmp_path / 'out.md', project_tree, files, project)
+    assert writer.counters['binary:png'] == 1
+    assert writer.counters['binary:nul'] == 1
@@ -0,0 +1,94 @@
+from collections.abc import Callable
+import os
+from pathlib import Path
+
+from code2md.cache import BlockCache
+from code2md.interfaces import FileEntry
+
+# Заведомо «старый» mtime: записи таких файлов проверяются по stat без чтения
+OLD_MTIME_NS = 1_000_000_000_000_000_000
+
+
+def _entry(path: Path) -> FileEntry:
+    return FileEntry(os.fspath(path), path.name)
+
+
+def _open(cache_dir: Path) -> BlockCache:
+    cache = BlockCache(cache_dir)
+    cache.open_namespace('test')
+    return cache
+
+
+def test_warm_cache_matches_cold(snapshot: Callable[..., bytes], project: Path, tmp_path: Path) -> None:
+    expected = snapshot(project, tmp_path / 'uncached')
+    cache_dir = tmp_path / 'cache'
+    cold = snapshot(project, tmp_path / 'cold', '--cache-dir', str(cache_dir))
+    assert any(cache_dir.iterdir())
+    warm = snapshot(project, tmp_path / 'warm', '--cache-dir', str(cache_dir))
+    assert cold == expected
+    assert warm == expected
+
+
+def test_same_size_edit_is_not_served_from_cache(snapshot: Callable[..., bytes], project: Path, tmp_path: Path) -> None:
+    cache_dir = tmp_path / 'cache'
+    snapshot(project, tmp_path / 'cold', '--cache-dir', str(cache_dir))
+    app = project / 'pkg' / 'app.py'
+    stat = app.stat()
+    app.write_text(app.read_text(encoding='utf-8').replace('main', 'mian'), encoding='utf-8')
+    os.utime(app, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert app.stat().st_size == stat.st_size
+    expected = snapshot(project, tmp_path / 'uncached')
+    assert snapshot(project, tmp_path / 'warm', '--cache-dir', str(cache_dir)) == expected
+
+
+def test_stat_match_skips_read(tmp_path: Path) -> None:
+    path = tmp_path / 'a.txt'
+    path.write_text('hello\n')
+    os.utime(path, ns=(OLD_MTIME_NS, OLD_MTIME_NS))
+    cache = _open(tmp_path / 'cache')
+    cache.store(_entry(path), 'block', 'digest-a')
+    cache.close()
+    cache = _open(tmp_path / 'cache')
+    assert cache.is_fresh(_entry(path))
+    assert cache.load_with_digest(_entry(path)) == ('block', 'digest-a')
+    cache.close()
+
+
+def test_touched_file_matches_by_digest(tmp_path: Path) -> None:
+    path = tmp_path / 'a.txt'
+    path.write_text('hello\n')
+    os.utime(path, ns=(OLD_MTIME_NS, OLD_MTIME_NS))
+    cache = _open(tmp_path / 'cache')
+    cache.store(_entry(path), 'block', 'digest-a')
+    cache.close()
+
+    os.utime(path, ns=(OLD_MTIME_NS + 10**9, OLD_MTIME_NS + 10**9))
+    cache = _open(tmp_path / 'cache')
+    entry = _entry(path)
+    assert not cache.is_fresh(entry)
+    assert cache.matches(entry, 'digest-a')
+    assert not cache.matches(entry, 'digest-b')
+    assert not cache.matches(entry, None)
+    cache.revalidate(entry)
+    cache.close()
+
+    cache = _open(tmp_path / 'cache')
+    assert cache.is_fresh(_entry(path))
+    cache.close()
+
+
+def test_recently_modified_file_is_verified_by_digest(tmp_path: Path) -> None:
+    path = tmp_path / 'a.txt'
+    path.write_text('hello\n')
+    cache = _open(tmp_path / 'cache')
+    cache.store(_entry(path), 'block', 'digest-a')
+    cache.close()
+    # Правка того же размера в пределах точности mtime по stat не видна
+    stat = path.stat()
+    path.write_text('HELLO\n')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    cache = _open(tmp_path / 'cache')
+    entry = _entry(path)
+    assert not cache.is_fresh(entry)
+    assert not cache.matches(entry, 'digest-b')
+    cache.close()
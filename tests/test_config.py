@@ -0,0 +1,84 @@
+from collections.abc import Callable
+import os
+from pathlib import Path
+
+import pytest
+
+from code2md import config
+from code2md.config import ConfigError, load_config
+
+CONFIG = """
+exclude_paths = ["big.txt"]
+jobs = 2
+
+[profiles.docs]
+include_paths = ["**/*.md"]
+exclude_paths = []
+max_file_bytes = "64K"
+"""
+
+
+@pytest.fixture
+def config_file(project: Path) -> Path:
+    path = project / '.code2md.toml'
+    path.write_text(CONFIG)
+    return path
+
+
+def test_profile_overrides_top_level(config_file: Path, tmp_path: Path) -> None:
+    assert load_config(config_file, cache_dir=tmp_path / 'cache') == {'exclude_paths': ['big.txt'], 'jobs': 2}
+    assert load_config(config_file, 'docs', cache_dir=tmp_path / 'cache') == {
+        'exclude_paths': [],
+        'include_paths': ['**/*.md'],
+        'jobs': 2,
+        'max_file_bytes': 64 * 1024,
+    }
+
+
+def test_unknown_profile(config_file: Path, tmp_path: Path) -> None:
+    with pytest.raises(ConfigError, match='unknown profile "nope"'):
+        load_config(config_file, 'nope', cache_dir=tmp_path / 'cache')
+
+
+def test_cached_until_config_changes(config_file: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache_dir = tmp_path / 'cache'
+    assert load_config(config_file, cache_dir=cache_dir)['jobs'] == 2
+
+    def fail(data: bytes, config_path: Path) -> dict:
+        raise AssertionError('config was parsed again')
+
+    monkeypatch.setattr(config, '_parse_toml', fail)
+    assert load_config(config_file, cache_dir=cache_dir)['jobs'] == 2
+
+    monkeypatch.undo()
+    # Правка того же размера: запись кеша отбрасывается по mtime
+    stat = config_file.stat()
+    config_file.write_text(CONFIG.replace('jobs = 2', 'jobs = 3'))
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert load_config(config_file, cache_dir=cache_dir)['jobs'] == 3
+
+
+def test_cli_and_profile(
+    snapshot: Callable[..., bytes],
+    project: Path,
+    config_file: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+
+    default = snapshot(project, tmp_path / 'default')
+    assert b'big.txt' not in default
+    assert b'app.py' in default
+
+    docs = snapshot(project, tmp_path / 'docs', '--profile', 'docs')
+    assert b'README.md' in docs
+    assert b'big.txt' not in docs
+    assert b'app.py' not in docs
+
+    # Опции командной строки важнее конфигурации
+    overridden = snapshot(project, tmp_path / 'overridden', '--profile', 'docs', '--include-paths', '**/*.py')
+    assert b'app.py' in overridden
+    assert b'README.md' not in overridden
+
+    assert b'big.txt' in snapshot(project, tmp_path / 'no-config', '--no-config')
@@ -0,0 +1,99 @@
+from collections.abc import Callable, Iterator
+import os
+from pathlib import Path
+import socket
+import stat
+import struct
+import sys
+import threading
+
+import pytest
+
+from code2md.daemon import SnapshotServer
+from code2md.main import main
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='Unix sockets are not available')
+
+
+@pytest.fixture
+def socket_path() -> Iterator[Path]:
+    # Путь сокета ограничен ~100 байтами, поэтому не берётся из длинного tmp_path
+    directory = Path(f'/tmp/code2md-test-{os.getpid()}')
+    directory.mkdir(exist_ok=True)
+    yield directory / 'server.sock'
+    for path in directory.iterdir():
+        path.unlink()
+    directory.rmdir()
+
+
+@pytest.fixture
+def server(socket_path: Path) -> Iterator[SnapshotServer]:
+    server = SnapshotServer(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_socket_is_private_from_the_start(socket_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Права должны быть выставлены уже при bind, а не исправлены chmod после него
+    monkeypatch.setattr(os, 'chmod', lambda *args, **kwargs: None)
+    previous_umask = os.umask(0o022)
+    try:
+        server = SnapshotServer(socket_path)
+        assert os.umask(0o022) == 0o022
+    finally:
+        os.umask(previous_umask)
+    try:
+        assert stat.S_IMODE(socket_path.stat().st_mode) == 0o600
+    finally:
+        server.server_close()
+
+
+def test_client_matches_local(
+    snapshot: Callable[..., bytes], project: Path, tmp_path: Path, server: SnapshotServer, socket_path: Path
+) -> None:
+    expected = snapshot(project, tmp_path / 'local')
+    assert snapshot(project, tmp_path / 'client', '--client', '--socket', str(socket_path)) == expected
+    assert not list((tmp_path / 'client').glob('.*.partial'))
+
+
+def test_failed_stream_keeps_previous_output(
+    snapshot: Callable[..., bytes],
+    project: Path,
+    tmp_path: Path,
+    socket_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    output_file = output_dir / f'{project.name}_structure.md'
+    output_file.write_bytes(b'previous snapshot')
+
+    # Сервер отдаёт один кадр и обрывает соединение
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(os.fspath(socket_path))
+    listener.listen(1)
+
+    def serve_partial() -> None:
+        connection, _ = listener.accept()
+        with connection:
+            connection.makefile('rb').readline()
+            connection.sendall(struct.pack('>I', 7) + b'partial')
+
+    thread = threading.Thread(target=serve_partial, daemon=True)
+    thread.start()
+    try:
+        monkeypatch.setattr(
+            sys, 'argv', ['code2md', str(project), '-o', str(output_dir), '--client', '--socket', str(socket_path)]
+        )
+        with pytest.raises(SystemExit):
+            main()
+    finally:
+        thread.join()
+        listener.close()
+
+    assert output_file.read_bytes() == b'previous snapshot'
+    assert [path.name for path in output_dir.iterdir()] == [output_file.name]
@@ -0,0 +1,41 @@
+from collections.abc import Callable
+from pathlib import Path
+import shutil
+
+import pytest
+
+REFERENCE = '[Содержимое совпадает с файлом `{}` - повторно не отображается]'
+
+
+@pytest.fixture
+def duplicated(project: Path) -> Path:
+    body = ''.join(f'def handler_{i}() -> str:\n    return "привет {i}"\n\n' for i in range(20))
+    (project / 'pkg' / 'handlers.py').write_text(body, encoding='utf-8')
+    shutil.copy(project / 'pkg' / 'handlers.py', project / 'pkg' / 'sub' / 'handlers_copy.py')
+    # Большой файл выводится потоково, его копия тоже должна стать ссылкой
+    shutil.copy(project / 'big.txt', project / 'big_copy.txt')
+    # Блок короче ссылки остаётся как есть
+    (project / 'a.txt').write_text('x\n')
+    (project / 'b.txt').write_text('x\n')
+    return project
+
+
+def test_duplicates_become_references(snapshot: Callable[..., bytes], duplicated: Path, tmp_path: Path) -> None:
+    plain = snapshot(duplicated, tmp_path / 'plain').decode('utf-8')
+    output = snapshot(duplicated, tmp_path / 'dedup', '--dedup').decode('utf-8')
+
+    assert plain.count('def handler_19()') == 2
+    assert output.count('def handler_19()') == 1
+    assert output.count(REFERENCE.format('pkg/handlers.py')) == 1
+    assert output.count(REFERENCE.format('big.txt')) == 1
+    assert REFERENCE.format('a.txt') not in output
+    assert len(output) < len(plain) // 2 + 1000
+
+
+def test_dedup_with_cache(snapshot: Callable[..., bytes], duplicated: Path, tmp_path: Path) -> None:
+    expected = snapshot(duplicated, tmp_path / 'uncached', '--dedup')
+    cache_args = ('--dedup', '--cache-dir', str(tmp_path / 'cache'))
+
+    # Холодный и тёплый кеш дают тот же результат: решение зависит только от хеша
+    assert snapshot(duplicated, tmp_path / 'cold', *cache_args) == expected
+    assert snapshot(duplicated, tmp_path / 'warm', *cache_args) == expected
@@ -0,0 +1,94 @@
+import codecs
+
+import pytest
+
+from code2md.encoding_detection import UTF8, TextEncoding, declared_encoding, guess_encoding, sniff_chunk
+
+RUSSIAN = 'Привет, мир! Это обычный текст на русском языке.\n'
+FRENCH = 'Le café est très bon, naïve façon de dire déjà vu.\n'
+
+
+def test_utf8() -> None:
+    assert sniff_chunk(RUSSIAN.encode('utf-8'), complete=True) == (None, UTF8)
+
+
+def test_utf8_character_split_at_chunk_end() -> None:
+    chunk = RUSSIAN.encode('utf-8')[:-2]
+    assert chunk[-1] >= 0x80
+    assert sniff_chunk(chunk[:-1]) == (None, UTF8)
+
+
+def test_cp1251() -> None:
+    assert sniff_chunk(RUSSIAN.encode('cp1251'), complete=True) == (None, TextEncoding('cp1251', 'cp1251'))
+
+
+def test_latin1_is_reported_as_cp1252() -> None:
+    # cp1252 совпадает с latin-1 на печатных символах и стоит в списке раньше: так и задумано
+    assert sniff_chunk(FRENCH.encode('latin-1'), complete=True) == (None, TextEncoding('cp1252', 'cp1252'))
+
+
+def test_candidate_order_is_respected() -> None:
+    encoding = guess_encoding(FRENCH.encode('latin-1'), ('latin-1', 'cp1252'))
+    assert encoding == TextEncoding('iso8859-1', 'iso8859-1')
+
+
+@pytest.mark.parametrize(
+    ('text', 'codec'),
+    [
+        ('这是一个中文文本文件，用于测试编码检测。\n', 'gbk'),
+        ('這是一個中文文本檔案，用於測試編碼偵測。\n', 'big5'),
+        ('これは日本語のテキストファイルです。\n', 'shift_jis'),
+        ('이것은 한국어 텍스트 파일입니다.\n', 'euc_kr'),
+        ('안녕하세요 세계\n', 'euc_kr'),
+    ],
+)
+def test_cjk_is_not_mistaken_for_cp1251(text: str, codec: str) -> None:
+    assert guess_encoding(text.encode(codec) * 4) is None
+
+
+@pytest.mark.parametrize(
+    ('bom', 'codec', 'name'),
+    [
+        (codecs.BOM_UTF8, 'utf-8', 'utf-8-sig'),
+        (codecs.BOM_UTF16_LE, 'utf-16-le', 'utf-16-le'),
+        (codecs.BOM_UTF16_BE, 'utf-16-be', 'utf-16-be'),
+        (codecs.BOM_UTF32_LE, 'utf-32-le', 'utf-32-le'),
+    ],
+)
+def test_bom(bom: bytes, codec: str, name: str) -> None:
+    kind, encoding = sniff_chunk(bom + RUSSIAN.encode(codec), complete=True)
+    assert kind is None
+    assert encoding == TextEncoding(name, codec, len(bom))
+
+
+def test_bom_with_undecodable_content_is_not_trusted() -> None:
+    kind, encoding = sniff_chunk(codecs.BOM_UTF8 + RUSSIAN.encode('cp1251'), complete=True)
+    assert encoding != TextEncoding('utf-8-sig', 'utf-8', 3)
+
+
+def test_coding_cookie_selects_candidate() -> None:
+    data = b'# -*- coding: cp1252 -*-\n' + RUSSIAN.encode('cp1251')
+    assert declared_encoding(data) == 'cp1252'
+    assert sniff_chunk(data, complete=True) == (None, TextEncoding('cp1252', 'cp1252'))
+
+
+def test_coding_cookie_on_second_line_and_xml() -> None:
+    assert declared_encoding(b'#!/usr/bin/env python\n# coding=latin-1\n') == 'latin-1'
+    assert declared_encoding(b'<?xml version="1.0" encoding="windows-1251"?>\n') == 'cp1251'
+    assert declared_encoding(b'\n\n# coding: cp1251\n') is None
+
+
+def test_coding_cookie_outside_candidates_is_ignored() -> None:
+    data = b'# coding: koi8-r\n' + RUSSIAN.encode('cp1251')
+    assert declared_encoding(data) is None
+    assert sniff_chunk(data, complete=True) == (None, TextEncoding('cp1251', 'cp1251'))
+
+
+def test_utf8_wins_over_cookie() -> None:
+    data = b'# coding: cp1251\n' + RUSSIAN.encode('utf-8')
+    assert sniff_chunk(data, complete=True) == (None, UTF8)
+
+
+def test_control_bytes_are_binary() -> None:
+    data = bytes(range(1, 32)) * 8 + RUSSIAN.encode('cp1251')
+    assert guess_encoding(data) is None
@@ -0,0 +1,60 @@
+import pytest
+
+from code2md.exclusions import ExclusionRules, PathMatcher
+
+
+@pytest.mark.parametrize(
+    ('pattern', 'path', 'expected'),
+    [
+        ('src/**/*.py', 'src/a.py', True),
+        ('src/**/*.py', 'src/a/b/c.py', True),
+        ('src/**/*.py', 'src/a/b/c.txt', False),
+        ('src/**/*.py', 'lib/src/a.py', False),
+        ('**/test_*.py', 'test_a.py', True),
+        ('**/test_*.py', 'pkg/tests/test_a.py', True),
+        ('src/*.py', 'src/a/b.py', False),
+        ('?.py', 'a.py', True),
+        ('?.py', 'a/b.py', False),
+        ('data/[!x]*.csv', 'data/a.csv', True),
+        ('data/[!x]*.csv', 'data/x.csv', False),
+        ('data/[ab].csv', 'data/b.csv', True),
+        ('docs/_build', 'docs/_build/html/index.html', True),
+        ('docs/_build', 'docs/_builder/index.html', False),
+        ('/docs/', 'docs/index.md', True),
+    ],
+)
+def test_path_glob(pattern: str, path: str, expected: bool) -> None:
+    assert PathMatcher([pattern]).matches(path) is expected
+
+
+@pytest.mark.parametrize(
+    ('dir_path', 'expected'),
+    [
+        ('src', True),
+        ('src/pkg', True),
+        ('docs', True),
+        ('docs/api', True),
+        ('docs/guide', False),
+        ('tests', False),
+        ('srcs', False),
+    ],
+)
+def test_may_contain(dir_path: str, expected: bool) -> None:
+    matcher = PathMatcher(['src/**/*.py', 'docs/api/*.md'])
+    assert matcher.may_contain(dir_path) is expected
+
+
+def test_leading_glob_may_contain_anything() -> None:
+    assert PathMatcher(['**/*.py']).may_contain('any/dir')
+
+
+def test_rules_include_and_exclude_paths() -> None:
+    rules = ExclusionRules(set(), set(), set(), False, ['src/**'], ['src/gen/**'])
+    assert rules.include_dir('src', 'src')
+    assert not rules.include_dir('docs', 'docs')
+    assert rules.include_file('a.py', 'src/a.py')
+    assert not rules.include_file('README.md', 'README.md')
+    # 'src/gen/**' исключает и саму директорию gen
+    assert not rules.include_dir('gen', 'src/gen')
+    assert rules.exclusion_reason('gen', True, 'src/gen') == 'path'
+    assert rules.exclusion_reason('docs', True, 'docs') == 'include'
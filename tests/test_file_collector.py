@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from code2md.file_collector import DefaultFileCollector
+from code2md.interfaces import FileEntry
+
+
+def test_collect_returns_paths(project: Path) -> None:
+    collector = DefaultFileCollector()
+    project_tree, files = collector.collect(project, set(), set(), set(), True)
+    entries_tree, entries = collector.collect_entries(project, set(), set(), set(), True)
+
+    assert project_tree == entries_tree
+    assert all(type(path) is type(project) for path in files)
+    assert all(isinstance(entry, FileEntry) for entry in entries)
+    assert files == [entry.path for entry in entries]
+    assert [path.relative_to(project).as_posix() for path in files] == [
+        'README.md',
+        'big.txt',
+        'pkg/__init__.py',
+        'pkg/app.py',
+        'pkg/sub/data.bin',
+        'pkg/sub/legacy.txt',
+    ]
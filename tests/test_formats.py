@@ -0,0 +1,82 @@
+from collections.abc import Callable
+import json
+from pathlib import Path
+import sys
+
+import pytest
+
+from code2md.formats import OFFSET_INDEX_SUFFIX, read_indexed_block
+from code2md.main import main
+
+
+@pytest.fixture
+def run_format(monkeypatch: pytest.MonkeyPatch) -> Callable[..., Path]:
+    """Запускает CLI с --format и возвращает путь к результату."""
+
+    def run(project: Path, output_dir: Path, output_format: str, *args: str) -> Path:
+        argv = ['code2md', str(project), '-o', str(output_dir), '--format', output_format, *args]
+        monkeypatch.setattr(sys, 'argv', argv)
+        main()
+        suffix = '.md' if output_format == 'markdown' else f'.{output_format}'
+        return output_dir / f'{project.name}_structure{suffix}'
+
+    return run
+
+
+def test_jsonl_records(run_format: Callable[..., Path], project: Path, tmp_path: Path) -> None:
+    output_file = run_format(project, tmp_path, 'jsonl')
+    records = {
+        record['path']: record for record in map(json.loads, output_file.read_text(encoding='utf-8').splitlines())
+    }
+
+    assert len(records) == 6
+    assert records['pkg/__init__.py']['kind'] == 'empty'
+    app = records['pkg/app.py']
+    assert (app['kind'], app['language'], app['content']) == (
+        'text',
+        'python',
+        (project / 'pkg' / 'app.py').read_text(),
+    )
+    assert 'encoding' not in app
+    assert records['pkg/sub/legacy.txt']['content'] == 'café, naïve\n'
+    assert records['pkg/sub/legacy.txt']['encoding'] != 'utf-8'
+    assert records['pkg/sub/data.bin']['kind'] == 'binary'
+    assert records['pkg/sub/data.bin']['size'] == 1024
+    # Большой файл выводится потоково, содержимое экранируется по частям
+    assert records['big.txt']['content'] == (project / 'big.txt').read_text(encoding='utf-8')
+
+
+def test_jsonl_duplicates(run_format: Callable[..., Path], project: Path, tmp_path: Path) -> None:
+    (project / 'copy.txt').write_bytes((project / 'big.txt').read_bytes())
+    output_file = run_format(project, tmp_path, 'jsonl', '--dedup')
+    records = [json.loads(line) for line in output_file.read_text(encoding='utf-8').splitlines()]
+
+    duplicate = next(record for record in records if record['path'] == 'copy.txt')
+    assert duplicate == {'path': 'copy.txt', 'kind': 'duplicate', 'duplicate_of': 'big.txt'}
+
+
+@pytest.mark.parametrize('output_format', ['markdown', 'jsonl'])
+def test_offset_index_slices_blocks(
+    run_format: Callable[..., Path], project: Path, tmp_path: Path, output_format: str
+) -> None:
+    output_file = run_format(project, tmp_path, output_format, '--index')
+    index_file = output_file.with_name(output_file.name + OFFSET_INDEX_SUFFIX)
+    index = json.loads(index_file.read_text(encoding='utf-8'))
+    data = output_file.read_bytes()
+
+    assert (index['output'], index['format']) == (output_file.name, output_format)
+    records = index['files']
+    assert len(records) == 6
+    # Блоки идут подряд и заканчиваются вместе с документом
+    ends = [record['offset'] + record['length'] for record in records]
+    assert [record['offset'] for record in records[1:]] == ends[:-1]
+    assert ends[-1] == len(data)
+
+    for record in records:
+        block = read_indexed_block(output_file, index_file, record['path'])
+        assert block == data[record['offset'] : record['offset'] + record['length']]
+        if output_format == 'jsonl':
+            assert json.loads(block)['path'] == record['path']
+        else:
+            assert block.startswith(f'<!-- FILE: {record["path"]} START -->'.encode())
+    assert read_indexed_block(output_file, index_file, 'missing.py') is None
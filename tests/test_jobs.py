@@ -0,0 +1,38 @@
+from collections.abc import Callable
+import concurrent.futures
+from pathlib import Path
+
+import pytest
+
+from code2md.file_writer import MarkdownFileWriter
+from code2md.interfaces import FileEntry
+
+
+@pytest.mark.parametrize('jobs', [2, 4])
+def test_jobs_match_sequential(snapshot: Callable[..., bytes], project: Path, tmp_path: Path, jobs: int) -> None:
+    expected = snapshot(project, tmp_path / 'sequential')
+    assert snapshot(project, tmp_path / 'parallel', '-j', str(jobs)) == expected
+
+
+def test_window_is_bounded_by_bytes(project: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(MarkdownFileWriter, '_WINDOW_BYTES', 1000)
+    entries = [FileEntry.from_path(path, project) for path in sorted(project.rglob('*')) if path.is_file()]
+    submitted: list[FileEntry] = []
+    done = 0
+    windows: list[list[int]] = []
+
+    class RecordingExecutor(concurrent.futures.ThreadPoolExecutor):
+        def submit(self, fn: Callable[..., object], entry: FileEntry, *args: object) -> concurrent.futures.Future:
+            submitted.append(entry)
+            windows.append([item.size for item in submitted[done:]])
+            return super().submit(fn, entry, *args)
+
+    monkeypatch.setattr(concurrent.futures, 'ThreadPoolExecutor', RecordingExecutor)
+    for rendered in MarkdownFileWriter(jobs=4)._render_files(entries, use_markers=False):
+        assert rendered.entry is submitted[done]
+        done += 1
+
+    assert done == len(entries)
+    # Файл больше окна обрабатывается один, остальные окна не больше лимита
+    assert all(len(window) == 1 or sum(window) <= 1000 for window in windows)
+    assert any(len(window) > 1 for window in windows)
@@ -0,0 +1,111 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from code2md.outline import Outliner, extract_outline, supports_outline
+
+PYTHON_SOURCE = '''"""Модуль."""
+import os
+
+
+@dataclass(frozen=True)
+class Point(Base, metaclass=Meta):
+    """Точка.
+
+    Подробности.
+    """
+
+    x: int = 0
+
+    def norm(self, scale: float = 1.0) -> float:
+        def helper():
+            return 1
+        return helper() * scale
+
+
+async def fetch(url, *, retries=3):
+    """Загружает url."""
+    return await get(url)
+'''
+
+PYTHON_OUTLINE = '''"""Модуль."""
+
+@dataclass(frozen=True)
+class Point(Base, metaclass=Meta):
+    """Точка.
+
+    Подробности.
+    """
+    def norm(self, scale: float=1.0) -> float:
+        ...
+
+async def fetch(url, *, retries=3):
+    """Загружает url."""
+    ...'''
+
+
+def test_python_outline() -> None:
+    assert extract_outline(PYTHON_SOURCE, 'python') == PYTHON_OUTLINE
+
+
+def test_python_fallback_to_declarations() -> None:
+    # Модуль, обрезанный бюджетом, не разбирается ast: берутся строки объявлений
+    text = 'class A:\n    def f(self):\n        return (\n'
+    assert extract_outline(text, 'python') == 'class A:\n    def f(self):'
+    assert extract_outline('x = 1\n', 'python') is None
+
+
+@pytest.mark.parametrize(
+    ('language', 'text', 'expected'),
+    [
+        (
+            'typescript',
+            'export interface Props {\n  a: number;\n}\nexport async function load(id: string) {\n  return id;\n}\n',
+            'export interface Props\nexport async function load(id: string)',
+        ),
+        ('go', 'package main\n\nfunc main() {\n\tprintln(1)\n}\n', 'package main\nfunc main()'),
+        (
+            'rust',
+            'pub struct S;\nimpl S {\n    pub fn new() -> Self { S }\n}\n',
+            'pub struct S;\nimpl S\n    pub fn new() -> Self { S }',
+        ),
+        ('markdown', '# Title\ntext\n## Part\n', '# Title\n## Part'),
+    ],
+)
+def test_declaration_outline(language: str, text: str, expected: str) -> None:
+    assert supports_outline(language)
+    assert extract_outline(text, language) == expected
+
+
+def test_unsupported_language() -> None:
+    assert not supports_outline('text')
+    assert extract_outline('anything', 'text') is None
+    with pytest.raises(ValueError, match='unknown outline mode'):
+        Outliner('full')
+
+
+def test_outliner_cache() -> None:
+    with Outliner(processes=1) as outliner:
+        assert outliner.outline(PYTHON_SOURCE, 'python', 'digest') == PYTHON_OUTLINE
+        assert outliner.outline('', 'python', 'digest') == PYTHON_OUTLINE
+        assert outliner.outline(PYTHON_SOURCE, 'python') == PYTHON_OUTLINE
+        assert (outliner.hits, outliner.misses) == (1, 1)
+
+
+@pytest.mark.parametrize('mode', ['skeleton', 'structure'])
+def test_cli_outline(snapshot: Callable[..., bytes], project: Path, tmp_path: Path, mode: str) -> None:
+    output = snapshot(project, tmp_path, '--outline', mode).decode('utf-8')
+    omitted = '[Режим структуры: содержимое файла не отображается]'
+
+    assert 'def main() -> None:\n    ...' in output
+    assert 'print(' not in output
+    assert '# Проект\n```' in output
+    assert 'Описание.' not in output
+    if mode == 'skeleton':
+        # Файлы без структуры выводятся целиком
+        assert 'café, naïve' in output
+        assert omitted not in output
+    else:
+        assert 'café, naïve' not in output
+        assert output.count(omitted) == 2
@@ -0,0 +1,68 @@
+import bz2
+from collections.abc import Callable
+import gzip
+import io
+import lzma
+from pathlib import Path
+import sys
+
+import pytest
+
+from code2md.main import main
+from code2md.output import COMPRESSIONS, OutputError, check_compression, open_compressed
+
+DECOMPRESS = {'gzip': gzip.decompress, 'bz2': bz2.decompress, 'xz': lzma.decompress}
+
+
+def test_stdout_matches_file(
+    snapshot: Callable[..., bytes],
+    project: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsysbinary: pytest.CaptureFixture[bytes],
+) -> None:
+    expected = snapshot(project, tmp_path / 'file')
+    capsysbinary.readouterr()
+
+    monkeypatch.setattr(sys, 'argv', ['code2md', str(project), '-o', str(tmp_path / 'stdout'), '--stdout'])
+    main()
+    captured = capsysbinary.readouterr()
+
+    assert captured.out == expected
+    # Сообщения о ходе работы уходят в stderr и не смешиваются со снимком
+    assert b'structure' in captured.err
+    assert not (tmp_path / 'stdout').exists()
+
+
+@pytest.mark.parametrize('method', sorted(DECOMPRESS))
+def test_compressed_file_matches_plain(
+    snapshot: Callable[..., bytes], project: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, method: str
+) -> None:
+    expected = snapshot(project, tmp_path / 'plain')
+
+    output_dir = tmp_path / 'packed'
+    monkeypatch.setattr(sys, 'argv', ['code2md', str(project), '-o', str(output_dir), '--compress', method])
+    main()
+
+    (compressed,) = output_dir.iterdir()
+    assert compressed.name == f'proj_structure.md{COMPRESSIONS[method][0]}'
+    assert DECOMPRESS[method](compressed.read_bytes()) == expected
+
+
+def test_gzip_is_reproducible() -> None:
+    archives = []
+    for _ in range(2):
+        buffer = io.BytesIO()
+        with open_compressed(buffer, 'gzip') as stream:
+            stream.write(b'# snapshot\n')
+        assert not buffer.closed
+        archives.append(buffer.getvalue())
+    assert archives[0] == archives[1]
+
+
+def test_zstd_availability() -> None:
+    if sys.version_info >= (3, 14):
+        check_compression('zstd')
+    else:
+        with pytest.raises(OutputError, match='3.14'):
+            check_compression('zstd')
@@ -0,0 +1,60 @@
+from collections.abc import Callable
+import json
+import os
+from pathlib import Path
+
+from code2md.file_collector import DefaultFileCollector
+from code2md.interfaces import FileEntry
+from code2md.shards import INDEX_NAME, plan_shards
+
+CONTENTS_HEADING = '# 📜 Содержимое файлов\n\n'
+
+
+def _entries(project: Path) -> list[FileEntry]:
+    return DefaultFileCollector().collect_entries(project, set(), set(), set(), True)[1]
+
+
+def _paths(entries: list[FileEntry]) -> list[str]:
+    return [entry.relative_path.replace(os.sep, '/') for entry in entries]
+
+
+def test_plan_by_size(project: Path) -> None:
+    entries = _entries(project)
+    plans = plan_shards(entries, max_bytes=2048)
+
+    # Порядок файлов сохраняется, big.txt больше лимита и занимает шард один
+    assert [entry for plan in plans for entry in plan.entries] == entries
+    assert [plan.name for plan in plans] == [f'{number:04d}' for number in range(1, len(plans) + 1)]
+    big = next(plan for plan in plans if 'big.txt' in _paths(plan.entries))
+    assert len(big.entries) == 1
+    assert all(sum(entry.size for entry in plan.entries) <= 2048 for plan in plans if plan is not big)
+
+
+def test_plan_by_directory(project: Path) -> None:
+    plans = plan_shards(_entries(project), by_directory=True)
+
+    assert [(plan.name, plan.directory) for plan in plans] == [('0001-root', '.'), ('0002-pkg', 'pkg')]
+    assert _paths(plans[0].entries) == ['README.md', 'big.txt']
+    assert all(path.startswith('pkg/') for path in _paths(plans[1].entries))
+    assert plan_shards([]) == []
+
+
+def test_shards_cover_single_snapshot(snapshot: Callable[..., bytes], project: Path, tmp_path: Path) -> None:
+    output_dir = tmp_path / 'out'
+    single = snapshot(project, output_dir).decode('utf-8')
+    snapshot(project, output_dir, '--shard-by-dir', '--shard-size', '2K')
+
+    shard_dir = output_dir / 'proj_structure'
+    index = json.loads((shard_dir / INDEX_NAME).read_text(encoding='utf-8'))
+    shards = [(shard_dir / shard['file']).read_text(encoding='utf-8') for shard in index['shards']]
+
+    # Блоки шардов подряд совпадают с блоками одного общего файла
+    blocks = ''.join(shard.partition(CONTENTS_HEADING)[2] for shard in shards)
+    assert blocks == single.partition(CONTENTS_HEADING)[2]
+    assert sum(shard['files'] for shard in index['shards']) == len(index['files']) == 6
+    for path, number in index['files'].items():
+        assert f'<!-- FILE: {path} START -->' in shards[number]
+
+    # Повторный запуск с другим разбиением удаляет шарды предыдущего
+    snapshot(project, output_dir, '--shard-by-dir')
+    assert sorted(path.name for path in shard_dir.iterdir()) == ['0001-root.md', '0002-pkg.md', INDEX_NAME]
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from code2md.bench import IMPORT_BUDGET_MS, STARTUP_MODULE, measure_import_time
+
+# Модули, которые нужны только отдельным режимам и не должны загружаться при обычном запуске
+LAZY_MODULES = (
+    'code2md.outline',
+    'code2md.daemon',
+    'code2md.watch',
+    'code2md.shards',
+    'ast',
+    'threading',
+    'hashlib',
+    'json',
+)
+
+
+# Замер времени зависит от машины, поэтому включается явно: CODE2MD_TIMING_TESTS=1
+@pytest.mark.skipif(not os.environ.get('CODE2MD_TIMING_TESTS'), reason='timing tests are opt-in')
+def test_import_within_budget() -> None:
+    # Двойной запас: тест ловит регрессии вроде возврата тяжёлого импорта, а не шум планировщика
+    assert measure_import_time(STARTUP_MODULE) <= 2 * IMPORT_BUDGET_MS
+
+
+def test_optional_modules_not_loaded() -> None:
+    completed = subprocess.run(
+        [sys.executable, '-c', f'import sys, {STARTUP_MODULE}; print("\\n".join(sys.modules))'],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    loaded = set(completed.stdout.split())
+    assert loaded.isdisjoint(LAZY_MODULES), sorted(loaded.intersection(LAZY_MODULES))
@@ -0,0 +1,59 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from code2md.file_collector import DefaultFileCollector
+from code2md.file_writer import MarkdownFileWriter
+from code2md.options import format_byte_size
+from code2md.stats import SnapshotStats
+
+
+def _snapshot_with_stats(project: Path, output_file: Path, jobs: int = 1) -> SnapshotStats:
+    stats = SnapshotStats(top=2)
+    items = DefaultFileCollector(hooks=stats).iter_collect(project, {'sub'}, {'README.md'}, {'.log'}, True)
+    with output_file.open('wb') as f:
+        MarkdownFileWriter(jobs=jobs, hooks=stats).write_binary(f, items, project)
+    return stats
+
+
+@pytest.mark.parametrize('jobs', [1, 4])
+def test_counters(project: Path, tmp_path: Path, jobs: int) -> None:
+    (project / '.env').write_text('SECRET=1\n')
+    output_file = tmp_path / 'out.md'
+
+    stats = _snapshot_with_stats(project, output_file, jobs)
+
+    assert stats.pruned == {('dir', 'name'): 1, ('file', 'name'): 1, ('file', 'dotfile'): 1}
+    # Корень и pkg; исключённая sub не читается
+    assert stats.directories == 2
+    assert stats.outcomes == {'text': 2, 'empty': 1}
+    expected_read = sum(len(path.read_bytes()) for path in (project / 'pkg' / 'app.py', project / 'big.txt'))
+    assert stats.bytes_read == expected_read
+    assert stats.bytes_written == output_file.stat().st_size
+    # Каждое имя проверяется один раз: исключённые плюс pkg, big.txt, __init__.py и app.py
+    assert stats.stage_calls['match'] == sum(stats.pruned.values()) + 4
+
+
+def test_slowest_are_bounded_and_sorted(project: Path, tmp_path: Path) -> None:
+    stats = _snapshot_with_stats(project, tmp_path / 'out.md')
+
+    slowest = stats.slowest_files()
+    assert len(slowest) == 2
+    assert slowest[0][0] >= slowest[1][0]
+    assert len(stats.slowest_directories()) == 2
+
+
+def test_cli_report(
+    snapshot: Callable[..., bytes], project: Path, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    expected = snapshot(project, tmp_path / 'plain')
+    capsys.readouterr()
+
+    # Сбор статистики не меняет результат
+    assert snapshot(project, tmp_path / 'stats', '--stats') == expected
+    report = capsys.readouterr().out
+    assert '📈 Snapshot stats:' in report
+    assert 'Files: 6 rendered' in report
+    assert 'binary 1' in report
+    assert f'{format_byte_size(len(expected))} written' in report
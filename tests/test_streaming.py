@@ -0,0 +1,16 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from code2md.file_writer import MarkdownFileWriter
+
+
+def test_streamed_files_match_buffered(
+    monkeypatch: pytest.MonkeyPatch, snapshot: Callable[..., bytes], project: Path, tmp_path: Path
+) -> None:
+    expected = snapshot(project, tmp_path / 'buffered')
+    # Порог потоковой обработки ниже размера big.txt, нечётный размер чтения режет символы UTF-8
+    monkeypatch.setattr(MarkdownFileWriter, '_STREAM_SIZE', 4096)
+    monkeypatch.setattr(MarkdownFileWriter, '_READ_SIZE', 4099)
+    assert snapshot(project, tmp_path / 'streamed') == expected
@@ -0,0 +1,50 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from code2md.interfaces import FileEntry
+from code2md.tokens import HeuristicTokenEstimator, TokenBudget, TokenEstimatorError, get_token_estimator
+
+
+def test_heuristic_estimator() -> None:
+    estimator = get_token_estimator('heuristic:2')
+    assert estimator.count('abcde') == 3
+    assert estimator.estimate_size(5) == 3
+    assert get_token_estimator('heuristic').count('abcd') == 1
+
+
+@pytest.mark.parametrize(
+    ('spec', 'error'), [('heuristic:x', ValueError), ('heuristic:0', ValueError), ('bpe', TokenEstimatorError)]
+)
+def test_invalid_tokenizer(spec: str, error: type[Exception]) -> None:
+    with pytest.raises(error):
+        get_token_estimator(spec)
+
+
+def _entries(project: Path) -> list[FileEntry]:
+    return [FileEntry.from_path(path, project) for path in sorted(project.rglob('*')) if path.is_file()]
+
+
+def test_small_files_are_kept_whole_around_a_large_one(project: Path) -> None:
+    budget = TokenBudget(5000, HeuristicTokenEstimator(), priority='order')
+    plans = {entry.relative_path: limit for entry, limit in budget.plan(_entries(project))}
+    # big.txt не помещается целиком и обрезается, остальные файлы выводятся полностью
+    assert plans.pop('big.txt') is not None
+    assert all(limit is None for limit in plans.values())
+    assert budget.omitted == []
+
+
+def test_priority_patterns_win_when_budget_is_tight(project: Path) -> None:
+    budget = TokenBudget(400, HeuristicTokenEstimator(), priority_patterns=['README.md'])
+    planned = [entry.relative_path for entry, _ in budget.plan(_entries(project))]
+    assert 'README.md' in planned
+    assert {path for path, _ in budget.omitted}.isdisjoint(planned)
+
+
+@pytest.mark.parametrize('max_tokens', [500, 3000, 20000])
+def test_output_fits_token_budget(
+    snapshot: Callable[..., bytes], project: Path, tmp_path: Path, max_tokens: int
+) -> None:
+    output = snapshot(project, tmp_path / 'out', '--max-tokens', str(max_tokens)).decode('utf-8')
+    assert HeuristicTokenEstimator().count(output) <= max_tokens
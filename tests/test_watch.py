@@ -0,0 +1,82 @@
+import os
+from pathlib import Path
+import shutil
+
+import pytest
+
+from code2md.exclusions import ExclusionRules
+from code2md.file_collector import DefaultFileCollector
+from code2md.file_writer import MarkdownFileWriter
+from code2md.watch import ChangeBatch, InotifyEventSource, SnapshotWatcher
+
+
+def _watcher(project: Path, output_file: Path) -> SnapshotWatcher:
+    collect_kwargs = {
+        'start_path': project,
+        'excluded_dirs': set(),
+        'excluded_files': set(),
+        'excluded_extensions': set(),
+        'exclude_dotfiles': True,
+    }
+    return SnapshotWatcher(DefaultFileCollector(), collect_kwargs, MarkdownFileWriter(), output_file)
+
+
+def _fresh(project: Path, tmp_path: Path) -> bytes:
+    output_file = tmp_path / 'fresh.md'
+    _watcher(project, output_file).build()
+    return output_file.read_bytes()
+
+
+def test_rewalk_only_changed_directory(project: Path, tmp_path: Path) -> None:
+    watcher = _watcher(project, tmp_path / 'out.md')
+    watcher.build()
+    (project / 'pkg' / 'sub' / 'new.txt').write_text('new\n')
+    (project / 'pkg' / 'sub' / 'legacy.txt').unlink()
+    (project / 'pkg' / 'sub' / 'deeper').mkdir()
+    (project / 'pkg' / 'sub' / 'deeper' / 'x.py').write_text('x = 1\n')
+
+    assert watcher.refresh(ChangeBatch(dirs={os.path.join('pkg', 'sub')})) == 2
+    assert (tmp_path / 'out.md').read_bytes() == _fresh(project, tmp_path)
+
+
+def test_moved_directory_is_compared_by_stat(project: Path, tmp_path: Path) -> None:
+    watcher = _watcher(project, tmp_path / 'out.md')
+    watcher.build()
+    # Директория с файлами тех же имён, но другим содержимым, переезжает на место прежней
+    replacement = tmp_path / 'replacement'
+    shutil.copytree(project / 'pkg', replacement)
+    (replacement / 'app.py').write_text('print("replaced")\n')
+    shutil.rmtree(project / 'pkg')
+    replacement.rename(project / 'pkg')
+
+    assert watcher.refresh(ChangeBatch(dirs={''})) >= 1
+    assert (tmp_path / 'out.md').read_bytes() == _fresh(project, tmp_path)
+
+
+def test_file_replaced_by_rename_is_rerendered(project: Path, tmp_path: Path) -> None:
+    output_file = tmp_path / 'out.md'
+    watcher = _watcher(project, output_file)
+    watcher.build()
+    try:
+        source = InotifyEventSource(project, ExclusionRules(set(), set(), set(), True))
+    except OSError:
+        pytest.skip('inotify is not available')
+    try:
+        # Так сохраняют файл vim и sed -i: новая версия пишется рядом и переименовывается поверх
+        temporary = project / 'pkg' / '.app.py.swp'
+        temporary.write_text('def main() -> None:\n    print("hello")\n')
+        os.replace(temporary, project / 'pkg' / 'app.py')
+        batch = source.wait(1.0)
+        more = source.wait(0.1)
+        while more:
+            batch.merge(more)
+            more = source.wait(0.1)
+    finally:
+        source.close()
+
+    assert os.path.join('pkg', 'app.py') in batch.paths
+    assert batch.dirs == {'pkg'}
+    assert not batch.rescan
+    watcher.refresh(batch)
+    assert output_file.read_bytes() == _fresh(project, tmp_path)
+    assert b'print("hello")' in output_file.read_bytes()